@@ -13,10 +13,20 @@ from .builders import (
     build_core_text_to_toml_schema,
     make_outputs_dict,
 )
-from .config import DEBUG_DIR, OUT_DIR, SEED
-from ..datasets_io import load_streams, rows_from_stream
+from . import builders
+from . import config as cfg
+from .config import BUDGET, DEBUG_DIR, DESIRED_OUTPUT_COUNTS, FOCUS_MULTIPLIER, OUT_DIR, SEED
+from ..config import OFF_SHARD_WORKERS, PREFETCH_DEPTH, PREFETCH_ENABLE, SCHEDULER
+from ..datasets_io import load_streams, print_block_stats, rows_from_stream, shard_stream
+from ..inline_gate import print_gate_stats
+from ..memprofile import install_memprofile, print_memory_stats
+from ..metrics import write_metrics
 from ..p0_guard import P0Guard
+from ..profiling import install_profiling, print_stage_stats
+from ..progress import finish_progress, start_progress
+from ..prefetch import BlockPrefetcher, print_prefetch_stats
 from ..report import print_report
+from ..scheduler import print_scheduler_stats, run_scheduled
 from ..utils import ensure_dirs
 from ..write_outputs import write_outputs
 
@@ -31,14 +41,39 @@ def main():
     shop_rows_iter = rows_from_stream(streams["shopify"][0], streams["shopify"][1])
     off_cfgs = streams["openfoodfacts_cfgs"]
     off_iters = {
-        cfg: rows_from_stream(streams["openfoodfacts"][0][cfg][0], streams["openfoodfacts"][0][cfg][1])
-        for cfg in off_cfgs
+        off_cfg: rows_from_stream(streams["openfoodfacts"][0][off_cfg][0], streams["openfoodfacts"][0][off_cfg][1])
+        for off_cfg in off_cfgs
     }
     gtfs_rows_iter = rows_from_stream(streams["gtfs"][0], streams["gtfs"][1])
 
+    # Background prefetch: one bounded block queue per source (and OFF config).
+    # OFF configs are read by several shard workers merged into that queue.
+    # SFT_PREFETCH_ENABLE=0 starts no threads at all (direct iterator path).
+    prefetchers = {}
+    if PREFETCH_ENABLE:
+        prefetchers["shopify"] = BlockPrefetcher(
+            "shopify", lambda: rows_from_stream(streams["shopify"][0], streams["shopify"][1])
+        ).start()
+        prefetchers["gtfs"] = BlockPrefetcher(
+            "gtfs", lambda: rows_from_stream(streams["gtfs"][0], streams["gtfs"][1])
+        ).start()
+        for off_cfg in off_cfgs:
+            off_ds, off_cols = streams["openfoodfacts"][0][off_cfg]
+            shards = shard_stream(off_ds, OFF_SHARD_WORKERS)
+            prefetchers[f"openfoodfacts:{off_cfg}"] = BlockPrefetcher(
+                f"openfoodfacts:{off_cfg}",
+                [lambda d=d, c=off_cols, i=i: rows_from_stream(d, c, seed=SEED + i) for i, d in enumerate(shards)],
+                depth=PREFETCH_DEPTH * len(shards),
+            ).start()
+
     def take_rows(src: str):
         nonlocal shop_rows_iter, off_iters, gtfs_rows_iter
 
+        if prefetchers:
+            key = f"openfoodfacts:{random.choice(off_cfgs)}" if src == "openfoodfacts" else src
+            if key in prefetchers:
+                return prefetchers[key].get(), key
+
         def _next_shopify():
             nonlocal shop_rows_iter
             try:
@@ -70,51 +105,68 @@ def main():
         if src == "shopify":
             return _next_shopify(), "shopify"
         if src == "openfoodfacts":
-            cfg = random.choice(off_cfgs)
-            return _next_off(cfg), f"openfoodfacts:{cfg}"
+            off_cfg = random.choice(off_cfgs)
+            return _next_off(off_cfg), f"openfoodfacts:{off_cfg}"
         if src == "gtfs":
             return _next_gtfs(), "gtfs"
         raise ValueError(src)
 
     outputs = make_outputs_dict()
     p0 = P0Guard(disabled=False)
+    take_rows = install_profiling(builders, p0, take_rows)
+    install_memprofile(builders, outputs)
+
+    start_progress(BUDGET)
+    if SCHEDULER:
+        run_scheduled(builders, outputs, take_rows, p0, DESIRED_OUTPUT_COUNTS, FOCUS_MULTIPLIER)
+    else:
+        build_core_tabular(outputs, take_rows, p0)
+        print("core_tabular done:", len(outputs["sft_core_c_tabular.jsonl"]))
 
-    build_core_tabular(outputs, take_rows, p0)
-    print("core_tabular done:", len(outputs["sft_core_c_tabular.jsonl"]))
+        build_core_xml_in(outputs, take_rows, p0)
+        print("core_xml_in done:", len(outputs["sft_core_c_xml_in.jsonl"]))
 
-    build_core_xml_in(outputs, take_rows, p0)
-    print("core_xml_in done:", len(outputs["sft_core_c_xml_in.jsonl"]))
+        build_core_gtfs(outputs, take_rows, p0)
+        print("core_gtfs done:", len(outputs["sft_core_g_gtfs.jsonl"]))
 
-    build_core_gtfs(outputs, take_rows, p0)
-    print("core_gtfs done:", len(outputs["sft_core_g_gtfs.jsonl"]))
+        # NEW packs
+        build_core_text_to_json_schema(outputs, take_rows, p0)
+        print("core_text_to_json_schema done:", len(outputs["sft_core_c_text_to_json_schema.jsonl"]))
 
-    # NEW packs
-    build_core_text_to_json_schema(outputs, take_rows, p0)
-    print("core_text_to_json_schema done:", len(outputs["sft_core_c_text_to_json_schema.jsonl"]))
+        build_core_text_to_json_schema_nested(outputs, take_rows, p0)
+        print("core_text_to_json_schema_nested done:", len(outputs["sft_core_c_text_to_json_schema_nested.jsonl"]))
 
-    build_core_text_to_json_schema_nested(outputs, take_rows, p0)
-    print("core_text_to_json_schema_nested done:", len(outputs["sft_core_c_text_to_json_schema_nested.jsonl"]))
+        build_core_text_to_yaml_schema(outputs, take_rows, p0)
+        print("core_text_to_yaml_schema done:", len(outputs["sft_core_c_text_to_yaml_schema.jsonl"]))
 
-    build_core_text_to_yaml_schema(outputs, take_rows, p0)
-    print("core_text_to_yaml_schema done:", len(outputs["sft_core_c_text_to_yaml_schema.jsonl"]))
+        build_core_text_to_toml_schema(outputs, take_rows, p0)
+        print("core_text_to_toml_schema done:", len(outputs["sft_core_c_text_to_toml_schema.jsonl"]))
 
-    build_core_text_to_toml_schema(outputs, take_rows, p0)
-    print("core_text_to_toml_schema done:", len(outputs["sft_core_c_text_to_toml_schema.jsonl"]))
+        build_pack_hard_mixed(outputs, take_rows, p0)
+        print("pack_hard_mixed done:", len(outputs["sft_pack_hard_mixed.jsonl"]))
 
-    build_pack_hard_mixed(outputs, take_rows, p0)
-    print("pack_hard_mixed done:", len(outputs["sft_pack_hard_mixed.jsonl"]))
+        build_core_xml_out(outputs, take_rows, p0)
+        print("core_xml_out done:", len(outputs["sft_core_c_xml_out.jsonl"]))
 
-    build_core_xml_out(outputs, take_rows, p0)
-    print("core_xml_out done:", len(outputs["sft_core_c_xml_out.jsonl"]))
+        build_core_toml_out(outputs, take_rows, p0)
+        print("core_toml_out done:", len(outputs["sft_core_c_toml_out.jsonl"]))
 
-    build_core_toml_out(outputs, take_rows, p0)
-    print("core_toml_out done:", len(outputs["sft_core_c_toml_out.jsonl"]))
+        build_core_yaml_out_min(outputs, take_rows, p0)
+        print("core_yaml_out_min done:", len(outputs["sft_core_c_yaml_out_min.jsonl"]))
 
-    build_core_yaml_out_min(outputs, take_rows, p0)
-    print("core_yaml_out_min done:", len(outputs["sft_core_c_yaml_out_min.jsonl"]))
+    finish_progress()
+    print_prefetch_stats(prefetchers)
+    print_block_stats()
+    print_gate_stats()
+    print_scheduler_stats()
+    for pf in prefetchers.values():
+        pf.close()
 
+    print_stage_stats()
+    print_memory_stats(BUDGET)
     print_report(outputs)
     write_outputs(outputs)
+    write_metrics("build", (cfg,))
 
 
 if __name__ == "__main__":
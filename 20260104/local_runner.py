@@ -16,9 +16,17 @@ from .builders import (
     make_outputs_dict,
 )
 from .config import MAX_ROWS_PER_SAMPLE, SEED
+from . import builders
 from . import config as cfg
+from ..config import SCHEDULER, TOKENIZER_FILE
+from ..inline_gate import print_gate_stats
+from ..memprofile import install_memprofile, print_memory_stats
+from ..metrics import write_metrics
 from ..p0_guard import P0Guard
+from ..profiling import install_profiling, print_stage_stats
+from ..progress import finish_progress, start_progress
 from ..report import print_report
+from ..scheduler import print_scheduler_stats, run_scheduled
 from ..write_outputs import write_outputs
 
 
@@ -67,24 +75,36 @@ def main():
         return (rows, cols), src
 
     outputs = make_outputs_dict()
-    p0 = P0Guard(disabled=True)
+    p0 = P0Guard(disabled=not TOKENIZER_FILE)
+    take_rows = install_profiling(builders, p0, take_rows)
+    install_memprofile(builders, outputs)
 
-    build_core_tabular(outputs, take_rows, p0)
-    build_core_xml_in(outputs, take_rows, p0)
-    build_core_gtfs(outputs, take_rows, p0)
+    start_progress(cfg.BUDGET)
+    if SCHEDULER:
+        run_scheduled(builders, outputs, take_rows, p0, cfg.DESIRED_OUTPUT_COUNTS, cfg.FOCUS_MULTIPLIER)
+    else:
+        build_core_tabular(outputs, take_rows, p0)
+        build_core_xml_in(outputs, take_rows, p0)
+        build_core_gtfs(outputs, take_rows, p0)
 
-    build_core_text_to_json_schema(outputs, take_rows, p0)
-    build_core_text_to_json_schema_nested(outputs, take_rows, p0)
-    build_core_text_to_yaml_schema(outputs, take_rows, p0)
-    build_core_text_to_toml_schema(outputs, take_rows, p0)
+        build_core_text_to_json_schema(outputs, take_rows, p0)
+        build_core_text_to_json_schema_nested(outputs, take_rows, p0)
+        build_core_text_to_yaml_schema(outputs, take_rows, p0)
+        build_core_text_to_toml_schema(outputs, take_rows, p0)
 
-    build_pack_hard_mixed(outputs, take_rows, p0)
-    build_core_xml_out(outputs, take_rows, p0)
-    build_core_toml_out(outputs, take_rows, p0)
-    build_core_yaml_out_min(outputs, take_rows, p0)
+        build_pack_hard_mixed(outputs, take_rows, p0)
+        build_core_xml_out(outputs, take_rows, p0)
+        build_core_toml_out(outputs, take_rows, p0)
+        build_core_yaml_out_min(outputs, take_rows, p0)
 
+    finish_progress()
+    print_gate_stats()
+    print_scheduler_stats()
+    print_stage_stats()
+    print_memory_stats(cfg.BUDGET)
     print_report(outputs)
     write_outputs(outputs)
+    write_metrics("build", (cfg,))
 
 
 if __name__ == "__main__":
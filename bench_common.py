@@ -0,0 +1,280 @@
+"""Shared pieces of the offline benchmarks: seeded synthetic rows and results files.
+
+Rows imitate the three streaming sources (shopify products, openfoodfacts
+products, GTFS routes/stops): realistic column names, a mix of short codes,
+numbers, prices, free text with markup-sensitive characters (&, <, quotes,
+commas, newlines), some Japanese text and empty cells. Everything is drawn from
+a `random.Random(seed)` so runs are reproducible and the builders' global
+`random` state is never touched.
+
+Results files are JSON: {"meta": {...}, "results": {case: {metric: value}}}.
+`compare_results` checks one metric of a new file against a baseline.
+"""
+import importlib
+import json
+import os
+import platform
+import random
+import string
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import DEBUG_DIR, MAX_ROWS_PER_SAMPLE, SEED
+
+BENCH_DIR = os.path.join(DEBUG_DIR, "bench")
+
+# builder set name -> module prefix inside the package
+BUILDER_SETS = {"root": "", "20260104": "20260104."}
+
+SOURCE_COLUMNS: Dict[str, List[str]] = {
+    "shopify": [
+        "title", "vendor", "product_type", "handle", "tags", "variant_sku", "variant_price",
+        "variant_grams", "option1_value", "body_html", "image_src", "status",
+    ],
+    "openfoodfacts": [
+        "product_name", "brands", "categories", "countries", "quantity", "ingredients_text",
+        "nutriscore_grade", "energy_100g", "fat_100g", "sugars_100g", "code", "labels",
+    ],
+    "gtfs": [
+        "route_id", "agency_id", "route_short_name", "route_long_name", "route_type",
+        "route_color", "stop_id", "stop_name", "stop_lat", "stop_lon", "trip_id", "service_id",
+    ],
+}
+
+_WORDS = (
+    "organic green tea cotton shirt blue steel widget deluxe classic north station "
+    "line express local harbor market chocolate bar oat milk salt pepper sauce "
+    "central park avenue bridge river valley summit"
+).split()
+_JA = ("東京", "駅前", "緑茶", "有機", "新宿線", "特急", "北口", "限定", "抹茶", "大阪")
+_SPECIAL = ("&", "<b>", "</b>", '"', "'", ",", ";", "\n", "#", ":", "[", "]", "=")
+
+
+class SyntheticRows:
+    """Seeded generator of row blocks shaped like `rows_from_stream` output."""
+
+    def __init__(self, seed: int = 0, empty_rate: float = 0.08, special_rate: float = 0.05, ja_rate: float = 0.1):
+        self.rng = random.Random(seed)
+        self.empty_rate = empty_rate
+        self.special_rate = special_rate
+        self.ja_rate = ja_rate
+        self._n = 0
+
+    def _text(self, n_chars: int) -> str:
+        rng = self.rng
+        parts: List[str] = []
+        size = 0
+        while size < n_chars:
+            r = rng.random()
+            if r < self.ja_rate:
+                w = rng.choice(_JA)
+            elif r < self.ja_rate + self.special_rate:
+                w = rng.choice(_SPECIAL)
+            else:
+                w = rng.choice(_WORDS)
+            parts.append(w)
+            size += len(w) + 1
+        return " ".join(parts)[:n_chars]
+
+    def value(self, col: str, cell_len: int) -> str:
+        rng = self.rng
+        if rng.random() < self.empty_rate:
+            return ""
+        self._n += 1
+        if col.endswith(("_price", "_100g", "_lat", "_lon")):
+            return f"{rng.uniform(-90, 900):.{rng.randint(1, 6)}f}"
+        if col.endswith(("_grams", "_type", "code")):
+            return str(rng.randint(0, 10 ** min(12, max(1, cell_len // 4))))
+        if col.endswith(("_id", "_sku", "_color", "_grade")):
+            return "".join(rng.choice(string.ascii_uppercase + string.digits) for _ in range(min(cell_len, rng.randint(1, 12))))
+        return self._text(max(1, int(cell_len * rng.uniform(0.3, 1.0))))
+
+    def columns(self, source: str, n_attrs: int) -> List[str]:
+        cols = list(SOURCE_COLUMNS.get(source, SOURCE_COLUMNS["shopify"]))
+        while len(cols) < n_attrs:  # wide fixtures: extra generic columns
+            cols.append(f"extra_{len(cols)}")
+        return cols[:n_attrs]
+
+    def block(self, source: str, n_rows: int, n_attrs: int, cell_len: int) -> Tuple[List[Dict[str, str]], List[str]]:
+        cols = self.columns(source, n_attrs)
+        rows = [{c: self.value(c, cell_len) for c in cols} for _ in range(n_rows)]
+        return rows, cols
+
+
+class RowSource:
+    """Offline `take_rows(src)` for the runners: seeded blocks drawn from a fixed pool.
+
+    A pool of `pool` blocks per source is generated up front (rows in
+    [1, rows], `attrs` columns, cells up to `cell_len` chars), so generation
+    cost stays out of the measured builder time. Each call returns a fresh list
+    (the builders shuffle/trim the list they get).
+    """
+
+    def __init__(self, seed: int = 0, rows: int = MAX_ROWS_PER_SAMPLE, attrs: int = 8, cell_len: int = 60, pool: int = 512):
+        gen = SyntheticRows(seed)
+        self.rng = random.Random(seed + 1)
+        self.pools = {
+            src: [gen.block(src, gen.rng.randint(1, max(1, rows)), attrs, cell_len) for _ in range(pool)]
+            for src in SOURCE_COLUMNS
+        }
+        self.calls = 0
+
+    def take_rows(self, src: str):
+        self.calls += 1
+        rows, cols = self.rng.choice(self.pools.get(src) or self.pools["shopify"])
+        return (list(rows), list(cols)), src
+
+
+def load_builders(name: str):
+    """(builders, config) modules of a builder set."""
+    prefix = f"{__package__}.{BUILDER_SETS[name]}"
+    return importlib.import_module(prefix + "builders"), importlib.import_module(prefix + "config")
+
+
+def build_samples(name: str, budget: Dict[str, int], source: "RowSource", seed: int = SEED) -> Dict[str, List[Dict[str, Any]]]:
+    """Samples of one builder set built offline (P0 guard disabled), `budget` per file."""
+    from .format_counters import COUNTERS
+    from .p0_guard import P0Guard
+    from .scheduler import _PACKS
+
+    builders, cfg = load_builders(name)
+    saved = dict(cfg.BUDGET)
+    cfg.BUDGET.update({k: int(budget.get(k, 0)) for k in cfg.BUDGET})
+    builders._SEEN_IDS.clear()
+    COUNTERS.reset()
+    random.seed(seed)
+    outputs = builders.make_outputs_dict()
+    p0 = P0Guard(disabled=True)
+    try:
+        for spec in _PACKS:
+            if cfg.BUDGET.get(spec.fname, 0) > 0 and hasattr(builders, spec.builder):
+                getattr(builders, spec.builder)(outputs, source.take_rows, p0)
+    finally:
+        cfg.BUDGET.clear()
+        cfg.BUDGET.update(saved)
+        builders._SEEN_IDS.clear()
+    return outputs
+
+
+def make_guard(tokenizer: str = "", chat_template: str = ""):
+    """P0Guard on a local tokenizer (see local_tokenizer), or disabled when `tokenizer` is empty."""
+    from .p0_guard import P0Guard
+
+    if not tokenizer:
+        return P0Guard(disabled=True)
+    from .local_tokenizer import load_local_tokenizer
+
+    return P0Guard(tokenizer=load_local_tokenizer(tokenizer, chat_template))
+
+
+def scale_budget(budget: Dict[str, int], total: int) -> Dict[str, int]:
+    """`budget` rescaled to about `total` samples, keeping each file's share (at least 1)."""
+    base = sum(v for v in budget.values() if v > 0) or 1
+    return {k: max(1, round(v * total / base)) if v > 0 else 0 for k, v in budget.items()}
+
+
+class PeakRss:
+    """Background sampler of the resident set size; `mark()` starts a new window."""
+
+    def __init__(self, interval_ms: int = 50):
+        from .memprofile import rss_bytes
+
+        self._rss = rss_bytes
+        self.interval = max(0.005, interval_ms / 1000.0)
+        self.peak = self.window_peak = rss_bytes()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "PeakRss":
+        self._thread = threading.Thread(target=self._loop, name="bench-rss", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.sample()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> int:
+        rss = self._rss()
+        self.peak = max(self.peak, rss)
+        self.window_peak = max(self.window_peak, rss)
+        return rss
+
+    def mark(self) -> int:
+        """Close the current window: return its peak and start the next one at the current RSS."""
+        peak = max(self.window_peak, self._rss())
+        self.window_peak = self._rss()
+        return peak
+
+
+# ---------------------------------------------------------------------------
+# Results files
+# ---------------------------------------------------------------------------
+
+def bench_meta(**extra: Any) -> Dict[str, Any]:
+    return {
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        **extra,
+    }
+
+
+def save_results(path: str, meta: Dict[str, Any], results: Dict[str, Dict[str, Any]]) -> str:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results}, f, ensure_ascii=False, indent=2)
+    print("[bench] results:", path)
+    return path
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_results(
+    base: Dict[str, Any],
+    new: Dict[str, Any],
+    metric: str,
+    threshold: float,
+    higher_is_better: bool = False,
+) -> List[str]:
+    """Print the change of `metric` per case; return the cases that regressed by more than `threshold`."""
+    regressions = []
+    b_res, n_res = base.get("results", {}), new.get("results", {})
+    for case in sorted(set(b_res) & set(n_res)):
+        b, n = b_res[case].get(metric), n_res[case].get(metric)
+        if not b or n is None:
+            continue
+        change = (n - b) / b
+        worse = -change if higher_is_better else change
+        flag = ""
+        if worse > threshold:
+            flag = "  REGRESSION"
+            regressions.append(case)
+        print(f"- {case}: {b:.4g} -> {n:.4g} {metric} ({100 * change:+.1f}%){flag}")
+    for case in sorted(set(n_res) - set(b_res)):
+        print(f"- {case}: new case")
+    return regressions
+
+
+def check_baseline(baseline: Optional[str], new: Dict[str, Any], metric: str, threshold: float, higher_is_better: bool = False) -> bool:
+    """Compare against a baseline file if given; True when nothing regressed."""
+    if not baseline:
+        return True
+    print(f"\nBaseline {baseline} ({metric}, threshold {threshold:.0%}):")
+    bad = compare_results(load_results(baseline), new, metric, threshold, higher_is_better)
+    if bad:
+        print(f"{len(bad)} case(s) regressed beyond {threshold:.0%}")
+    return not bad
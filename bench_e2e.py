@@ -0,0 +1,195 @@
+"""End-to-end throughput benchmark of the builders (offline).
+
+Usage:
+  python -m sft_builder.bench_e2e [--builders root|20260104|both] [--samples 1000]
+                                  [--rows N] [--attrs N] [--cell-len N] [--drop-outputs]
+                                  [--tokenizer PATH] [--chat-template PATH]
+                                  [--out PATH] [--baseline PATH] [--threshold 0.15]
+
+Every pack of the root and/or 20260104 builders is run in the order of the
+scheduler's pack table, against a seeded `RowSource` (synthetic shopify /
+openfoodfacts / GTFS blocks) with the P0 guard disabled, or on a local tokenizer
+with --tokenizer (see local_tokenizer). BUDGET is rescaled to
+about --samples samples per builder set (1k .. 1M), keeping each file's share.
+
+Per pack: accepted samples, samples/s (wall), CPU seconds (process time,
+including the inline gate's workers), peak RSS while the pack ran and its
+growth, attempts per accepted sample, reject rate and the top reject reasons.
+`<set>:total` sums each set. Samples stay in memory for the whole set, as in a
+real run, unless --drop-outputs frees each pack once measured.
+
+Results go to `_debug/bench/e2e.json` (or --out). With --baseline, samples/s
+per case is compared to that file and the exit status is 1 when any case is
+slower by more than --threshold.
+"""
+import argparse
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from . import progress
+from .bench_common import (
+    BENCH_DIR,
+    PeakRss,
+    RowSource,
+    bench_meta,
+    check_baseline,
+    load_builders,
+    make_guard,
+    save_results,
+    scale_budget,
+)
+from .config import CHAT_TEMPLATE_FILE, INLINE_GATE, MAX_ROWS_PER_SAMPLE, SEED, TOKENIZER_FILE
+from .format_counters import COUNTERS
+from .scheduler import _PACKS
+
+OUT_PATH = f"{BENCH_DIR}/e2e.json"
+
+
+def _mb(n: float) -> float:
+    return round(n / (1024 * 1024), 1)
+
+
+def run_set(
+    name: str,
+    samples: int,
+    source: RowSource,
+    rss: PeakRss,
+    seed: int = SEED,
+    drop_outputs: bool = False,
+    tokenizer: str = "",
+    chat_template: str = "",
+) -> Dict[str, Dict[str, Any]]:
+    """Run every pack of one builder set at ~`samples` total; return per-pack results."""
+    builders, cfg = load_builders(name)
+    saved = dict(cfg.BUDGET)
+    budget = scale_budget(cfg.BUDGET, samples)
+    cfg.BUDGET.update(budget)
+    builders._SEEN_IDS.clear()
+    COUNTERS.reset()
+    random.seed(seed)
+    outputs = builders.make_outputs_dict()
+    p0 = make_guard(tokenizer, chat_template)
+    tracker = progress._TRACKER = progress.ProgressTracker(budget, interval=0.0)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    total = {"samples": 0, "attempts": 0, "rejects": 0, "wall_s": 0.0, "cpu_s": 0.0, "rows_calls": 0}
+    try:
+        for spec in _PACKS:
+            if budget.get(spec.fname, 0) <= 0 or not hasattr(builders, spec.builder):
+                continue
+            rss.mark()
+            rss_enter = rss.sample()
+            calls0 = source.calls
+            c0, t0 = time.process_time(), time.perf_counter()
+            getattr(builders, spec.builder)(outputs, source.take_rows, p0)
+            wall, cpu = time.perf_counter() - t0, time.process_time() - c0
+            peak = rss.mark()
+            tracker.close()
+
+            p = tracker.packs[spec.fname]
+            n = len(outputs[spec.fname])
+            rejects = sum(p.rejects.values())
+            top = sorted(tracker.cost.get(spec.fname, {}).items(), key=lambda kv: -kv[1][0])
+            results[f"{name}:{spec.fname}"] = {
+                "samples": n,
+                "samples_per_s": round(n / wall, 1) if wall > 0 else None,
+                "wall_s": round(wall, 3),
+                "cpu_s": round(cpu, 3),
+                "cpu_ms_per_sample": round(1000.0 * cpu / n, 3) if n else None,
+                "peak_rss_mb": _mb(peak),
+                "rss_growth_mb": _mb(max(0, peak - rss_enter)),
+                "attempts": p.attempts,
+                "attempts_per_accept": round(p.attempts / n, 3) if n else None,
+                "reject_rate": round(rejects / p.attempts, 4) if p.attempts else 0.0,
+                "rejects": {k: int(c) for k, (c, _) in top if k != "accepted"},
+                "rows_calls": source.calls - calls0,
+            }
+            total["samples"] += n
+            total["attempts"] += p.attempts
+            total["rejects"] += rejects
+            total["wall_s"] += wall
+            total["cpu_s"] += cpu
+            total["rows_calls"] += source.calls - calls0
+            if drop_outputs:
+                outputs[spec.fname].clear()
+                builders._SEEN_IDS.pop(spec.fname, None)
+    finally:
+        cfg.BUDGET.clear()
+        cfg.BUDGET.update(saved)
+        progress._TRACKER = None
+
+    wall, cpu, n = total["wall_s"], total["cpu_s"], total["samples"]
+    results[f"{name}:total"] = {
+        "samples": n,
+        "samples_per_s": round(n / wall, 1) if wall > 0 else None,
+        "wall_s": round(wall, 3),
+        "cpu_s": round(cpu, 3),
+        "cpu_ms_per_sample": round(1000.0 * cpu / n, 3) if n else None,
+        "peak_rss_mb": _mb(rss.peak),
+        "attempts": total["attempts"],
+        "attempts_per_accept": round(total["attempts"] / n, 3) if n else None,
+        "reject_rate": round(total["rejects"] / total["attempts"], 4) if total["attempts"] else 0.0,
+        "rows_calls": total["rows_calls"],
+    }
+    return results
+
+
+def _print(results: Dict[str, Dict[str, Any]]) -> None:
+    print(f"{'case':<56} {'samples':>8} {'/s':>9} {'cpu_s':>8} {'ms/smp':>7} {'peakMB':>7} {'+MB':>6} {'att/acc':>7} {'rej%':>6}  top rejects")
+    for case, r in results.items():
+        top = " ".join(f"{k}={v}" for k, v in list(r.get("rejects", {}).items())[:3])
+        print(
+            f"{case:<56} {r['samples']:>8} {r['samples_per_s'] or 0:>9.1f} {r['cpu_s']:>8.2f} "
+            f"{r['cpu_ms_per_sample'] or 0:>7.2f} {r['peak_rss_mb']:>7.1f} {r.get('rss_growth_mb', 0):>6.1f} "
+            f"{r['attempts_per_accept'] or 0:>7.2f} {100 * r['reject_rate']:>5.1f}%  {top}"
+        )
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="End-to-end builder throughput benchmark (offline).")
+    ap.add_argument("--builders", choices=("root", "20260104", "both"), default="both")
+    ap.add_argument("--samples", type=int, default=1000, help="total samples per builder set (BUDGET rescaled)")
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--rows", type=int, default=MAX_ROWS_PER_SAMPLE, help="max rows per synthetic block")
+    ap.add_argument("--attrs", type=int, default=8, help="columns per synthetic block")
+    ap.add_argument("--cell-len", type=int, default=60, help="max chars per cell")
+    ap.add_argument("--pool", type=int, default=512, help="synthetic blocks per source")
+    ap.add_argument("--tokenizer", default=TOKENIZER_FILE, help="local tokenizer for the P0 guard (default: guard disabled)")
+    ap.add_argument("--chat-template", default=CHAT_TEMPLATE_FILE)
+    ap.add_argument("--drop-outputs", action="store_true", help="free each pack's samples once measured")
+    ap.add_argument("--out", default=OUT_PATH)
+    ap.add_argument("--baseline", default="", help="results file to compare samples_per_s against")
+    ap.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown per case (fraction)")
+    args = ap.parse_args(argv)
+
+    sets = ["root", "20260104"] if args.builders == "both" else [args.builders]
+    results: Dict[str, Dict[str, Any]] = {}
+    with PeakRss() as rss:
+        for name in sets:
+            source = RowSource(args.seed, args.rows, args.attrs, args.cell_len, args.pool)
+            res = run_set(name, args.samples, source, rss, args.seed, args.drop_outputs, args.tokenizer, args.chat_template)
+            _print(res)
+            results.update(res)
+
+    meta = bench_meta(
+        builders=sets,
+        samples=args.samples,
+        seed=args.seed,
+        rows=args.rows,
+        attrs=args.attrs,
+        cell_len=args.cell_len,
+        pool=args.pool,
+        tokenizer=args.tokenizer,
+        drop_outputs=args.drop_outputs,
+        inline_gate=INLINE_GATE,
+    )
+    save_results(args.out, meta, results)
+    new = {"meta": meta, "results": results}
+    if not check_baseline(args.baseline, new, "samples_per_s", args.threshold, higher_is_better=True):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
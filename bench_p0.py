@@ -0,0 +1,133 @@
+"""Offline P0Guard benchmark on a local tokenizer.
+
+Usage:
+  python -m sft_builder.bench_p0 [--tokenizer PATH] [--chat-template PATH] [--vocab 8000]
+                                 [--builders root|20260104|both] [--per-pack 300] [--filter SUBSTR]
+                                 [--min-time S] [--repeat N] [--out PATH] [--baseline PATH] [--threshold 0.15]
+
+For each pack, --per-pack samples are built offline (synthetic rows, guard
+disabled), so the messages follow that pack's real length distribution. Each
+pack's set is then run through `P0Guard.reject_if_0valid` on the tokenizer
+from --tokenizer (default SFT_TOKENIZER_FILE); without one, a byte-level BPE is
+trained locally first on separately seeded samples (local_tokenizer). Nothing
+is downloaded.
+
+Per pack: samples/s and us/sample (best of --repeat calibrated runs, see
+bench_serializers.time_case), tokens/s, the p50/p90/max of characters and full
+token length, and the keep rate. Results go to `_debug/bench/p0.json` (or
+--out); with --baseline, samples/s per pack is compared and the exit status is
+1 when any pack is slower by more than --threshold.
+"""
+import argparse
+import statistics
+import sys
+from typing import Any, Dict, List, Optional
+
+from .bench_common import BENCH_DIR, RowSource, bench_meta, build_samples, check_baseline, load_builders, save_results
+from .bench_serializers import time_case
+from .config import CHAT_TEMPLATE_FILE, MAX_SEQ_LEN, SEED, TOKENIZER_FILE
+from .local_tokenizer import TOKENIZER_DIR, load_local_tokenizer, message_texts, offline_samples, save_tokenizer, train_bpe
+from .p0_guard import P0Guard
+
+OUT_PATH = f"{BENCH_DIR}/p0.json"
+
+
+def _pct(xs: List[int], q: float) -> int:
+    if not xs:
+        return 0
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+
+def _tokenizer(args) -> str:
+    if args.tokenizer:
+        return args.tokenizer
+    samples = offline_samples(args.train_samples, args.seed + 1)
+    out = save_tokenizer(train_bpe(message_texts(samples), args.vocab), TOKENIZER_DIR)
+    print(f"[bench] trained BPE (vocab {args.vocab}) on {len(samples)} offline samples -> {out}")
+    return out
+
+
+def bench_pack(guard: P0Guard, fname: str, samples: List[Dict[str, Any]], min_time: float, repeat: int) -> Dict[str, Any]:
+    """Time reject_if_0valid over one pack's samples."""
+    msgs = [s["messages"] for s in samples]
+    meta = {"pack": fname, "bench": True}
+    full, kept = [], 0
+    for m in msgs:
+        keep, dbg = guard.reject_if_0valid(m, meta)
+        kept += keep
+        full.append(int(dbg.get("full_len", 0)))
+    chars = [sum(len(x.get("content", "")) for x in m) for m in msgs]
+
+    r = time_case(lambda: [guard.reject_if_0valid(m, meta) for m in msgs], min_time, repeat)
+    per = r["us_per_call"] / len(msgs)
+    return {
+        "samples": len(msgs),
+        "samples_per_s": round(1e6 / per, 1) if per > 0 else None,
+        "us_per_sample": round(per, 2),
+        "tokens_per_s": round(1e6 * sum(full) / r["us_per_call"], 1) if r["us_per_call"] > 0 else None,
+        "chars_p50": _pct(chars, 0.5),
+        "chars_p90": _pct(chars, 0.9),
+        "chars_max": max(chars),
+        "tokens_p50": _pct(full, 0.5),
+        "tokens_p90": _pct(full, 0.9),
+        "tokens_max": max(full),
+        "chars_per_token": round(statistics.mean(c / t for c, t in zip(chars, full) if t), 2) if any(full) else None,
+        "keep_rate": round(kept / len(msgs), 4),
+        "loops": r["loops"],
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="P0Guard.reject_if_0valid throughput on a local tokenizer (offline).")
+    ap.add_argument("--tokenizer", default=TOKENIZER_FILE, help="tokenizer.json or directory (default: train a BPE)")
+    ap.add_argument("--chat-template", default=CHAT_TEMPLATE_FILE)
+    ap.add_argument("--vocab", type=int, default=8000, help="vocab size when training a BPE")
+    ap.add_argument("--train-samples", type=int, default=2000, help="offline samples to train the BPE on")
+    ap.add_argument("--builders", choices=("root", "20260104", "both"), default="both")
+    ap.add_argument("--per-pack", type=int, default=300, help="samples per pack")
+    ap.add_argument("--filter", default="", help="only packs whose case name contains this")
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--min-time", type=float, default=0.2, help="seconds per timing run")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--out", default=OUT_PATH)
+    ap.add_argument("--baseline", default="", help="results file to compare samples_per_s against")
+    ap.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown per pack (fraction)")
+    args = ap.parse_args(argv)
+
+    tok_path = _tokenizer(args)
+    guard = P0Guard(tokenizer=load_local_tokenizer(tok_path, args.chat_template))
+    sets = ["root", "20260104"] if args.builders == "both" else [args.builders]
+    results: Dict[str, Dict[str, Any]] = {}
+    print(f"{'case':<56} {'/s':>9} {'us/smp':>9} {'tok/s':>10} {'chars p50/p90':>14} {'tokens p50/p90/max':>19} {'keep':>6}")
+    for name in sets:
+        _, cfg = load_builders(name)
+        budget = {k: args.per_pack for k, v in cfg.BUDGET.items() if v > 0}
+        outputs = build_samples(name, budget, RowSource(args.seed), args.seed)
+        for fname, samples in outputs.items():
+            case = f"{name}:{fname}"
+            if not samples or (args.filter and args.filter not in case):
+                continue
+            r = results[case] = bench_pack(guard, fname, samples, args.min_time, max(1, args.repeat))
+            print(
+                f"{case:<56} {r['samples_per_s'] or 0:>9.1f} {r['us_per_sample']:>9.1f} {r['tokens_per_s'] or 0:>10.0f} "
+                f"{r['chars_p50']:>6}/{r['chars_p90']:<7} {r['tokens_p50']:>6}/{r['tokens_p90']}/{r['tokens_max']:<6} {100 * r['keep_rate']:>5.1f}%"
+            )
+
+    meta = bench_meta(
+        builders=sets,
+        per_pack=args.per_pack,
+        seed=args.seed,
+        tokenizer=tok_path if args.tokenizer else f"trained-bpe:{args.vocab}",
+        chat_template=args.chat_template,
+        max_seq_len=MAX_SEQ_LEN,
+        tokenizer_class=type(guard.tokenizer).__name__,
+    )
+    save_results(args.out, meta, results)
+    new = {"meta": meta, "results": results}
+    if not check_baseline(args.baseline, new, "samples_per_s", args.threshold, higher_is_better=True):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""Scale test: N samples across all packs with RSS and wall-time ceilings (offline).
+
+Usage:
+  python -m sft_builder.bench_scale [--builders root|20260104|both] [--samples 1000000]
+                                    [--checkpoints 20] [--keep-outputs] [--no-validate]
+                                    [--tokenizer PATH] [--chat-template PATH]
+                                    [--max-rss-mb MB] [--max-sec-per-100k S] [--max-growth-mb-per-100k MB]
+
+Like bench_e2e, every pack runs against the seeded `RowSource` with BUDGET
+rescaled to --samples and the P0 guard disabled (or on a local tokenizer with
+--tokenizer, see local_tokenizer). Accepted samples are streamed
+instead of kept: each `outputs[fname]` is replaced by a counter that serializes
+the sample (as write_outputs would) and, unless --no-validate, runs the syntax
+and quality checks of validate_all on it in-stream. --keep-outputs keeps the
+samples in memory as a real run does.
+
+At --checkpoints evenly spaced points the run records RSS, elapsed time and
+the size of every structure that can grow with the dataset: retained samples,
+the builders' `_SEEN_IDS`, the validators' syntax errors / id set / metric
+distributions, the inline gate memo and the log sink buffer. Growth is
+reported per 100k samples from the first checkpoint past 10% of the run to
+the last, so a structure that silently scales with N stands out.
+
+Ceilings (0 = off) make the exit status 1: peak RSS, build seconds per 100k
+samples (in-stream validation excluded) and RSS growth per 100k samples.
+Results go to `_debug/bench/scale.json` (or --out).
+"""
+import argparse
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+from . import progress
+from .bench_common import (
+    BENCH_DIR,
+    PeakRss,
+    RowSource,
+    bench_meta,
+    load_builders,
+    make_guard,
+    save_results,
+    scale_budget,
+)
+from .config import CHAT_TEMPLATE_FILE, MAX_ROWS_PER_SAMPLE, SEED, TOKENIZER_FILE
+from .format_counters import COUNTERS
+from .scheduler import _PACKS
+from .validation_engine import QualityReport, Record, SyntaxReport, _load_line, check_quality, check_syntax
+
+OUT_PATH = f"{BENCH_DIR}/scale.json"
+
+PER = 100_000
+WARMUP = 0.1
+
+
+def _mb(n: float) -> float:
+    return round(n / (1024 * 1024), 1)
+
+
+class _Output:
+    """Stands in for one `outputs[fname]` list: counts samples and hands them to the run."""
+
+    __slots__ = ("fname", "run", "n", "items")
+
+    def __init__(self, fname: str, run: "ScaleRun", keep: bool):
+        self.fname = fname
+        self.run = run
+        self.n = 0
+        self.items: Optional[List[Dict[str, Any]]] = [] if keep else None
+
+    def append(self, s_obj: Dict[str, Any]) -> None:
+        self.n += 1
+        if self.items is not None:
+            self.items.append(s_obj)
+        self.run.on_sample(self.fname, s_obj)
+
+    def __len__(self) -> int:
+        return self.n
+
+
+def _dist_items(q: QualityReport) -> int:
+    """Values held by the quality report's distributions (exact lists or sketch items)."""
+    stats = list(q.dist.values())
+    for groups in (q.by_pack, q.by_subcat):
+        for g in groups.values():
+            stats.extend(g.values())
+    return sum(len(st.values) if st.exact else st.sketch._size() for st in stats)
+
+
+class ScaleRun:
+    def __init__(
+        self,
+        name: str,
+        samples: int,
+        checkpoints: int,
+        rss: PeakRss,
+        keep: bool,
+        validate: bool,
+        tokenizer: str = "",
+        chat_template: str = "",
+    ):
+        self.name = name
+        self.tokenizer = tokenizer
+        self.chat_template = chat_template
+        self.builders, self.cfg = load_builders(name)
+        self.budget = scale_budget(self.cfg.BUDGET, samples)
+        self.total = sum(self.budget.values())
+        self.every = max(1, self.total // max(1, checkpoints))
+        self.rss = rss
+        self.keep = keep
+        self.syn = SyntaxReport() if validate else None
+        self.qual = QualityReport() if validate else None
+        self.outputs: Dict[str, _Output] = {}
+        self.n = 0
+        self.bytes = 0
+        self.validate_s = 0.0
+        self.t0 = 0.0
+        self.timeline: List[Dict[str, Any]] = []
+
+    def on_sample(self, fname: str, s_obj: Dict[str, Any]) -> None:
+        self.n += 1
+        line = orjson.dumps(s_obj)
+        self.bytes += len(line) + 1
+        if self.syn is not None:
+            t = time.perf_counter()
+            rec = Record(fname, _load_line(line))
+            self.syn.add(fname, check_syntax(rec))
+            check_quality(rec, self.qual)
+            self.validate_s += time.perf_counter() - t
+        if self.n % self.every == 0:
+            self.checkpoint()
+
+    def sizes(self) -> Dict[str, int]:
+        from . import inline_gate, log_sink
+
+        out = {
+            "retained_samples": sum(len(o.items) for o in self.outputs.values() if o.items is not None),
+            "seen_ids": sum(len(v) for v in self.builders._SEEN_IDS.values()),
+            "gate_memo": len(inline_gate._GATE._memo) if inline_gate._GATE is not None else 0,
+            "log_buffer_bytes": log_sink._SINK._buffered if log_sink._SINK is not None else 0,
+        }
+        if self.syn is not None:
+            out["syntax_errors"] = len(self.syn.errors)
+            out["quality_ids"] = len(self.qual.id_set)
+            out["quality_dist_items"] = _dist_items(self.qual)
+        return out
+
+    def checkpoint(self) -> None:
+        elapsed = time.perf_counter() - self.t0
+        self.timeline.append(
+            {
+                "samples": self.n,
+                "elapsed_s": round(elapsed, 3),
+                "build_s": round(elapsed - self.validate_s, 3),
+                "rss_mb": _mb(self.rss.sample()),
+                "bytes_out": self.bytes,
+                **self.sizes(),
+            }
+        )
+
+    def run(self, source: RowSource, seed: int = SEED) -> Dict[str, Any]:
+        builders, cfg = self.builders, self.cfg
+        saved = dict(cfg.BUDGET)
+        cfg.BUDGET.update(self.budget)
+        builders._SEEN_IDS.clear()
+        COUNTERS.reset()
+        random.seed(seed)
+        self.outputs = {k: _Output(k, self, self.keep) for k in builders.make_outputs_dict()}
+        p0 = make_guard(self.tokenizer, self.chat_template)
+        tracker = progress._TRACKER = progress.ProgressTracker(self.budget, interval=0.0)
+        rss_start = self.rss.sample()
+        self.t0 = time.perf_counter()
+        try:
+            self.checkpoint()
+            for spec in _PACKS:
+                if self.budget.get(spec.fname, 0) > 0 and hasattr(builders, spec.builder):
+                    getattr(builders, spec.builder)(self.outputs, source.take_rows, p0)
+            tracker.close()
+            if self.timeline[-1]["samples"] != self.n:
+                self.checkpoint()
+        finally:
+            cfg.BUDGET.clear()
+            cfg.BUDGET.update(saved)
+            progress._TRACKER = None
+        attempts = sum(p.attempts for p in tracker.packs.values())
+        rejects = sum(sum(p.rejects.values()) for p in tracker.packs.values())
+        return self.summary(rss_start, attempts, rejects)
+
+    def summary(self, rss_start: int, attempts: int, rejects: int) -> Dict[str, Any]:
+        last = self.timeline[-1]
+        warm = next((c for c in self.timeline if c["samples"] >= WARMUP * self.n), self.timeline[0])
+        if warm is last:
+            warm = self.timeline[0]
+        span = max(1, last["samples"] - warm["samples"])
+        growth = {
+            k: round(PER * (last[k] - warm[k]) / span, 1)
+            for k in last
+            if k not in ("samples", "elapsed_s", "build_s")
+        }
+        n = max(1, self.n)
+        return {
+            "samples": self.n,
+            "attempts": attempts,
+            "reject_rate": round(rejects / attempts, 4) if attempts else 0.0,
+            "wall_s": last["elapsed_s"],
+            "build_s": last["build_s"],
+            "validate_s": round(self.validate_s, 3),
+            "build_sec_per_100k": round(PER * last["build_s"] / n, 2),
+            "validate_sec_per_100k": round(PER * self.validate_s / n, 2),
+            "bytes_per_sample": round(self.bytes / n, 1),
+            "rss_start_mb": _mb(rss_start),
+            "peak_rss_mb": _mb(self.rss.peak),
+            "rss_growth_mb_per_100k": growth["rss_mb"],
+            "growth_per_100k": growth,
+            "timeline": self.timeline,
+        }
+
+
+def _print(name: str, r: Dict[str, Any]) -> None:
+    print(f"\n[{name}] {r['samples']} samples in {r['wall_s']:.1f}s (build {r['build_s']:.1f}s, validate {r['validate_s']:.1f}s)")
+    keys = [k for k in r["timeline"][0] if k not in ("samples", "elapsed_s", "build_s", "rss_mb")]
+    print(f"{'samples':>9} {'elapsed':>8} {'rss_mb':>8} " + " ".join(f"{k:>18}" for k in keys))
+    for c in r["timeline"]:
+        print(f"{c['samples']:>9} {c['elapsed_s']:>8.1f} {c['rss_mb']:>8.1f} " + " ".join(f"{c[k]:>18}" for k in keys))
+    print("Growth per 100k samples (after warm-up):")
+    for k, v in r["growth_per_100k"].items():
+        print(f"- {k}: {v:+.1f}MB" if k.endswith("_mb") else f"- {k}: {v:+,.0f}")
+    print(
+        f"build={r['build_sec_per_100k']}s/100k validate={r['validate_sec_per_100k']}s/100k "
+        f"peak_rss={r['peak_rss_mb']}MB reject_rate={100 * r['reject_rate']:.1f}% bytes/sample={r['bytes_per_sample']}"
+    )
+
+
+def check_ceilings(name: str, r: Dict[str, Any], max_rss_mb: float, max_sec: float, max_growth_mb: float) -> List[str]:
+    """Ceilings exceeded by one run (0 disables a ceiling)."""
+    failed = []
+    if max_rss_mb and r["peak_rss_mb"] > max_rss_mb:
+        failed.append(f"{name}: peak RSS {r['peak_rss_mb']}MB > {max_rss_mb}MB")
+    if max_sec and r["build_sec_per_100k"] > max_sec:
+        failed.append(f"{name}: {r['build_sec_per_100k']}s per 100k samples > {max_sec}s")
+    if max_growth_mb and r["rss_growth_mb_per_100k"] > max_growth_mb:
+        failed.append(f"{name}: RSS growth {r['rss_growth_mb_per_100k']}MB per 100k samples > {max_growth_mb}MB")
+    return failed
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Scale test with RSS / wall-time ceilings (offline).")
+    ap.add_argument("--builders", choices=("root", "20260104", "both"), default="both")
+    ap.add_argument("--samples", type=int, default=100_000, help="total samples per builder set (BUDGET rescaled)")
+    ap.add_argument("--checkpoints", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--rows", type=int, default=MAX_ROWS_PER_SAMPLE, help="max rows per synthetic block")
+    ap.add_argument("--attrs", type=int, default=8, help="columns per synthetic block")
+    ap.add_argument("--cell-len", type=int, default=60, help="max chars per cell")
+    ap.add_argument("--pool", type=int, default=512, help="synthetic blocks per source")
+    ap.add_argument("--tokenizer", default=TOKENIZER_FILE, help="local tokenizer for the P0 guard (default: guard disabled)")
+    ap.add_argument("--chat-template", default=CHAT_TEMPLATE_FILE)
+    ap.add_argument("--keep-outputs", action="store_true", help="keep samples in memory like a real run")
+    ap.add_argument("--no-validate", action="store_true", help="skip the in-stream syntax/quality checks")
+    ap.add_argument("--max-rss-mb", type=float, default=0.0, help="ceiling on peak RSS")
+    ap.add_argument("--max-sec-per-100k", type=float, default=0.0, help="ceiling on build seconds per 100k samples")
+    ap.add_argument("--max-growth-mb-per-100k", type=float, default=0.0, help="ceiling on RSS growth per 100k samples")
+    ap.add_argument("--out", default=OUT_PATH)
+    args = ap.parse_args(argv)
+
+    sets = ["root", "20260104"] if args.builders == "both" else [args.builders]
+    results: Dict[str, Dict[str, Any]] = {}
+    failed: List[str] = []
+    with PeakRss() as rss:
+        for name in sets:
+            source = RowSource(args.seed, args.rows, args.attrs, args.cell_len, args.pool)
+            run = ScaleRun(
+                name, args.samples, args.checkpoints, rss, args.keep_outputs, not args.no_validate,
+                args.tokenizer, args.chat_template,
+            )
+            r = results[name] = run.run(source, args.seed)
+            _print(name, r)
+            failed += check_ceilings(name, r, args.max_rss_mb, args.max_sec_per_100k, args.max_growth_mb_per_100k)
+
+    meta = bench_meta(
+        builders=sets,
+        samples=args.samples,
+        seed=args.seed,
+        rows=args.rows,
+        attrs=args.attrs,
+        cell_len=args.cell_len,
+        pool=args.pool,
+        tokenizer=args.tokenizer,
+        keep_outputs=args.keep_outputs,
+        validate=not args.no_validate,
+        ceilings={
+            "max_rss_mb": args.max_rss_mb,
+            "max_sec_per_100k": args.max_sec_per_100k,
+            "max_growth_mb_per_100k": args.max_growth_mb_per_100k,
+        },
+    )
+    save_results(args.out, meta, results)
+    if failed:
+        print("\nCeilings exceeded:")
+        for f in failed:
+            print("-", f)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
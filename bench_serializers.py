@@ -0,0 +1,198 @@
+"""Offline micro-benchmarks for the serializers and validators.
+
+Usage:
+  python -m sft_builder.bench_serializers [--quick] [--filter SUBSTR] [--min-time S] [--repeat N]
+                                          [--out PATH] [--baseline PATH] [--threshold 0.15]
+
+Every serializer (`safe_json_sized`, `get_safe_csv`, `get_safe_xml_input`,
+`dict_to_xml_sized`, `dict_to_toml`, `dict_to_yaml`, `get_safe_structured_data`
+for toml/yaml) and every `validate_*` runs over seeded synthetic rows on a grid
+of rows x attrs x cell length, plus an `oversize` fixture (long column names)
+on which every sizing plan is tried and fails. Each case is timed with a
+calibrated loop count (best of --repeat runs of at least --min-time seconds);
+`plans` records how many sizing plans a sized serializer tried.
+
+Results go to `_debug/bench/serializers.json` (or --out). With --baseline the
+per-call time of each case is compared to that file and the exit status is 1
+when any case is slower by more than --threshold.
+"""
+import argparse
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import orjson
+
+from . import serialization
+from .bench_common import BENCH_DIR, SyntheticRows, bench_meta, check_baseline, save_results
+from .config import MAX_ATTRS, MAX_CELL_CHARS, MAX_INPUT_CHARS, MAX_OUTPUT_CHARS, MAX_ROWS_PER_SAMPLE
+from .serialization import (
+    dict_to_toml,
+    dict_to_xml_sized,
+    dict_to_yaml,
+    get_safe_csv,
+    get_safe_structured_data,
+    get_safe_xml_input,
+    rows_to_csv,
+    rows_to_xml_input,
+    safe_json_sized,
+)
+from .validators import (
+    validate_csv,
+    validate_json_schema_flat,
+    validate_json_schema_nested,
+    validate_toml,
+    validate_toml_schema_items,
+    validate_xml,
+    validate_yaml,
+    validate_yaml_schema_flat,
+)
+
+OUT_PATH = f"{BENCH_DIR}/serializers.json"
+
+GRID_ROWS = (1, 5, 40)
+GRID_ATTRS = (3, 8, 24)
+GRID_CELL = (8, 60, 600)
+QUICK = {"rows": (1, 40), "attrs": (3, 24), "cell": (8, 600)}
+
+
+def _fixtures(seed: int, quick: bool) -> List[Tuple[str, List[Dict[str, str]], List[str]]]:
+    gen = SyntheticRows(seed)
+    grid_r, grid_a, grid_c = (QUICK["rows"], QUICK["attrs"], QUICK["cell"]) if quick else (GRID_ROWS, GRID_ATTRS, GRID_CELL)
+    out = []
+    for r in grid_r:
+        for a in grid_a:
+            for c in grid_c:
+                rows, cols = gen.block("shopify", r, a, c)
+                out.append((f"r{r}xa{a}xc{c}", rows, cols))
+    # column names alone exceed the budget: every sizing plan is tried and rejected
+    long_cols = [f"attribute_{i}_" + "x" * (MAX_INPUT_CHARS // 2) for i in range(4)]
+    rows = [{c: gen.value("title", 40) for c in long_cols} for _ in range(3)]
+    out.append(("oversize", rows, long_cols))
+    return out
+
+
+def _nested(rows: List[Dict[str, str]], cols: List[str]) -> Tuple[str, Dict[str, str]]:
+    meta_keys = cols[1:3] or cols[:1]
+    arr = [{"id": r.get(cols[0], ""), "meta": {k: r.get(k, "") for k in meta_keys}, "tags": [r.get(cols[-1], "")]} for r in rows]
+    return orjson.dumps(arr).decode(), {k: "string" for k in meta_keys}
+
+
+def _cases(rows: List[Dict[str, str]], cols: List[str]) -> Dict[str, Callable[[], Any]]:
+    obj = {"items": rows}
+    types = {c: "string" for c in cols}
+    # full-size (unsized) documents for the validators
+    xml_s = rows_to_xml_input(rows)
+    toml_s = dict_to_toml(obj)
+    yaml_s = dict_to_yaml(obj)
+    csv_s = rows_to_csv(rows)
+    flat_s = orjson.dumps(rows).decode()
+    nested_s, meta_types = _nested(rows, cols)
+    yaml_flat_s = dict_to_yaml(rows)
+    return {
+        "safe_json_sized": lambda: safe_json_sized(obj, MAX_INPUT_CHARS),
+        "get_safe_csv": lambda: get_safe_csv(rows, MAX_INPUT_CHARS),
+        "get_safe_xml_input": lambda: get_safe_xml_input(rows, MAX_INPUT_CHARS),
+        "dict_to_xml_sized": lambda: dict_to_xml_sized(obj, root_name="root"),
+        "dict_to_toml": lambda: dict_to_toml(obj),
+        "dict_to_yaml": lambda: dict_to_yaml(obj),
+        "get_safe_structured_data:toml": lambda: get_safe_structured_data(obj, "toml", MAX_OUTPUT_CHARS),
+        "get_safe_structured_data:yaml": lambda: get_safe_structured_data(obj, "yaml", MAX_OUTPUT_CHARS),
+        "validate_xml": lambda: validate_xml(xml_s),
+        "validate_toml": lambda: validate_toml(toml_s),
+        "validate_yaml": lambda: validate_yaml(yaml_s),
+        "validate_csv": lambda: validate_csv(csv_s),
+        "validate_json_schema_flat": lambda: validate_json_schema_flat(flat_s, cols, types),
+        "validate_json_schema_nested": lambda: validate_json_schema_nested(nested_s, "string", meta_types),
+        "validate_yaml_schema_flat": lambda: validate_yaml_schema_flat(yaml_flat_s, cols, types),
+        "validate_toml_schema_items": lambda: validate_toml_schema_items(toml_s, cols, types),
+    }
+
+
+def _plans_tried(fn: Callable[[], Any]) -> int:
+    """Number of sizing plans `fn` walks through (calls to _shrink_obj_for_output)."""
+    orig = serialization._shrink_obj_for_output
+    n = 0
+
+    def counting(*args, **kwargs):
+        nonlocal n
+        n += 1
+        return orig(*args, **kwargs)
+
+    serialization._shrink_obj_for_output = counting
+    try:
+        fn()
+    finally:
+        serialization._shrink_obj_for_output = orig
+    return n
+
+
+def time_case(fn: Callable[[], Any], min_time: float, repeat: int) -> Dict[str, Any]:
+    """Calibrate a loop count to `min_time`, then take `repeat` timings."""
+    loops = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        dt = time.perf_counter() - t0
+        if dt >= min_time or loops >= 1 << 20:
+            break
+        loops = max(loops * 2, int(loops * min_time / max(dt, 1e-9)))
+    runs = [dt / loops]
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        runs.append((time.perf_counter() - t0) / loops)
+    return {"us_per_call": round(1e6 * min(runs), 3), "us_median": round(1e6 * statistics.median(runs), 3), "loops": loops}
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Serializer / validator micro-benchmarks (offline).")
+    ap.add_argument("--quick", action="store_true", help="corners of the grid only")
+    ap.add_argument("--filter", default="", help="only cases whose name contains this")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--min-time", type=float, default=0.05, help="seconds per timing run")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--out", default=OUT_PATH)
+    ap.add_argument("--baseline", default="", help="results file to compare us_per_call against")
+    ap.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown per case (fraction)")
+    args = ap.parse_args(argv)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for fixture, rows, cols in _fixtures(args.seed, args.quick):
+        for name, fn in _cases(rows, cols).items():
+            case = f"{name}[{fixture}]"
+            if args.filter and args.filter not in case:
+                continue
+            out = fn()
+            r = time_case(fn, args.min_time, max(1, args.repeat))
+            if isinstance(out, str):
+                r["out_len"] = len(out)
+                r["plans"] = _plans_tried(fn)
+            else:
+                r["ok"] = bool(out)
+            results[case] = r
+            extra = f" out_len={r['out_len']} plans={r['plans']}" if "out_len" in r else f" ok={r['ok']}"
+            print(f"{case:<60} {r['us_per_call']:>12.1f} us{extra}")
+
+    meta = bench_meta(
+        seed=args.seed,
+        quick=args.quick,
+        limits={
+            "MAX_ROWS_PER_SAMPLE": MAX_ROWS_PER_SAMPLE,
+            "MAX_ATTRS": MAX_ATTRS,
+            "MAX_CELL_CHARS": MAX_CELL_CHARS,
+            "MAX_INPUT_CHARS": MAX_INPUT_CHARS,
+            "MAX_OUTPUT_CHARS": MAX_OUTPUT_CHARS,
+        },
+    )
+    save_results(args.out, meta, results)
+    new = {"meta": meta, "results": results}
+    if not check_baseline(args.baseline, new, "us_per_call", args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -26,8 +26,12 @@ from .config import (
     TOML_OUT_PROBS,
     YAML_OUT_PROBS,
     EXTRACT_MIN_FILLED,
+    SOURCE_PAYLOAD,
 )
+from .format_counters import record as record_format
+from .inline_gate import gated_append
 from .p0_guard import P0Guard
+from .progress import note_accept, note_attempt, note_reject
 
 # In-run uniqueness tracking: file name -> set of seen sample ids
 _SEEN_IDS: Dict[str, set] = {}
@@ -50,21 +54,39 @@ from .prompts import (
     prompt_json_to_yaml,
 )
 from .serialization import (
+    clip_items,
     dict_to_toml,
     dict_to_xml_sized,
     dict_to_yaml,
     get_safe_csv,
+    get_safe_csv_with_rows,
     get_safe_structured_data,
+    get_safe_structured_data_with_obj,
     get_safe_xml_input,
-    safe_json_sized,
+    safe_json_sized_with_obj,
     rows_to_csv,
     rows_to_text,
 )
-from .utils import now_ms, sha1, append_jsonl, norm
+from .utils import now_ms, sha1, append_jsonl, encode_source, norm
 from .validators import validate_xml, validate_toml, validate_yaml
 
 
-def sample(cat: str, sub: str, task: str, prompt: str, answer: str, seed: Any, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+def sample(
+    cat: str,
+    sub: str,
+    task: str,
+    prompt: str,
+    answer: str,
+    seed: Any,
+    extra: Optional[Dict[str, Any]] = None,
+    source: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Build one chat sample.
+
+    `source` is the structured input behind the prompt ({"fmt", "attrs",
+    "data"}), with `data` as the prompt shows it after sizing/clipping; it is
+    stored only when SOURCE_PAYLOAD is enabled.
+    """
     if answer is None or (isinstance(answer, str) and len(answer) == 0):
         raise ValueError("sample(): empty answer is not allowed")
     obj = {
@@ -80,12 +102,15 @@ def sample(cat: str, sub: str, task: str, prompt: str, answer: str, seed: Any, e
     }
     if extra:
         obj.update(extra)
+    if source is not None and SOURCE_PAYLOAD:
+        obj["source"] = encode_source(source)
     return obj
 
 
 def append_with_p0(outputs: Dict[str, List[Dict[str, Any]]], fname: str, s_obj: Dict[str, Any], meta: Dict[str, Any], p0: P0Guard) -> bool:
-    keep, _ = p0.reject_if_0valid(s_obj["messages"], sample_meta=meta)
+    keep, dbg = p0.reject_if_0valid(s_obj["messages"], sample_meta=meta)
     if not keep:
+        note_reject(fname, "p0", dbg.get("reason", ""))
         return False
     # Generation-time uniqueness: skip if this id already seen for the target file
     rid = s_obj.get("id")
@@ -98,13 +123,45 @@ def append_with_p0(outputs: Dict[str, List[Dict[str, Any]]], fname: str, s_obj:
             rid = None
     seen = _SEEN_IDS.setdefault(fname, set())
     if rid is not None and rid in seen:
+        note_reject(fname, "dedup")
         return False
     if rid is not None:
         seen.add(rid)
     outputs[fname].append(s_obj)
+    record_format(fname, s_obj)
+    note_accept(fname)
     return True
 
 
+def append_checked(
+    outputs: Dict[str, List[Dict[str, Any]]],
+    fname: str,
+    s_obj: Dict[str, Any],
+    meta: Dict[str, Any],
+    p0: P0Guard,
+    source: Optional[Dict[str, Any]] = None,
+) -> None:
+    """append_with_p0 behind the inline round-trip gate (SFT_INLINE_GATE)."""
+    gated_append(
+        fname,
+        s_obj,
+        source,
+        lambda: append_with_p0(outputs, fname, s_obj, meta, p0),
+        room=lambda: BUDGET[fname] - len(outputs[fname]),
+    )
+
+
+def _output_reason(ans: Any) -> str:
+    """Reject reason for an answer that failed the size/syntax check."""
+    return "size" if (not ans) or len(ans) > MAX_OUTPUT_CHARS else "validation"
+
+
+def _reject_output(fname: str, fmt: str, ans: Any) -> None:
+    """note_reject for a failed answer, detailed as `<fmt>_empty/_oversize/_invalid`."""
+    kind = "empty" if not ans else ("oversize" if len(ans) > MAX_OUTPUT_CHARS else "invalid")
+    note_reject(fname, _output_reason(ans), f"{fmt}_{kind}")
+
+
 def _random_trim_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     if not rows:
         return rows
@@ -177,6 +234,7 @@ def _pick_attrs(cols: List[str], rows: List[Dict[str, Any]]) -> List[str]:
 def build_core_tabular(outputs, take_rows, p0: P0Guard):
     target = BUDGET["sft_core_c_tabular.jsonl"]
     while len(outputs["sft_core_c_tabular.jsonl"]) < target:
+        note_attempt("sft_core_c_tabular.jsonl")
         (rows, cols), seed = take_rows(random.choice(["shopify", "openfoodfacts"]))
         rows = _random_trim_rows(rows)
         cols = list(cols) if cols else []
@@ -208,31 +266,37 @@ def build_core_tabular(outputs, take_rows, p0: P0Guard):
             rows = _diversify_values(rows)
             rows_for_io = _ensure_rows_have_keys(rows, attrs)
             js_obj = {"items": [{a: r.get(a, "") for a in attrs} for r in rows_for_io]}
-            js = safe_json_sized(js_obj, MAX_INPUT_CHARS)
+            js, js_shown = safe_json_sized_with_obj(js_obj, MAX_INPUT_CHARS)
             p = prompt_json_to_csv(js)
-            rows_for_csv = [{a: r.get(a, "") for a in attrs} for r in rows_for_io]
+            rows_for_csv = js_shown.get("items", [])
             ans = get_safe_csv(rows_for_csv, MAX_OUTPUT_CHARS)
             if not ans:
+                note_reject("sft_core_c_tabular.jsonl", "size", "csv_empty")
                 continue
-            s = sample("C2", "json_to_csv", "transform", p, ans, seed)
+            src = {"fmt": "json", "attrs": attrs, "data": rows_for_csv}
+            s = sample("C2", "json_to_csv", "transform", p, ans, seed, source=src)
         else:
             # CSV -> JSON (extract)
             rows = _diversify_values(rows, protect_keys=attrs, allow_empty=False)
             # 抽出系の品質ゲート（部分的空値許容: SFT_EXTRACT_MIN_FILLED）
             rows_for_in = _filter_rows_min_filled(rows, attrs, min_filled=EXTRACT_MIN_FILLED)
             if not rows_for_in:
+                note_reject("sft_core_c_tabular.jsonl", "empty", "min_filled")
                 continue
-            p = prompt_csv_to_json(get_safe_csv(rows_for_in, MAX_INPUT_CHARS), attrs)
+            csv_in, csv_shown = get_safe_csv_with_rows(rows_for_in, MAX_INPUT_CHARS)
+            p = prompt_csv_to_json(csv_in, attrs)
             ans_obj = [{a: r.get(a, "") for a in attrs} for r in rows_for_in]
             ans = orjson.dumps(ans_obj).decode()
-            s = sample("C1", "csv_to_json", "extract", p, ans, seed)
+            src = {"fmt": "csv", "attrs": attrs, "data": csv_shown}
+            s = sample("C1", "csv_to_json", "extract", p, ans, seed, source=src)
 
-        append_with_p0(outputs, "sft_core_c_tabular.jsonl", s, meta={"pack": "tabular", "seed": seed, "subcategory": s["subcategory"]}, p0=p0)
+        append_checked(outputs, "sft_core_c_tabular.jsonl", s, meta={"pack": "tabular", "seed": seed, "subcategory": s["subcategory"]}, p0=p0, source=src)
 
 
 def build_core_xml_in(outputs, take_rows, p0: P0Guard):
     target = BUDGET["sft_core_c_xml_in.jsonl"]
     while len(outputs["sft_core_c_xml_in.jsonl"]) < target:
+        note_attempt("sft_core_c_xml_in.jsonl")
         (rows, cols), seed = take_rows("openfoodfacts")
         rows = _random_trim_rows(rows)
         attrs = _pick_attrs(cols, rows)
@@ -240,32 +304,36 @@ def build_core_xml_in(outputs, take_rows, p0: P0Guard):
         rows = _filter_rows_min_filled(rows, attrs, min_filled=EXTRACT_MIN_FILLED)
         xml_in = get_safe_xml_input(rows, MAX_INPUT_CHARS)
         if not xml_in:
+            note_reject("sft_core_c_xml_in.jsonl", "empty", "xml_input" if rows else "min_filled")
             continue
         p = prompt_xml_to_json(xml_in, attrs)
         ans = orjson.dumps([{a: r.get(a, "") for a in attrs} for r in rows]).decode()
-        s = sample("C3", "xml_to_json", "extract", p, ans, seed)
+        s = sample("C3", "xml_to_json", "extract", p, ans, seed, source={"fmt": "xml", "attrs": attrs, "data": rows})
         append_with_p0(outputs, "sft_core_c_xml_in.jsonl", s, meta={"pack": "xml_in", "seed": seed, "subcategory": s["subcategory"]}, p0=p0)
 
 
 def build_core_gtfs(outputs, take_rows, p0: P0Guard):
     target = BUDGET["sft_core_g_gtfs.jsonl"]
     while len(outputs["sft_core_g_gtfs.jsonl"]) < target:
+        note_attempt("sft_core_g_gtfs.jsonl")
         (rows, cols), seed = take_rows("gtfs")
         rows = _random_trim_rows(rows)
         attrs = _pick_attrs(cols, rows)
         rows = _diversify_values(rows, protect_keys=attrs, allow_empty=False)
         rows = _filter_rows_min_filled(rows, attrs, min_filled=EXTRACT_MIN_FILLED)
         if not rows:
+            note_reject("sft_core_g_gtfs.jsonl", "empty", "min_filled")
             continue
         p = prompt_text_to_json(rows_to_text(rows), attrs)
         ans = orjson.dumps([{a: r.get(a, "") for a in attrs} for r in rows]).decode()
-        s = sample("G", "text_to_json", "extract", p, ans, seed)
+        s = sample("G", "text_to_json", "extract", p, ans, seed, source={"fmt": "text", "attrs": attrs, "data": rows})
         append_with_p0(outputs, "sft_core_g_gtfs.jsonl", s, meta={"pack": "gtfs", "seed": seed, "subcategory": s["subcategory"]}, p0=p0)
 
 
 def build_pack_hard_mixed(outputs, take_rows, p0: P0Guard):
     target = BUDGET["sft_pack_hard_mixed.jsonl"]
     while len(outputs["sft_pack_hard_mixed.jsonl"]) < target:
+        note_attempt("sft_pack_hard_mixed.jsonl")
         (g_rows, _), g_seed = take_rows("gtfs")
         (p_rows, _), p_seed = take_rows("shopify")
         # Basic diversification: shuffle and trim rows lightly
@@ -304,7 +372,8 @@ def build_pack_hard_mixed(outputs, take_rows, p0: P0Guard):
             chosen = p_rows[:nsel]
         ans = orjson.dumps(chosen).decode()
         seed = f"{g_seed}+{p_seed}"
-        s = sample("GC", "constraint_to_json", "filter", p, ans, seed)
+        src = {"fmt": "text", "data": {"constraint": constraint, "transit": g_rows, "products": p_rows}}
+        s = sample("GC", "constraint_to_json", "filter", p, ans, seed, source=src)
         append_with_p0(outputs, "sft_pack_hard_mixed.jsonl", s, meta={"pack": "hard_mixed", "seed": seed, "subcategory": s["subcategory"]}, p0=p0)
 
 
@@ -321,46 +390,58 @@ def build_core_xml_out(outputs, take_rows, p0: P0Guard):
     attempts = 0
     failures = 0
     while len(outputs["sft_core_c_xml_out.jsonl"]) < target:
+        note_attempt("sft_core_c_xml_out.jsonl")
         attempts += 1
         (rows, cols), seed = take_rows(random.choice(["shopify", "openfoodfacts", "gtfs"]))
         rows = _random_trim_rows(rows)
         rows = _diversify_values(rows)
         attrs = _pick_attrs(cols, rows)
-        obj = {"items": [{a: r.get(a, "") for a in attrs} for r in rows]}
+        obj = clip_items({"items": [{a: r.get(a, "") for a in attrs} for r in rows]})
         r = random.random()
         cut_json = XML_OUT_PROBS.get("json", 0.0)
         cut_yaml = cut_json + XML_OUT_PROBS.get("yaml", 0.0)
         cut_csv  = cut_yaml + XML_OUT_PROBS.get("csv", 0.0)
+        # The object the prompt shows after sizing: answers are built from it and
+        # round-trip checks (inline gate, validate_quality) compare against it
+        shown = obj
 
         if r < cut_json:
-            js = safe_json_sized(obj, MAX_INPUT_CHARS)
+            js, shown = safe_json_sized_with_obj(obj, MAX_INPUT_CHARS)
             p = prompt_json_to_xml(js)
-            ans = dict_to_xml_sized(obj, root_name="root")
+            ans = dict_to_xml_sized(shown, root_name="root")
             sub, task = "json_to_xml", "transform"
         elif r < cut_yaml:
-            yml = get_safe_structured_data(obj, "yaml", MAX_INPUT_CHARS)
+            yml, shown = get_safe_structured_data_with_obj(obj, "yaml", MAX_INPUT_CHARS)
             if not yml:
                 failures += 1
+                note_reject("sft_core_c_xml_out.jsonl", "size", "yaml_input_oversize")
                 continue
             p = prompt_yaml_to_xml(yml)
-            ans = dict_to_xml_sized(obj, root_name="root")
+            ans = dict_to_xml_sized(shown, root_name="root")
             sub, task = "yaml_to_xml", "transform"
         elif r < cut_csv:
-            csv_in = get_safe_csv(obj["items"], MAX_INPUT_CHARS)
+            csv_in, csv_shown = get_safe_csv_with_rows(obj["items"], MAX_INPUT_CHARS)
             if not csv_in:
                 failures += 1
+                note_reject("sft_core_c_xml_out.jsonl", "size", "csv_input_oversize")
                 continue
+            shown = {"items": csv_shown}
             p = prompt_csv_to_xml(csv_in)
-            ans = dict_to_xml_sized(obj, root_name="root")
+            ans = dict_to_xml_sized(shown, root_name="root")
             sub, task = "csv_to_xml", "transform"
         else:
             text_in = rows_to_text(obj["items"])
             p = prompt_text_to_xml(text_in, attrs)
-            ans = dict_to_xml_sized(obj, root_name="root")
+            ans = dict_to_xml_sized(shown, root_name="root")
             sub, task = "text_to_xml", "extract"
 
+        if not shown.get("items"):  # sizing fell back to an empty object
+            failures += 1
+            note_reject("sft_core_c_xml_out.jsonl", "size", "empty_after_sizing")
+            continue
         if not validate_xml(ans) or len(ans) > MAX_OUTPUT_CHARS:
             failures += 1
+            _reject_output("sft_core_c_xml_out.jsonl", "xml", ans)
             _dump_xml_failure(
                 {
                     "ts_ms": now_ms(),
@@ -376,8 +457,9 @@ def build_core_xml_out(outputs, take_rows, p0: P0Guard):
             )
             continue
 
-        s = sample("C_XML", sub, task, p, ans, seed)
-        append_with_p0(outputs, "sft_core_c_xml_out.jsonl", s, meta={"pack": "xml_out", "seed": seed, "subcategory": sub}, p0=p0)
+        src = {"fmt": sub.split("_to_")[0], "attrs": attrs, "data": shown}
+        s = sample("C_XML", sub, task, p, ans, seed, source=src)
+        append_checked(outputs, "sft_core_c_xml_out.jsonl", s, meta={"pack": "xml_out", "seed": seed, "subcategory": sub}, p0=p0, source=src)
 
 
 def build_core_toml_out(outputs, take_rows, p0: P0Guard):
@@ -385,63 +467,78 @@ def build_core_toml_out(outputs, take_rows, p0: P0Guard):
     attempts = 0
     failures = 0
     while len(outputs["sft_core_c_toml_out.jsonl"]) < target:
+        note_attempt("sft_core_c_toml_out.jsonl")
         attempts += 1
         (rows, cols), seed = take_rows(random.choice(["shopify", "openfoodfacts", "gtfs"]))
         rows = _random_trim_rows(rows)
         rows = _diversify_values(rows)
         attrs = _pick_attrs(cols, rows)
-        obj = {"items": [{a: r.get(a, "") for a in attrs} for r in rows]}
+        obj = clip_items({"items": [{a: r.get(a, "") for a in attrs} for r in rows]})
         r = random.random()
         cut_json = TOML_OUT_PROBS.get("json", 0.0)
         cut_yaml = cut_json + TOML_OUT_PROBS.get("yaml", 0.0)
         cut_text = cut_yaml + TOML_OUT_PROBS.get("text", 0.0)
+        # The object the prompt shows after sizing: answers are built from it and
+        # round-trip checks (inline gate, validate_quality) compare against it
+        shown = obj
 
         if r < cut_json:
-            js = safe_json_sized(obj, MAX_INPUT_CHARS)
-            ans = dict_to_toml(obj)
+            js, shown = safe_json_sized_with_obj(obj, MAX_INPUT_CHARS)
+            if not shown.get("items"):  # sizing fell back to an empty object
+                failures += 1
+                note_reject("sft_core_c_toml_out.jsonl", "size", "empty_after_sizing")
+                continue
+            ans = dict_to_toml(shown)
             p = prompt_json_to_toml(js)
             sub, task = "json_to_toml", "transform"
 
             if (not validate_toml(ans)) or (len(ans) > MAX_OUTPUT_CHARS):
                 failures += 1
+                _reject_output("sft_core_c_toml_out.jsonl", "toml", ans)
                 _dump_toml_failure({"ts_ms": now_ms(), "pack": "toml_out", "seed": seed, "subcategory": sub, "attempt": attempts, "len_ans": len(ans)})
                 continue
 
-            s = sample("C_TOML", sub, task, p, ans, seed)
-            append_with_p0(outputs, "sft_core_c_toml_out.jsonl", s, meta={"pack": "toml_out", "seed": seed, "subcategory": sub}, p0=p0)
+            src = {"fmt": sub.split("_to_")[0], "attrs": attrs, "data": shown}
+            s = sample("C_TOML", sub, task, p, ans, seed, source=src)
+            append_checked(outputs, "sft_core_c_toml_out.jsonl", s, meta={"pack": "toml_out", "seed": seed, "subcategory": sub}, p0=p0, source=src)
 
         elif r < cut_yaml:
             yml = dict_to_yaml(obj)
-            ans = dict_to_toml(obj)
+            ans = dict_to_toml(shown)
             p = prompt_yaml_to_toml(yml)
             sub, task = "yaml_to_toml", "transform"
 
             if (not validate_toml(ans)) or (len(ans) > MAX_OUTPUT_CHARS):
                 failures += 1
+                _reject_output("sft_core_c_toml_out.jsonl", "toml", ans)
                 _dump_toml_failure({"ts_ms": now_ms(), "pack": "toml_out", "seed": seed, "subcategory": sub, "attempt": attempts, "len_ans": len(ans)})
                 continue
 
-            s = sample("C_TOML", sub, task, p, ans, seed)
-            append_with_p0(outputs, "sft_core_c_toml_out.jsonl", s, meta={"pack": "toml_out", "seed": seed, "subcategory": sub}, p0=p0)
+            src = {"fmt": sub.split("_to_")[0], "attrs": attrs, "data": shown}
+            s = sample("C_TOML", sub, task, p, ans, seed, source=src)
+            append_checked(outputs, "sft_core_c_toml_out.jsonl", s, meta={"pack": "toml_out", "seed": seed, "subcategory": sub}, p0=p0, source=src)
 
         elif r < cut_text:
             text_in = rows_to_text(obj["items"])
-            ans = dict_to_toml(obj)
+            ans = dict_to_toml(shown)
             p = prompt_text_to_toml(text_in, attrs)
             sub, task = "text_to_toml", "extract"
 
             if (not validate_toml(ans)) or (len(ans) > MAX_OUTPUT_CHARS):
                 failures += 1
+                _reject_output("sft_core_c_toml_out.jsonl", "toml", ans)
                 _dump_toml_failure({"ts_ms": now_ms(), "pack": "toml_out", "seed": seed, "subcategory": sub, "attempt": attempts, "len_ans": len(ans)})
                 continue
 
-            s = sample("C_TOML", sub, task, p, ans, seed)
-            append_with_p0(outputs, "sft_core_c_toml_out.jsonl", s, meta={"pack": "toml_out", "seed": seed, "subcategory": sub}, p0=p0)
+            src = {"fmt": sub.split("_to_")[0], "attrs": attrs, "data": shown}
+            s = sample("C_TOML", sub, task, p, ans, seed, source=src)
+            append_checked(outputs, "sft_core_c_toml_out.jsonl", s, meta={"pack": "toml_out", "seed": seed, "subcategory": sub}, p0=p0, source=src)
 
         else:
-            toml_s = get_safe_structured_data(obj, "toml", MAX_INPUT_CHARS)
+            toml_s, shown = get_safe_structured_data_with_obj(obj, "toml", MAX_INPUT_CHARS)
             if not toml_s:
                 failures += 1
+                note_reject("sft_core_c_toml_out.jsonl", "size", "toml_input_oversize")
                 _dump_toml_failure({"ts_ms": now_ms(), "pack": "toml_out", "seed": seed, "subcategory": "toml_to_json", "attempt": attempts, "reason": "toml_gen_or_size_failed"})
                 continue
 
@@ -456,8 +553,9 @@ def build_core_toml_out(outputs, take_rows, p0: P0Guard):
             ans = orjson.dumps(parsed).decode()
             sub, task = "toml_to_json", "transform"
 
-            s = sample("C_TOML", sub, task, p, ans, seed)
-            append_with_p0(outputs, "sft_core_c_toml_out.jsonl", s, meta={"pack": "toml_out", "seed": seed, "subcategory": sub}, p0=p0)
+            src = {"fmt": sub.split("_to_")[0], "attrs": attrs, "data": shown}
+            s = sample("C_TOML", sub, task, p, ans, seed, source=src)
+            append_checked(outputs, "sft_core_c_toml_out.jsonl", s, meta={"pack": "toml_out", "seed": seed, "subcategory": sub}, p0=p0, source=src)
 
 
 def build_core_yaml_out_min(outputs, take_rows, p0: P0Guard):
@@ -465,46 +563,58 @@ def build_core_yaml_out_min(outputs, take_rows, p0: P0Guard):
     attempts = 0
     failures = 0
     while len(outputs["sft_core_c_yaml_out_min.jsonl"]) < target:
+        note_attempt("sft_core_c_yaml_out_min.jsonl")
         attempts += 1
         (rows, cols), seed = take_rows(random.choice(["shopify", "openfoodfacts", "gtfs"]))
         rows = _random_trim_rows(rows)
         rows = _diversify_values(rows)
         attrs = _pick_attrs(cols, rows)
-        obj = {"items": [{a: r.get(a, "") for a in attrs} for r in rows]}
+        obj = clip_items({"items": [{a: r.get(a, "") for a in attrs} for r in rows]})
 
         r = random.random()
         cut_xml = YAML_OUT_PROBS.get("xml", 0.0)
         cut_csv = cut_xml + YAML_OUT_PROBS.get("csv", 0.0)
         cut_text = cut_csv + YAML_OUT_PROBS.get("text", 0.0)
+        # The object the prompt shows after sizing: answers are built from it and
+        # round-trip checks (inline gate, validate_quality) compare against it
+        shown = obj
         if r < cut_xml:
             xml_in = dict_to_xml_sized(obj, root_name="root", max_chars=MAX_INPUT_CHARS)
             p = prompt_xml_to_yaml(xml_in)
-            ans = get_safe_structured_data(obj, "yaml", MAX_OUTPUT_CHARS)
+            ans = get_safe_structured_data(shown, "yaml", MAX_OUTPUT_CHARS)
             sub, task = "xml_to_yaml", "transform"
         elif r < cut_csv:
-            csv_in = get_safe_csv(obj["items"], MAX_INPUT_CHARS)
+            csv_in, csv_shown = get_safe_csv_with_rows(obj["items"], MAX_INPUT_CHARS)
             if not csv_in:
+                note_reject("sft_core_c_yaml_out_min.jsonl", "size", "csv_input_oversize")
                 continue
+            shown = {"items": csv_shown}
             p = prompt_csv_to_yaml(csv_in)
-            ans = get_safe_structured_data(obj, "yaml", MAX_OUTPUT_CHARS)
+            ans = get_safe_structured_data(shown, "yaml", MAX_OUTPUT_CHARS)
             sub, task = "csv_to_yaml", "transform"
         elif r < cut_text:
             text_in = rows_to_text(obj["items"])
             p = prompt_text_to_yaml(text_in, attrs)
-            ans = get_safe_structured_data(obj, "yaml", MAX_OUTPUT_CHARS)
+            ans = get_safe_structured_data(shown, "yaml", MAX_OUTPUT_CHARS)
             sub, task = "text_to_yaml", "extract"
         else:
-            js = safe_json_sized(obj, MAX_INPUT_CHARS)
+            js, shown = safe_json_sized_with_obj(obj, MAX_INPUT_CHARS)
             p = prompt_json_to_yaml(js)
-            ans = get_safe_structured_data(obj, "yaml", MAX_OUTPUT_CHARS)
+            ans = get_safe_structured_data(shown, "yaml", MAX_OUTPUT_CHARS)
             sub, task = "json_to_yaml", "transform"
 
+        if not shown.get("items"):  # sizing fell back to an empty object
+            failures += 1
+            note_reject("sft_core_c_yaml_out_min.jsonl", "size", "empty_after_sizing")
+            continue
         if (not ans) or (not validate_yaml(ans)) or (len(ans) > MAX_OUTPUT_CHARS):
             failures += 1
+            _reject_output("sft_core_c_yaml_out_min.jsonl", "yaml", ans)
             continue
 
-        s = sample("C_YAML", sub, task, p, ans, seed)
-        append_with_p0(outputs, "sft_core_c_yaml_out_min.jsonl", s, meta={"pack": "yaml_out_min", "seed": seed, "subcategory": sub}, p0=p0)
+        src = {"fmt": sub.split("_to_")[0], "attrs": attrs, "data": shown}
+        s = sample("C_YAML", sub, task, p, ans, seed, source=src)
+        append_checked(outputs, "sft_core_c_yaml_out_min.jsonl", s, meta={"pack": "yaml_out_min", "seed": seed, "subcategory": sub}, p0=p0, source=src)
 
 
 def make_outputs_dict():
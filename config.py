@@ -143,3 +143,109 @@ YAML_OUT_PROBS = _normalize_probs({
     "text": _float_env("SFT_YAML_OUT_PROB_TEXT", 0.20),
     "json": _float_env("SFT_YAML_OUT_PROB_JSON", 0.10),
 })
+
+# Streaming ingestion: background prefetch of row blocks (per source)
+PREFETCH_ENABLE = _as_bool(os.environ.get("SFT_PREFETCH_ENABLE", "1"), True)
+# Max blocks buffered per source queue
+PREFETCH_DEPTH = _int_env("SFT_PREFETCH_DEPTH", 64)
+# Seconds a builder waits for a block before giving up on the source
+PREFETCH_TIMEOUT_S = _float_env("SFT_PREFETCH_TIMEOUT_S", 300.0)
+
+# Streaming ingestion: rows pulled per batch for columnar extraction (0 = per-row path, the default)
+ROWS_BATCH_SIZE = _int_env("SFT_ROWS_BATCH_SIZE", 0)
+
+# Streaming ingestion: seeded shuffle buffer over extracted rows (0 = file order, the default)
+SHUFFLE_BUFFER_ROWS = _int_env("SFT_SHUFFLE_BUFFER_ROWS", 0)
+SHUFFLE_MAX_MB = _float_env("SFT_SHUFFLE_MAX_MB", 64.0)
+# Optional upstream shuffling: IterableDataset.shuffle buffer (raw rows) and
+# seeded random-order reading of N shards per dataset, each row once (0/1 = off)
+SHUFFLE_HF_BUFFER = _int_env("SFT_SHUFFLE_HF_BUFFER", 0)
+SHUFFLE_INTERLEAVE_SHARDS = _int_env("SFT_SHUFFLE_INTERLEAVE_SHARDS", 0)
+
+# OpenFoodFacts: shard workers per config, merged into that config's prefetch queue
+# (1 = serial, the default; ignored with SFT_PREFETCH_ENABLE=0, which reads each config
+# directly). With >1 the merge order follows thread timing, so runs are not reproducible.
+OFF_SHARD_WORKERS = _int_env("SFT_OFF_SHARD_WORKERS", 1)
+
+# Streaming ingestion: choose SAFE_COLS per block by fill rate instead of from
+# the first row only; blocks with no column at/above the threshold are dropped (off by default)
+ADAPTIVE_COLS = _as_bool(os.environ.get("SFT_ADAPTIVE_COLS", "0"), False)
+COL_MIN_FILL = _float_env("SFT_COL_MIN_FILL", 0.6)
+
+# Validation: process-pool workers and chunk size for validate_outputs (1 = serial)
+VALIDATE_WORKERS = _int_env("SFT_VALIDATE_WORKERS", 1)
+VALIDATE_CHUNK_MB = _float_env("SFT_VALIDATE_CHUNK_MB", 8.0)
+
+# Validation cache: per-record outcomes keyed by line hash + validator version
+VALIDATE_CACHE = _as_bool(os.environ.get("SFT_VALIDATE_CACHE", "1"), True)
+VALIDATE_CACHE_PATH = os.environ.get("SFT_VALIDATE_CACHE_PATH", os.path.join(DEBUG_DIR, "validation_cache.sqlite"))
+# Eviction: rows not seen for this many days are dropped after each run, and
+# each table is capped at this many rows (oldest first)
+VALIDATE_CACHE_MAX_AGE_DAYS = _float_env("SFT_VALIDATE_CACHE_MAX_AGE_DAYS", 30.0)
+VALIDATE_CACHE_MAX_ROWS = _int_env("SFT_VALIDATE_CACHE_MAX_ROWS", 5_000_000)
+
+# validate_quality distributions: streaming KLL sketch size, or keep every value
+QUALITY_EXACT = _as_bool(os.environ.get("SFT_QUALITY_EXACT", "0"), False)
+QUALITY_SKETCH_K = _int_env("SFT_QUALITY_SKETCH_K", 200)
+
+# Store each sample's structured input (format/attrs/rows) as a compact JSON
+# string in an optional `source` field, so quality checks need no prompt re-parsing
+SOURCE_PAYLOAD = _as_bool(os.environ.get("SFT_SOURCE_PAYLOAD", "0"), False)
+
+# Inline round-trip gate in the builders (checks before append_with_p0)
+INLINE_GATE = _as_bool(os.environ.get("SFT_INLINE_GATE", "0"), False)
+INLINE_GATE_WORKERS = _int_env("SFT_INLINE_GATE_WORKERS", 4)
+INLINE_GATE_MAX_INFLIGHT = _int_env("SFT_INLINE_GATE_MAX_INFLIGHT", 64)
+INLINE_GATE_MEMO = _int_env("SFT_INLINE_GATE_MEMO", 65536)
+
+# Adaptive pack scheduler: interleave builders one accepted sample at a time,
+# steering packs/modes toward DESIRED_OUTPUT_COUNTS x FOCUS_MULTIPLIER.
+# Each pack ends within [MIN_SCALE, MAX_SCALE] x its BUDGET; the total is unchanged.
+SCHEDULER = _as_bool(os.environ.get("SFT_SCHEDULER", "0"), False)
+SCHED_MIN_SCALE = _float_env("SFT_SCHED_MIN_SCALE", 0.25)
+SCHED_MAX_SCALE = _float_env("SFT_SCHED_MAX_SCALE", 2.0)
+
+# Builder progress telemetry: refresh interval (0 = final summary only) and
+# seconds without an accepted sample before a pack is flagged as stalled
+PROGRESS = _as_bool(os.environ.get("SFT_PROGRESS", "1"), True)
+PROGRESS_INTERVAL = _float_env("SFT_PROGRESS_INTERVAL", 10.0)
+PROGRESS_STALL_SEC = _float_env("SFT_PROGRESS_STALL_SEC", 60.0)
+
+# Builder stage timers (per pack / subcategory), and opt-in cProfile + stack
+# sampling per pack written under _debug/profile (implies stage timers)
+STAGE_TIMERS = _as_bool(os.environ.get("SFT_STAGE_TIMERS", "0"), False)
+PROFILE = _as_bool(os.environ.get("SFT_PROFILE", "0"), False)
+PROFILE_SAMPLE_MS = _float_env("SFT_PROFILE_SAMPLE_MS", 5.0)
+
+# Machine-readable run metrics (_debug/metrics/<kind>-<run_id>.json), an optional
+# Prometheus textfile (<kind>.prom), and the run id they are keyed by
+METRICS = _as_bool(os.environ.get("SFT_METRICS", "1"), True)
+METRICS_PROM = _as_bool(os.environ.get("SFT_METRICS_PROM", "0"), False)
+RUN_ID = os.environ.get("SFT_RUN_ID", "")
+
+# Buffered debug/reject log sink: background flush interval, buffer cap,
+# size-based rotation (0 = never) and per-log sampling (fraction of records kept)
+LOG_SINK = _as_bool(os.environ.get("SFT_LOG_SINK", "1"), True)
+LOG_FLUSH_SEC = _float_env("SFT_LOG_FLUSH_SEC", 1.0)
+LOG_BUFFER_MB = _float_env("SFT_LOG_BUFFER_MB", 4.0)
+LOG_ROTATE_MB = _float_env("SFT_LOG_ROTATE_MB", 256.0)
+LOG_ROTATE_KEEP = _int_env("SFT_LOG_ROTATE_KEEP", 3)
+LOG_SAMPLE = {
+    os.path.basename(XML_FAIL_LOG): _float_env("SFT_XML_FAIL_LOG_SAMPLE", 1.0),
+    os.path.basename(TOML_FAIL_LOG): _float_env("SFT_TOML_FAIL_LOG_SAMPLE", 1.0),
+    os.path.basename(REJECT_LOG): _float_env("SFT_REJECT_LOG_SAMPLE", 1.0),
+}
+
+# Opt-in memory profiling: tracemalloc snapshots at pack boundaries and every
+# INTERVAL seconds, peak RSS per pack (sampled every RSS_MS), bytes per sample
+MEMPROFILE = _as_bool(os.environ.get("SFT_MEMPROFILE", "0"), False)
+MEMPROFILE_INTERVAL = _float_env("SFT_MEMPROFILE_INTERVAL", 30.0)
+MEMPROFILE_RSS_MS = _float_env("SFT_MEMPROFILE_RSS_MS", 200.0)
+MEMPROFILE_TOP = _int_env("SFT_MEMPROFILE_TOP", 10)
+MEMPROFILE_FRAMES = _int_env("SFT_MEMPROFILE_FRAMES", 1)
+
+# Offline P0 tokenizer: a local tokenizer.json (or a directory of tokenizer
+# files) and a chat template file (jinja, or a tokenizer_config.json carrying
+# "chat_template"); the hub is never contacted when TOKENIZER_FILE is set
+TOKENIZER_FILE = os.environ.get("SFT_TOKENIZER_FILE", "")
+CHAT_TEMPLATE_FILE = os.environ.get("SFT_CHAT_TEMPLATE_FILE", "")
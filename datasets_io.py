@@ -1,11 +1,28 @@
 """Colab/Network-only: load streaming datasets from HuggingFace."""
 import random
+import threading
+from collections import Counter
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
-from datasets import get_dataset_config_names, get_dataset_split_names, load_dataset
+import pyarrow as pa
+import pyarrow.compute as pc
+from datasets import get_dataset_config_names, get_dataset_split_names, interleave_datasets, load_dataset
 
-from .config import MAX_CELL_CHARS, MAX_ROWS_PER_SAMPLE, SAFE_COLS
+from .config import (
+    ADAPTIVE_COLS,
+    COL_MIN_FILL,
+    MAX_CELL_CHARS,
+    MAX_ROWS_PER_SAMPLE,
+    ROWS_BATCH_SIZE,
+    SAFE_COLS,
+    SEED,
+    SHUFFLE_BUFFER_ROWS,
+    SHUFFLE_HF_BUFFER,
+    SHUFFLE_INTERLEAVE_SHARDS,
+    SHUFFLE_MAX_MB,
+)
 from .utils import norm
 
 
@@ -14,12 +31,51 @@ def _pick_split(name: str, config: Optional[str] = None) -> str:
     return "train" if "train" in splits else splits[0]
 
 
+def _interleave_shards(ds, n: int, seed: int):
+    """Read `n` shards in a seeded random order, each row exactly once.
+
+    The default "first_exhausted" strategy stops at the end of the shortest
+    shard and "all_exhausted" repeats the shorter ones, so both distort the
+    stream; `seed` only has an effect together with `probabilities`.
+    """
+    shards = [ds.shard(num_shards=n, index=i) for i in range(n)]
+    try:
+        return interleave_datasets(
+            shards, probabilities=[1.0 / n] * n, seed=seed, stopping_strategy="all_exhausted_without_replacement"
+        )
+    except ValueError:
+        # Older `datasets` without that strategy: keep file order rather than drop or repeat rows
+        print("[ingest] shard interleaving needs a newer `datasets`; reading shards in file order")
+        return ds
+
+
+def shuffle_stream(ds, seed: int, buffer_size: int = SHUFFLE_HF_BUFFER, interleave_shards: int = SHUFFLE_INTERLEAVE_SHARDS):
+    """Optional upstream decorrelation: interleave shards, then HF shuffle buffer."""
+    n_shards = getattr(ds, "num_shards", None) or getattr(ds, "n_shards", 1) or 1
+    n = min(max(0, interleave_shards), n_shards)
+    if n > 1 and hasattr(ds, "shard"):
+        ds = _interleave_shards(ds, n, seed)
+    if buffer_size > 0 and hasattr(ds, "shuffle"):
+        ds = ds.shuffle(seed=seed, buffer_size=buffer_size)
+    return ds
+
+
+def shard_stream(ds, n: int) -> List[Any]:
+    """Split a streaming dataset into up to `n` shards (by data files)."""
+    n_shards = getattr(ds, "num_shards", None) or getattr(ds, "n_shards", 1) or 1
+    n = min(max(1, n), n_shards)
+    if n <= 1 or not hasattr(ds, "shard"):
+        return [ds]
+    return [ds.shard(num_shards=n, index=i) for i in range(n)]
+
+
 def load_streams(seed: int = 42):
     random.seed(seed)
 
     # Shopify
     shopify_split = _pick_split("Shopify/product-catalogue")
     ds_shopify = load_dataset("Shopify/product-catalogue", split=shopify_split, streaming=True)
+    ds_shopify = shuffle_stream(ds_shopify, seed)
 
     # OpenFoodFacts (config REQUIRED)
     OFF_NAME = "openfoodfacts/product-database"
@@ -30,11 +86,12 @@ def load_streams(seed: int = 42):
     ds_off = {}
     for cfg in off_cfgs_use:
         sp = _pick_split(OFF_NAME, cfg)
-        ds_off[cfg] = load_dataset(OFF_NAME, cfg, split=sp, streaming=True)
+        ds_off[cfg] = shuffle_stream(load_dataset(OFF_NAME, cfg, split=sp, streaming=True), seed)
 
     # GTFS
     gtfs_split = _pick_split("ontologicalapple/vrts-gtfs-archive")
     ds_gtfs = load_dataset("ontologicalapple/vrts-gtfs-archive", split=gtfs_split, streaming=True)
+    ds_gtfs = shuffle_stream(ds_gtfs, seed)
 
     return {
         "shopify": (ds_shopify, SAFE_COLS["shopify"]),
@@ -53,26 +110,218 @@ def pick_cols(row: Dict[str, Any], preferred: List[str]) -> List[str]:
     return cols
 
 
-def rows_from_stream(ds, pref_cols) -> Iterable[Tuple[List[Dict[str, str]], List[str]]]:
-    buf: List[Dict[str, str]] = []
-    cols: Optional[List[str]] = None
+def _cell_to_str(v: Any) -> str:
+    if isinstance(v, dict):
+        keys = list(v.keys())[:3]
+        v = {k: v.get(k, "") for k in keys}
+    return str(norm(v))[:MAX_CELL_CHARS]
+
+
+def _extract_rows(ds, pref_cols, adaptive: bool = False) -> Iterable[Tuple[Dict[str, str], List[str], Any]]:
+    """Per-row path: one HF row at a time.
 
+    Yields (row, cols, fill_mask). With `adaptive`, every preferred column is
+    extracted and the mask marks non-empty cells; otherwise cols come from the
+    first usable row and the mask is None.
+    """
+    cols: Optional[List[str]] = list(pref_cols) if adaptive else None
     for r in ds:
         if cols is None:
-            cols = pick_cols(r, pref_cols)
-            if not cols:
+            # Skip leading rows with no usable column (and pick again on the next one)
+            cols = pick_cols(r, pref_cols) or None
+            if cols is None:
                 continue
+        rr = {c: _cell_to_str(r.get(c, "")) for c in cols}
+        yield rr, cols, ([v != "" for v in rr.values()] if adaptive else None)
+
+
+# Same character set as Python's `\s` on str (RE2's `\s` is ASCII-only), so the
+# columnar path normalizes exactly like `norm()`. Only runs that are not
+# already a single space are rewritten, which keeps the common case cheap.
+_WS_CHARS = "".join(chr(c) for c in range(0x3001) if chr(c).isspace())
+_WS_CLASS = "[" + "".join("\\x{%x}" % ord(c) for c in _WS_CHARS) + "]"
+_WS_NONSPACE = "[" + "".join("\\x{%x}" % ord(c) for c in _WS_CHARS if c != " ") + "]"
+_WS_FIX_RE2 = f"{_WS_CLASS}*{_WS_NONSPACE}{_WS_CLASS}*| {{2,}}"
+
+
+def _norm_arrow(arr):
+    arr = pc.replace_substring_regex(arr, pattern=_WS_FIX_RE2, replacement=" ")
+    return pc.utf8_trim(arr, characters=" ")
+
+
+def _norm_clip_column(vals) -> List[str]:
+    """Normalize + clip a whole column; mirrors `_cell_to_str` per cell."""
+    if isinstance(vals, (pa.Array, pa.ChunkedArray)):
+        arr = vals
+    elif all(v is None or type(v) is str for v in vals):
+        arr = pa.array(vals, type=pa.large_string())
+    else:
+        arr = None
+    if arr is not None and (pa.types.is_string(arr.type) or pa.types.is_large_string(arr.type)):
+        # Normalize only a prefix: whitespace collapsing keeps the prefix's
+        # result a prefix of the full result, so it is exact whenever it still
+        # yields more than MAX_CELL_CHARS; the remaining cells are redone in full.
+        head_n = 2 * MAX_CELL_CHARS
+        head = _norm_arrow(pc.utf8_slice_codeunits(arr, start=0, stop=head_n))
+        redo = pc.and_(
+            pc.greater(pc.utf8_length(arr), head_n),
+            pc.less_equal(pc.utf8_length(head), MAX_CELL_CHARS),
+        )
+        out = pc.fill_null(pc.utf8_slice_codeunits(head, start=0, stop=MAX_CELL_CHARS), "").to_pylist()
+        if pc.any(redo).as_py():
+            idx = pc.indices_nonzero(pc.fill_null(redo, False))
+            full = pc.utf8_slice_codeunits(_norm_arrow(pc.take(arr, idx)), start=0, stop=MAX_CELL_CHARS)
+            for i, v in zip(idx.to_pylist(), full.to_pylist()):
+                out[i] = v
+        return out
+    # Non-string columns (lists, structs, numbers): per-cell fallback
+    if isinstance(vals, (pa.Array, pa.ChunkedArray)):
+        vals = vals.to_pylist()
+    return [_cell_to_str(v) for v in vals]
+
+
+def _iter_batches(ds, batch_size: int):
+    try:
+        it = ds.with_format("arrow").iter(batch_size=batch_size)
+    except Exception:
+        it = ds.iter(batch_size=batch_size)
+    for b in it:
+        if isinstance(b, pa.Table):
+            yield b.num_rows, (lambda c, b=b: b.column(c) if c in b.column_names else None), b
+        else:
+            n = len(next(iter(b.values()))) if b else 0
+            yield n, (lambda c, b=b: b.get(c)), b
+
+
+def _batch_row(b, i: int) -> Dict[str, Any]:
+    if isinstance(b, pa.Table):
+        return b.slice(i, 1).to_pylist()[0]
+    return {k: v[i] for k, v in b.items()}
 
-        rr: Dict[str, str] = {}
+
+def _extract_rows_batched(ds, pref_cols, batch_size: int, adaptive: bool = False) -> Iterable[Tuple[Dict[str, str], List[str], Any]]:
+    """Columnar path: `ds.iter(batch_size=...)`, whole-column normalize/clip.
+
+    Yields the same rows as `_extract_rows`.
+    """
+    cols: Optional[List[str]] = list(pref_cols) if adaptive else None
+    for n, col_of, b in _iter_batches(ds, batch_size):
+        start = 0
+        if cols is None:
+            while start < n:
+                cols = pick_cols(_batch_row(b, start), pref_cols) or None
+                if cols:
+                    break
+                start += 1
+            if cols is None:
+                continue
+        if start >= n:
+            continue
+        columns = []
         for c in cols:
-            v = r.get(c, "")
-            if isinstance(v, dict):
-                keys = list(v.keys())[:3]
-                v = {k: v.get(k, "") for k in keys}
-            rr[c] = str(norm(v))[:MAX_CELL_CHARS]
+            vals = col_of(c)
+            if vals is None:
+                columns.append([""] * (n - start))
+                continue
+            if start:
+                vals = vals.slice(start) if isinstance(vals, (pa.Array, pa.ChunkedArray)) else vals[start:]
+            columns.append(_norm_clip_column(vals))
+        if not adaptive:
+            for cells in zip(*columns):
+                yield dict(zip(cols, cells)), cols, None
+            continue
+        m = n - start
+        fill = np.column_stack([np.fromiter(map(bool, col), dtype=bool, count=m) for col in columns])
+        for cells, mask in zip(zip(*columns), fill):
+            yield dict(zip(cols, cells)), cols, mask
+
+
+def _shuffle_rows(rows, size: int, max_bytes: int, rng: random.Random):
+    """Seeded shuffle buffer bounded by row count and approximate cell bytes."""
+    buf: List[Tuple[Any, int]] = []
+    nbytes = 0
+    for item in rows:
+        b = sum(len(v) for v in item[0].values()) + 64
+        while buf and (len(buf) >= size or nbytes + b > max_bytes):
+            i = rng.randrange(len(buf))
+            buf[i], buf[-1] = buf[-1], buf[i]
+            out, ob = buf.pop()
+            nbytes -= ob
+            yield out
+        buf.append((item, b))
+        nbytes += b
+    rng.shuffle(buf)
+    for out, _ in buf:
+        yield out
+
+
+# Per-block column selection stats (shared by all sources/prefetch workers)
+_BLOCK_STATS_LOCK = threading.Lock()
+_BLOCK_STATS: Dict[str, Any] = {"blocks": 0, "dropped_empty": 0, "cols_selected": 0, "col_counts": Counter()}
+
 
+def _select_block_cols(
+    rows: List[Dict[str, str]], masks: List[Any], cols: List[str], min_fill: float
+) -> Optional[Tuple[List[Dict[str, str]], List[str]]]:
+    """Keep the columns whose fill rate within the block reaches `min_fill`."""
+    rates = np.asarray(masks, dtype=bool).mean(axis=0)
+    keep = [c for c, r in zip(cols, rates) if r >= min_fill]
+    with _BLOCK_STATS_LOCK:
+        _BLOCK_STATS["blocks"] += 1
+        if not keep:
+            _BLOCK_STATS["dropped_empty"] += 1
+        _BLOCK_STATS["cols_selected"] += len(keep)
+        _BLOCK_STATS["col_counts"].update(keep)
+    if not keep:
+        return None
+    return [{c: r[c] for c in keep} for r in rows], keep
+
+
+def block_stats() -> Dict[str, Any]:
+    with _BLOCK_STATS_LOCK:
+        st = dict(_BLOCK_STATS)
+        st["col_counts"] = dict(_BLOCK_STATS["col_counts"])
+    kept = st["blocks"] - st["dropped_empty"]
+    st["drop_rate"] = round(st["dropped_empty"] / st["blocks"], 4) if st["blocks"] else 0.0
+    st["mean_cols"] = round(st["cols_selected"] / kept, 2) if kept else 0.0
+    return st
+
+
+def print_block_stats() -> None:
+    st = block_stats()
+    if not st["blocks"]:
+        return
+    print("\n[ingest] per-block column selection:", st)
+
+
+def rows_from_stream(
+    ds,
+    pref_cols,
+    batch_size: int = ROWS_BATCH_SIZE,
+    shuffle_size: int = SHUFFLE_BUFFER_ROWS,
+    seed: Optional[int] = None,
+    adaptive_cols: bool = ADAPTIVE_COLS,
+    min_fill: float = COL_MIN_FILL,
+) -> Iterable[Tuple[List[Dict[str, str]], List[str]]]:
+    if batch_size > 0 and hasattr(ds, "iter"):
+        rows = _extract_rows_batched(ds, pref_cols, batch_size, adaptive=adaptive_cols)
+    else:
+        rows = _extract_rows(ds, pref_cols, adaptive=adaptive_cols)
+    if shuffle_size > 1:
+        rng = random.Random(SEED if seed is None else seed)
+        rows = _shuffle_rows(rows, shuffle_size, int(SHUFFLE_MAX_MB * 1024 * 1024), rng)
+
+    buf: List[Dict[str, str]] = []
+    masks: List[Any] = []
+    for rr, cols, mask in rows:
         buf.append(rr)
+        masks.append(mask)
         if len(buf) >= MAX_ROWS_PER_SAMPLE:
-            yield buf, cols
+            if not adaptive_cols:
+                yield buf, cols
+            else:
+                block = _select_block_cols(buf, masks, cols, min_fill)
+                if block is not None:
+                    yield block
             buf = []
-
+            masks = []
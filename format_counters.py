@@ -0,0 +1,72 @@
+"""Output-format counters maintained at append time.
+
+`append_with_p0` records every accepted sample here (per file: output format
+and subcategory), so `print_report` reads counts instead of re-running format
+detection over every sample in memory. The format of a subcategory that names
+it (`*_to_<fmt>`) is resolved once; only the remaining subcategories fall back
+to the answer-based detection, once per sample. Counters are saved next to the
+outputs (`_debug/format_counters.json`) by write_outputs and can be loaded
+back for reporting without the samples.
+"""
+import json
+import os
+from typing import Any, Dict, Optional
+
+from .config import DEBUG_DIR
+from .report import detect_output_format_from_answer, detect_output_format_from_subcategory
+
+COUNTERS_PATH = os.path.join(DEBUG_DIR, "format_counters.json")
+
+
+class FormatCounters:
+    def __init__(self) -> None:
+        self.formats: Dict[str, Dict[str, int]] = {}
+        self.subcategories: Dict[str, Dict[str, int]] = {}
+        self._sub_fmt: Dict[str, Optional[str]] = {}
+
+    def add(self, fname: str, s_obj: Dict[str, Any]) -> str:
+        sub = s_obj.get("subcategory", "")
+        key = sub if isinstance(sub, str) else ""
+        if key not in self._sub_fmt:
+            self._sub_fmt[key] = detect_output_format_from_subcategory(sub)
+        fmt = self._sub_fmt[key]
+        if fmt is None:
+            msgs = s_obj.get("messages", [])
+            ans = msgs[-1].get("content", "") if isinstance(msgs, list) and msgs else ""
+            fmt = detect_output_format_from_answer(ans)
+        d = self.formats.setdefault(fname, {})
+        d[fmt] = d.get(fmt, 0) + 1
+        d = self.subcategories.setdefault(fname, {})
+        d[key] = d.get(key, 0) + 1
+        return fmt
+
+    def total(self, fname: str) -> int:
+        return sum(self.formats.get(fname, {}).values())
+
+    def reset(self) -> None:
+        self.formats.clear()
+        self.subcategories.clear()
+
+    def save(self, path: str = COUNTERS_PATH) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"formats": self.formats, "subcategories": self.subcategories}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = COUNTERS_PATH) -> "FormatCounters":
+        c = cls()
+        with open(path, "r", encoding="utf-8") as f:
+            d = json.load(f)
+        c.formats = {k: dict(v) for k, v in d.get("formats", {}).items()}
+        c.subcategories = {k: dict(v) for k, v in d.get("subcategories", {}).items()}
+        return c
+
+
+# Process-wide counters fed by the builders' append path
+COUNTERS = FormatCounters()
+
+
+def record(fname: str, s_obj: Dict[str, Any]) -> None:
+    COUNTERS.add(fname, s_obj)
@@ -0,0 +1,176 @@
+"""Inline round-trip quality gate for the builders.
+
+With INLINE_GATE enabled, samples whose subcategory has a round-trip check in
+validate_quality (toml/json/yaml/xml/csv transforms) are checked against their
+structured input before `append_with_p0`, so failing samples never take
+budget. Checks run on a small thread pool (lxml parses without the GIL) and
+verdicts are memoized by sha1(subcategory, input object, answer).
+
+Pending samples are resolved strictly in submission order per output file,
+and never more than the remaining budget, so the output is identical to
+checking each sample synchronously.
+"""
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+import orjson
+
+from .config import INLINE_GATE, INLINE_GATE_MAX_INFLIGHT, INLINE_GATE_MEMO, INLINE_GATE_WORKERS
+from .progress import defer_attempt, note_reject, resolve_deferred
+
+ROUNDTRIP_SUBCATS = frozenset(
+    {
+        "json_to_csv",
+        "toml_to_json",
+        "json_to_toml",
+        "yaml_to_toml",
+        "json_to_yaml",
+        "json_to_xml",
+        "yaml_to_xml",
+        "csv_to_xml",
+    }
+)
+
+
+def _done(value: Any) -> Future:
+    fut: Future = Future()
+    fut.set_result(value)
+    return fut
+
+
+class RoundTripGate:
+    def __init__(
+        self,
+        workers: int = INLINE_GATE_WORKERS,
+        max_inflight: int = INLINE_GATE_MAX_INFLIGHT,
+        memo_size: int = INLINE_GATE_MEMO,
+    ):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rt-gate") if workers > 0 else None
+        self.max_inflight = max(1, int(max_inflight))
+        self.memo_size = max(0, int(memo_size))
+        self._memo: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Deque[Tuple[Future, Callable[[], Any], Any]]] = {}
+
+        # Metrics
+        self.checked = 0
+        self.memo_hits = 0
+        self.passed = 0
+        self.rejects: Dict[Tuple[str, str], int] = {}
+
+    def check(self, fname: str, s_obj: Dict[str, Any], source: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Return the round-trip failure reason for a sample, or None if it passes."""
+        # Imported here: the validation engine pulls in pandas/yaml/lxml parsers
+        from .validation_engine import QualityReport, Record, _check_roundtrip
+
+        sub = s_obj.get("subcategory", "")
+        answer = s_obj["messages"][-1].get("content", "")
+        data = source.get("data") if source else s_obj["messages"][0].get("content", "")
+        key = hashlib.sha1(orjson.dumps([sub, data, answer], option=orjson.OPT_SORT_KEYS, default=str)).hexdigest()
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                self.memo_hits += 1
+                return self._memo[key]
+
+        q = QualityReport(exact=True)
+        try:
+            _check_roundtrip(Record(fname, s_obj, source=source), q, answer)
+            reason = q.roundtrip_issues.samples[0]["why"] if q.roundtrip_issues.samples else None
+        except Exception as e:
+            reason = f"exception:{type(e).__name__}"
+
+        with self._lock:
+            self.checked += 1
+            if self.memo_size:
+                self._memo[key] = reason
+                if len(self._memo) > self.memo_size:
+                    self._memo.popitem(last=False)
+        return reason
+
+    def submit(
+        self,
+        fname: str,
+        s_obj: Dict[str, Any],
+        source: Optional[Dict[str, Any]],
+        append: Callable[[], Any],
+        room: Callable[[], int],
+    ) -> None:
+        """Queue a sample; `append` runs once it passes, `room` is the budget left."""
+        if s_obj.get("subcategory") not in ROUNDTRIP_SUBCATS:
+            fut = _done(None)
+        elif self.pool is None:
+            fut = _done(self.check(fname, s_obj, source))
+        else:
+            fut = self.pool.submit(self.check, fname, s_obj, source)
+        self._pending.setdefault(fname, deque()).append((fut, append, defer_attempt(fname)))
+        self.settle(fname, room)
+
+    def settle(self, fname: str, room: Callable[[], int]) -> None:
+        """Resolve finished samples in order, blocking while pending >= remaining budget."""
+        dq = self._pending.get(fname)
+        while dq and (dq[0][0].done() or len(dq) >= max(1, room()) or len(dq) > self.max_inflight):
+            fut, append, attempt = dq.popleft()
+            reason = fut.result()
+            resolve_deferred(attempt)
+            if reason is None:
+                self.passed += 1
+                append()
+            else:
+                k = (fname, reason)
+                self.rejects[k] = self.rejects.get(k, 0) + 1
+                note_reject(fname, "roundtrip", reason)
+            resolve_deferred(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "checked": self.checked,
+            "memo_hits": self.memo_hits,
+            "passed": self.passed,
+            "rejected": sum(self.rejects.values()),
+            "rejects": {f"{f}:{r}": n for (f, r), n in sorted(self.rejects.items())},
+        }
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+
+
+_GATE: Optional[RoundTripGate] = None
+
+
+def get_gate() -> Optional[RoundTripGate]:
+    """Process-wide gate, created on first use; None when INLINE_GATE is off."""
+    global _GATE
+    if _GATE is None and INLINE_GATE:
+        _GATE = RoundTripGate()
+    return _GATE
+
+
+def gated_append(
+    fname: str,
+    s_obj: Dict[str, Any],
+    source: Optional[Dict[str, Any]],
+    append: Callable[[], Any],
+    room: Callable[[], int],
+) -> None:
+    gate = get_gate()
+    if gate is None:
+        append()
+        return
+    gate.submit(fname, s_obj, source, append, room)
+
+
+def print_gate_stats() -> None:
+    if _GATE is None:
+        return
+    print("\n=========================")
+    print("Inline round-trip gate")
+    print("=========================")
+    st = _GATE.stats()
+    print(f"[inline-gate] checked={st['checked']} memo_hits={st['memo_hits']} passed={st['passed']} rejected={st['rejected']}")
+    for k, n in st["rejects"].items():
+        print(f"- {k}: {n}")
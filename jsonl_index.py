@@ -0,0 +1,276 @@
+"""Memory-mapped line index for the output JSONL packs.
+
+Usage:
+  python -m sft_builder.jsonl_index [--rebuild] [--file FILE (--row N | --id ID)]
+
+For each pack the index stores line offsets/lengths, a 64-bit hash of each
+id and a subcategory code in a compact `.idx.npz` sidecar under
+`_debug/index/`. Line boundaries come from a vectorized newline scan of the
+memory-mapped file; ids/subcategories are read with one regex pass over the
+record heads (write_outputs emits `{"id":..,"category":..,"subcategory":..`),
+falling back to a JSON parse only for lines that do not match.
+
+`JsonlIndex` then fetches a line by row in O(1) and by id via a binary search
+over the sorted id hashes, and draws subcategory-stratified row samples for
+sampled validation (`validate_* --sample N`). A sidecar is rebuilt whenever
+the JSONL's size or mtime changed.
+"""
+import argparse
+import hashlib
+import mmap
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import orjson
+
+from .config import DEBUG_DIR, OUT_DIR
+
+INDEX_DIR = os.path.join(DEBUG_DIR, "index")
+_INDEX_VERSION = 1
+
+_HEAD_RE = re.compile(
+    rb'(?m)^\{"id":"((?:[^"\\\n]|\\.)*)"(?:,"category":"(?:[^"\\\n]|\\.)*")?,"subcategory":"((?:[^"\\\n]|\\.)*)"'
+)
+
+
+def _id_hash(rid: Any) -> int:
+    if rid is None:
+        return 0
+    return int.from_bytes(hashlib.blake2b(str(rid).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _json_str(raw: bytes) -> str:
+    return orjson.loads(b'"' + raw + b'"') if b"\\" in raw else raw.decode("utf-8", errors="replace")
+
+
+def sidecar_path(path: str, index_dir: str = INDEX_DIR) -> str:
+    return os.path.join(index_dir, os.path.basename(path) + ".idx.npz")
+
+
+def _line_bounds(buf: np.ndarray):
+    """(starts, lengths) of non-empty lines, from one vectorized newline scan."""
+    nl = np.flatnonzero(buf == 10)
+    starts = np.concatenate(([0], nl + 1)).astype(np.int64)
+    ends = np.concatenate((nl, [buf.size])).astype(np.int64)
+    lengths = ends - starts
+    # drop a trailing '\r' (CRLF files) and empty lines
+    has_cr = np.zeros(lengths.size, dtype=bool)
+    nz = lengths > 0
+    has_cr[nz] = buf[ends[nz] - 1] == 13
+    lengths = lengths - has_cr
+    keep = lengths > 0
+    return starts[keep], lengths[keep]
+
+
+def build_index(path: str, index_dir: str = INDEX_DIR) -> str:
+    """Scan `path` and write its sidecar; returns the sidecar path."""
+    st = os.stat(path)
+    starts = np.zeros(0, dtype=np.int64)
+    lengths = np.zeros(0, dtype=np.int64)
+    id_hash = np.zeros(0, dtype=np.uint64)
+    sub_code = np.zeros(0, dtype=np.uint16)
+    vocab: List[str] = []
+    if st.st_size > 0:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            buf = np.frombuffer(mm, dtype=np.uint8)
+            starts, lengths = _line_bounds(buf)
+            del buf
+            n = starts.size
+            hashes = np.zeros(n, dtype=np.uint64)
+            codes = np.zeros(n, dtype=np.uint16)
+            found = np.zeros(n, dtype=bool)
+            vmap: Dict[str, int] = {}
+
+            def code_of(sub: str) -> int:
+                c = vmap.get(sub)
+                if c is None:
+                    c = vmap[sub] = len(vocab)
+                    vocab.append(sub)
+                return c
+
+            for m in _HEAD_RE.finditer(mm):
+                row = int(np.searchsorted(starts, m.start()))
+                if row >= n or starts[row] != m.start():
+                    continue
+                hashes[row] = _id_hash(_json_str(m.group(1)))
+                codes[row] = code_of(_json_str(m.group(2)))
+                found[row] = True
+            for row in np.flatnonzero(~found):
+                s0, ln = int(starts[row]), int(lengths[row])
+                try:
+                    obj = orjson.loads(mm[s0:s0 + ln])
+                except Exception:
+                    obj = None
+                if not isinstance(obj, dict):
+                    obj = {}
+                hashes[row] = _id_hash(obj.get("id"))
+                sub = obj.get("subcategory", "")
+                codes[row] = code_of(sub if isinstance(sub, str) else str(sub))
+            id_hash, sub_code = hashes, codes
+
+    os.makedirs(index_dir, exist_ok=True)
+    out = sidecar_path(path, index_dir)
+    order = np.argsort(id_hash, kind="stable")
+    tmp = out + ".tmp.npz"
+    np.savez(
+        tmp,
+        meta=np.array([_INDEX_VERSION, st.st_size, st.st_mtime_ns], dtype=np.int64),
+        offsets=starts.astype(np.uint64),
+        lengths=lengths.astype(np.uint32),
+        id_hash=id_hash,
+        id_order=order.astype(np.uint32 if order.size < 2 ** 32 else np.uint64),
+        sub_code=sub_code,
+        vocab=np.frombuffer(orjson.dumps(vocab), dtype=np.uint8),
+    )
+    os.replace(tmp, out)
+    return out
+
+
+class JsonlIndex:
+    """Random access to one JSONL pack through its sidecar index."""
+
+    def __init__(self, path: str, index_dir: str = INDEX_DIR, rebuild: bool = False):
+        self.path = path
+        side = sidecar_path(path, index_dir)
+        if rebuild or not self._fresh(side):
+            build_index(path, index_dir)
+        with np.load(side) as z:
+            self.offsets = z["offsets"]
+            self.lengths = z["lengths"]
+            self.id_hash = z["id_hash"]
+            self.id_order = z["id_order"]
+            self.sub_code = z["sub_code"]
+            self.vocab: List[str] = orjson.loads(z["vocab"].tobytes())
+        self._sorted_hash = self.id_hash[self.id_order]
+        self._f = open(path, "rb")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ) if len(self.offsets) else None
+
+    def _fresh(self, side: str) -> bool:
+        if not os.path.exists(side):
+            return False
+        st = os.stat(self.path)
+        try:
+            with np.load(side) as z:
+                ver, size, mtime = (int(x) for x in z["meta"])
+        except Exception:
+            return False
+        return ver == _INDEX_VERSION and size == st.st_size and mtime == st.st_mtime_ns
+
+    def __len__(self) -> int:
+        return int(self.offsets.size)
+
+    def line(self, row: int) -> bytes:
+        s0 = int(self.offsets[row])
+        return self._mm[s0:s0 + int(self.lengths[row])]
+
+    def get(self, row: int) -> Dict[str, Any]:
+        return orjson.loads(self.line(row))
+
+    def subcategory(self, row: int) -> str:
+        return self.vocab[int(self.sub_code[row])] if self.vocab else ""
+
+    def row_of(self, rid: Any) -> Optional[int]:
+        if rid is None:
+            return None
+        h = np.uint64(_id_hash(rid))
+        lo = int(np.searchsorted(self._sorted_hash, h, side="left"))
+        hi = int(np.searchsorted(self._sorted_hash, h, side="right"))
+        for k in range(lo, hi):
+            row = int(self.id_order[k])
+            try:
+                # A matching hash is only a candidate (64-bit collisions, absent ids): confirm
+                if str(self.get(row).get("id")) == str(rid):
+                    return row
+            except Exception:
+                continue
+        return None
+
+    def get_by_id(self, rid: Any) -> Optional[Dict[str, Any]]:
+        row = self.row_of(rid)
+        return None if row is None else self.get(row)
+
+    def subcategory_counts(self) -> Dict[str, int]:
+        counts = np.bincount(self.sub_code.astype(np.int64), minlength=len(self.vocab))
+        return {self.vocab[i]: int(c) for i, c in enumerate(counts) if c}
+
+    def sample_rows(self, n: int, seed: int = 0) -> np.ndarray:
+        """At most n rows, stratified by subcategory, in file order.
+
+        Allocation is proportional; when n covers every stratum each gets at
+        least one row, taken back from the most over-allocated strata so the
+        total stays within n.
+        """
+        total = len(self)
+        if n >= total:
+            return np.arange(total)
+        rng = np.random.default_rng(seed)
+        codes = self.sub_code.astype(np.int64)
+        counts = np.bincount(codes, minlength=len(self.vocab) or 1)
+        strata = np.flatnonzero(counts)
+        alloc = counts[strata] * n / total
+        take = np.floor(alloc).astype(np.int64)
+        if n >= strata.size:
+            take = np.maximum(take, 1)
+            excess = int(take.sum()) - n
+            over = np.argsort(-(take - alloc), kind="stable")
+            while excess > 0:
+                for i in over:
+                    if excess > 0 and take[i] > 1:
+                        take[i] -= 1
+                        excess -= 1
+        # hand out what is left by largest fractional part
+        left = n - int(take.sum())
+        if left > 0:
+            frac = np.argsort(-(alloc - np.floor(alloc)), kind="stable")
+            for i in frac[:left]:
+                take[i] += 1
+        take = np.minimum(take, counts[strata])
+        picked = []
+        for code, k in zip(strata, take):
+            if k > 0:
+                rows = np.flatnonzero(codes == code)
+                picked.append(rng.choice(rows, size=int(k), replace=False))
+        return np.sort(np.concatenate(picked)) if picked else np.zeros(0, dtype=np.int64)
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+        self._f.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    from .validation_engine import FILES
+
+    ap = argparse.ArgumentParser(description="Build/refresh JSONL line indexes and fetch records.")
+    ap.add_argument("--rebuild", action="store_true", help="rebuild sidecars even if fresh")
+    ap.add_argument("--file", help="pack file name under OUT_DIR to fetch from")
+    which = ap.add_mutually_exclusive_group()
+    which.add_argument("--row", type=int, help="print the record at this row")
+    which.add_argument("--id", help="print the record with this id")
+    args = ap.parse_args(argv)
+    if args.file and args.row is None and args.id is None:
+        ap.error("--file needs --row or --id")
+    if not args.file and (args.row is not None or args.id is not None):
+        ap.error("--row/--id need --file")
+
+    if args.file:
+        idx = JsonlIndex(os.path.join(OUT_DIR, args.file), rebuild=args.rebuild)
+        rec = idx.get(args.row) if args.row is not None else idx.get_by_id(args.id)
+        print(orjson.dumps(rec, option=orjson.OPT_INDENT_2).decode() if rec is not None else "(not found)")
+        idx.close()
+        return
+
+    for fn in FILES:
+        path = os.path.join(OUT_DIR, fn)
+        if not os.path.exists(path):
+            continue
+        idx = JsonlIndex(path, rebuild=args.rebuild)
+        print(f"- {fn}: rows={len(idx)} subcategories={idx.subcategory_counts()}")
+        idx.close()
+    print("index dir:", INDEX_DIR)
+
+
+if __name__ == "__main__":
+    main()
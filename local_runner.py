@@ -1,7 +1,8 @@
 """Local CPU-safe runner.
 
 Runs all builders against a tiny synthetic/local row source without network
-access. P0 guard is disabled by default (no tokenizer download).
+access. P0 guard is disabled by default (no tokenizer download), or runs on
+local tokenizer files when SFT_TOKENIZER_FILE is set.
 This lets you validate logic, serializers, validators, reporting, and the
 entire pipeline shape on a normal CPU.
 """
@@ -18,10 +19,17 @@ from .builders import (
     build_pack_hard_mixed,
     make_outputs_dict,
 )
-from .config import MAX_ROWS_PER_SAMPLE, SEED
+from .config import DESIRED_OUTPUT_COUNTS, FOCUS_MULTIPLIER, MAX_ROWS_PER_SAMPLE, SCHEDULER, SEED, TOKENIZER_FILE
+from .inline_gate import print_gate_stats
+from . import builders
 from . import config as cfg
+from .memprofile import install_memprofile, print_memory_stats
+from .metrics import write_metrics
 from .p0_guard import P0Guard
+from .profiling import install_profiling, print_stage_stats
+from .progress import finish_progress, start_progress
 from .report import print_report
+from .scheduler import print_scheduler_stats, run_scheduled
 from .write_outputs import write_outputs
 
 
@@ -64,19 +72,31 @@ def main():
         return (rows, cols), src
 
     outputs = make_outputs_dict()
-    p0 = P0Guard(disabled=True)
+    p0 = P0Guard(disabled=not TOKENIZER_FILE)
+    take_rows = install_profiling(builders, p0, take_rows)
+    install_memprofile(builders, outputs)
 
     # Smaller pass through all builders; budgets still apply
-    build_core_tabular(outputs, take_rows, p0)
-    build_core_xml_in(outputs, take_rows, p0)
-    build_core_gtfs(outputs, take_rows, p0)
-    build_pack_hard_mixed(outputs, take_rows, p0)
-    build_core_xml_out(outputs, take_rows, p0)
-    build_core_toml_out(outputs, take_rows, p0)
-    build_core_yaml_out_min(outputs, take_rows, p0)
+    start_progress(cfg.BUDGET)
+    if SCHEDULER:
+        run_scheduled(builders, outputs, take_rows, p0, DESIRED_OUTPUT_COUNTS, FOCUS_MULTIPLIER)
+    else:
+        build_core_tabular(outputs, take_rows, p0)
+        build_core_xml_in(outputs, take_rows, p0)
+        build_core_gtfs(outputs, take_rows, p0)
+        build_pack_hard_mixed(outputs, take_rows, p0)
+        build_core_xml_out(outputs, take_rows, p0)
+        build_core_toml_out(outputs, take_rows, p0)
+        build_core_yaml_out_min(outputs, take_rows, p0)
 
+    finish_progress()
+    print_gate_stats()
+    print_scheduler_stats()
+    print_stage_stats()
+    print_memory_stats(cfg.BUDGET)
     print_report(outputs)
     write_outputs(outputs)
+    write_metrics("build")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,215 @@
+"""Offline tokenizers for the P0 guard: a local tokenizer.json or a locally trained BPE.
+
+`load_local_tokenizer(path, chat_template)` never contacts the hub:
+
+- a directory with a tokenizer_config.json loads through
+  `AutoTokenizer.from_pretrained(path, local_files_only=True)` when transformers
+  is installed (a model snapshot copied from another machine);
+- a tokenizer.json (or a directory holding one) loads as `PreTrainedTokenizerFast`,
+  or without transformers as `LocalTokenizer` over the `tokenizers` library,
+  which renders the chat template with jinja2 the way transformers does.
+
+The chat template is taken from `chat_template` (a jinja file, or a
+tokenizer_config.json with a "chat_template" key), else from the directory
+(chat_template.jinja / tokenizer_config.json), else the tokenizer's own, else
+CHATML_TEMPLATE (the Qwen format of the default model).
+
+  python -m sft_builder.local_tokenizer [--out DIR] [--vocab 8000] [--from OUT_DIR] [--samples 2000]
+
+trains a byte-level BPE on the message texts of the JSONL files in --from (by
+default, samples built offline from synthetic rows) and saves tokenizer.json and
+chat_template.jinja in --out, ready for SFT_TOKENIZER_FILE.
+"""
+import argparse
+import glob
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import orjson
+
+from .config import DEBUG_DIR, SEED
+
+TOKENIZER_DIR = os.path.join(DEBUG_DIR, "tokenizer")
+
+SPECIAL_TOKENS = ["<|endoftext|>", "<|im_start|>", "<|im_end|>"]
+CHATML_TEMPLATE = (
+    "{%- for message in messages %}"
+    "{{- '<|im_start|>' + message['role'] + '\\n' + message['content'] + '<|im_end|>\\n' }}"
+    "{%- endfor %}"
+    "{%- if add_generation_prompt %}{{- '<|im_start|>assistant\\n' }}{%- endif %}"
+)
+
+
+def read_chat_template(path: str) -> Optional[str]:
+    """Template text of a jinja file, or the "chat_template" of a tokenizer_config.json."""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    if not path.endswith(".json"):
+        return text
+    tpl = json.loads(text).get("chat_template")
+    if isinstance(tpl, list):  # named templates: [{"name": ..., "template": ...}]
+        named = {t.get("name"): t.get("template") for t in tpl if isinstance(t, dict)}
+        tpl = named.get("default") or next(iter(named.values()), None)
+    return tpl
+
+
+def _dir_template(path: str) -> Optional[str]:
+    for name in ("chat_template.jinja", "tokenizer_config.json"):
+        p = os.path.join(path, name)
+        if os.path.exists(p):
+            tpl = read_chat_template(p)
+            if tpl:
+                return tpl
+    return None
+
+
+class LocalTokenizer:
+    """The calls P0Guard makes (`__call__`, `apply_chat_template`) over a `tokenizers.Tokenizer`."""
+
+    def __init__(self, tok: Any, chat_template: str, eos_token: str = "<|im_end|>"):
+        self.tok = tok
+        self.chat_template = chat_template
+        self.eos_token = eos_token
+        self.eos_token_id = tok.token_to_id(eos_token)
+        self.pad_token = eos_token
+        self.pad_token_id = self.eos_token_id
+        self._compiled = None
+
+    def _render(self, messages: List[Dict[str, Any]], add_generation_prompt: bool) -> str:
+        if self._compiled is None:
+            from jinja2.exceptions import TemplateError
+            from jinja2.sandbox import ImmutableSandboxedEnvironment
+
+            def raise_exception(message):
+                raise TemplateError(message)
+
+            env = ImmutableSandboxedEnvironment(trim_blocks=True, lstrip_blocks=True)
+            env.globals["raise_exception"] = raise_exception
+            self._compiled = env.from_string(self.chat_template)
+        return self._compiled.render(
+            messages=messages,
+            add_generation_prompt=add_generation_prompt,
+            bos_token="",
+            eos_token=self.eos_token,
+        )
+
+    def encode(self, text: str, truncation: bool = False, max_length: Optional[int] = None) -> List[int]:
+        ids = self.tok.encode(text, add_special_tokens=False).ids
+        return ids[:max_length] if truncation and max_length else ids
+
+    def __call__(self, text: str, truncation: bool = False, max_length: Optional[int] = None) -> Dict[str, List[int]]:
+        return {"input_ids": self.encode(text, truncation, max_length)}
+
+    def apply_chat_template(
+        self,
+        messages: List[Dict[str, Any]],
+        add_generation_prompt: bool = False,
+        tokenize: bool = True,
+        truncation: bool = False,
+        max_length: Optional[int] = None,
+    ):
+        text = self._render(messages, add_generation_prompt)
+        return self.encode(text, truncation, max_length) if tokenize else text
+
+
+def load_local_tokenizer(path: str, chat_template: str = "") -> Any:
+    """Tokenizer from local files only (see module docstring)."""
+    template = read_chat_template(chat_template) if chat_template else None
+    if os.path.isdir(path):
+        template = template or _dir_template(path)
+        if os.path.exists(os.path.join(path, "tokenizer_config.json")):
+            try:
+                from transformers import AutoTokenizer
+            except ImportError:
+                pass
+            else:
+                tok = AutoTokenizer.from_pretrained(path, use_fast=True, local_files_only=True)
+                tok.chat_template = template or getattr(tok, "chat_template", None) or CHATML_TEMPLATE
+                return tok
+        path = os.path.join(path, "tokenizer.json")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"no tokenizer.json at {path}")
+    try:
+        from transformers import PreTrainedTokenizerFast
+    except ImportError:
+        from tokenizers import Tokenizer
+
+        return LocalTokenizer(Tokenizer.from_file(path), template or CHATML_TEMPLATE)
+    tok = PreTrainedTokenizerFast(tokenizer_file=path)
+    tok.chat_template = template or CHATML_TEMPLATE
+    if tok.eos_token is None and tok.convert_tokens_to_ids("<|im_end|>") != tok.unk_token_id:
+        tok.eos_token = "<|im_end|>"
+    return tok
+
+
+def train_bpe(texts: Iterable[str], vocab_size: int = 8000) -> Any:
+    """Byte-level BPE (`tokenizers.Tokenizer`) trained on `texts`, with the ChatML special tokens."""
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+
+    tok = Tokenizer(models.BPE())
+    tok.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tok.decoder = decoders.ByteLevel()
+    trainer = trainers.BpeTrainer(
+        vocab_size=vocab_size,
+        special_tokens=SPECIAL_TOKENS,
+        initial_alphabet=pre_tokenizers.ByteLevel.alphabet(),
+        show_progress=False,
+    )
+    tok.train_from_iterator(texts, trainer)
+    return tok
+
+
+def save_tokenizer(tok: Any, out_dir: str, chat_template: str = CHATML_TEMPLATE) -> str:
+    """Write tokenizer.json and chat_template.jinja into `out_dir`; return the directory."""
+    os.makedirs(out_dir, exist_ok=True)
+    tok.save(os.path.join(out_dir, "tokenizer.json"))
+    with open(os.path.join(out_dir, "chat_template.jinja"), "w", encoding="utf-8") as f:
+        f.write(chat_template)
+    return out_dir
+
+
+def message_texts(samples: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    for s in samples:
+        for m in s.get("messages") or []:
+            if isinstance(m, dict) and isinstance(m.get("content"), str):
+                yield m["content"]
+
+
+def _jsonl_samples(out_dir: str) -> Iterator[Dict[str, Any]]:
+    for path in sorted(glob.glob(os.path.join(out_dir, "*.jsonl"))):
+        with open(path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    yield orjson.loads(line)
+
+
+def offline_samples(samples: int = 2000, seed: int = SEED, builders: str = "20260104") -> List[Dict[str, Any]]:
+    """About `samples` samples over every pack, built from synthetic rows (no network)."""
+    from .bench_common import RowSource, build_samples, load_builders, scale_budget
+
+    _, cfg = load_builders(builders)
+    outputs = build_samples(builders, scale_budget(cfg.BUDGET, samples), RowSource(seed), seed)
+    return [s for data in outputs.values() for s in data]
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Train a byte-level BPE tokenizer offline for the P0 guard.")
+    ap.add_argument("--out", default=TOKENIZER_DIR, help="directory for tokenizer.json + chat_template.jinja")
+    ap.add_argument("--vocab", type=int, default=8000)
+    ap.add_argument("--from", dest="src", default="", help="output dir whose *.jsonl samples form the corpus")
+    ap.add_argument("--samples", type=int, default=2000, help="offline samples to build when --from is not given")
+    ap.add_argument("--seed", type=int, default=SEED)
+    args = ap.parse_args(argv)
+
+    samples = list(_jsonl_samples(args.src)) if args.src else offline_samples(args.samples, args.seed)
+    tok = train_bpe(message_texts(samples), args.vocab)
+    out = save_tokenizer(tok, args.out)
+    n_chars = sum(len(t) for t in message_texts(samples))
+    n_tokens = sum(len(tok.encode(t).ids) for t in message_texts(samples))
+    print(f"[tokenizer] vocab={tok.get_vocab_size()} corpus={len(samples)} samples, {n_chars / max(1, n_tokens):.2f} chars/token")
+    print(f"[tokenizer] saved: {out} (SFT_TOKENIZER_FILE={out})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Buffered JSONL sink for the debug / reject logs.
+
+`utils.append_jsonl` hands records to a process-wide `LogSink` instead of
+opening the file for every failure. Records are buffered per file (in order)
+and written by a background thread every LOG_FLUSH_SEC seconds; when the
+buffer exceeds LOG_BUFFER_MB the caller flushes inline, so memory stays
+bounded. Buffers are flushed at exit (atexit, and on SIGTERM when no other
+handler is installed) and by `flush_logs()`, which write_outputs calls before
+reporting log sizes.
+
+A file that would grow past LOG_ROTATE_MB is rotated (`x.jsonl` -> `x.jsonl.1`
+..., keeping LOG_ROTATE_KEEP old files). The XML/TOML failure logs and the P0
+reject log can be thinned with SFT_{XML_FAIL,TOML_FAIL,REJECT}_LOG_SAMPLE
+(fraction kept, deterministic: every 1/rate-th record). SFT_LOG_SINK=0 falls
+back to the unbuffered open/append/close per record.
+"""
+import atexit
+import os
+import signal
+import threading
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+from .config import LOG_BUFFER_MB, LOG_FLUSH_SEC, LOG_ROTATE_KEEP, LOG_ROTATE_MB, LOG_SAMPLE
+
+
+class LogSink:
+    def __init__(
+        self,
+        flush_sec: float = LOG_FLUSH_SEC,
+        buffer_bytes: int = int(LOG_BUFFER_MB * 1024 * 1024),
+        rotate_bytes: int = int(LOG_ROTATE_MB * 1024 * 1024),
+        rotate_keep: int = LOG_ROTATE_KEEP,
+        sample: Optional[Dict[str, float]] = None,
+    ):
+        self.flush_sec = max(0.05, float(flush_sec))
+        self.buffer_bytes = max(1, buffer_bytes)
+        self.rotate_bytes = rotate_bytes
+        self.rotate_keep = max(0, rotate_keep)
+        self.sample = dict(LOG_SAMPLE if sample is None else sample)  # basename -> rate
+        self._bufs: Dict[str, List[bytes]] = {}
+        self._buffered = 0
+        self._acc: Dict[str, float] = {}
+        self._lock = threading.Lock()  # guards the buffers
+        self._io = threading.Lock()  # serializes file writes and rotation
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+        self.sampled_out = 0
+        self.rotations = 0
+
+    def _keep(self, path: str) -> bool:
+        rate = self.sample.get(os.path.basename(path), 1.0)
+        if rate >= 1.0:
+            return True
+        acc = self._acc.get(path, 1.0 - rate) + rate
+        keep = acc >= 1.0
+        self._acc[path] = acc - 1.0 if keep else acc
+        return keep
+
+    def write(self, path: str, obj: Any) -> None:
+        line = orjson.dumps(obj) + b"\n"
+        with self._lock:
+            if not self._keep(path):
+                self.sampled_out += 1
+                return
+            self._bufs.setdefault(path, []).append(line)
+            self._buffered += len(line)
+            full = self._buffered >= self.buffer_bytes
+        if self._thread is None:
+            self._start()
+        if full:
+            self.flush()
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, name="log-sink", daemon=True)
+            self._thread.start()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.flush_sec):
+            self.flush()
+
+    def flush(self) -> None:
+        with self._io:
+            with self._lock:
+                bufs, self._bufs, self._buffered = self._bufs, {}, 0
+            for path, lines in bufs.items():
+                self._write_file(path, b"".join(lines), len(lines))
+
+    def _write_file(self, path: str, data: bytes, n: int) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if self.rotate_bytes > 0:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = 0
+            if size and size + len(data) > self.rotate_bytes:
+                self._rotate(path)
+        with open(path, "ab") as f:
+            f.write(data)
+        self.written += n
+
+    def _rotate(self, path: str) -> None:
+        self.rotations += 1
+        if self.rotate_keep == 0:
+            os.remove(path)
+            return
+        for i in range(self.rotate_keep - 1, 0, -1):
+            src = f"{path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{path}.{i + 1}")
+        os.replace(path, f"{path}.1")
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {"written": self.written, "sampled_out": self.sampled_out, "rotations": self.rotations}
+
+
+_SINK: Optional[LogSink] = None
+_SINK_LOCK = threading.Lock()
+
+
+def _on_sigterm(signum, frame) -> None:
+    flush_logs()
+    signal.signal(signum, signal.SIG_DFL)
+    os.kill(os.getpid(), signum)
+
+
+def get_sink() -> LogSink:
+    """Process-wide sink, created (and registered for exit/SIGTERM flush) on first use."""
+    global _SINK
+    if _SINK is None:
+        with _SINK_LOCK:
+            if _SINK is None:
+                sink = LogSink()
+                atexit.register(sink.close)
+                if threading.current_thread() is threading.main_thread():
+                    try:
+                        if signal.getsignal(signal.SIGTERM) in (signal.SIG_DFL, None):
+                            signal.signal(signal.SIGTERM, _on_sigterm)
+                    except (ValueError, OSError):
+                        pass
+                _SINK = sink
+    return _SINK
+
+
+def flush_logs() -> None:
+    if _SINK is not None:
+        _SINK.flush()
+
+
+def log_stats() -> Optional[Dict[str, int]]:
+    return _SINK.stats() if _SINK is not None else None
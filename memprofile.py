@@ -0,0 +1,295 @@
+"""Opt-in memory profiling for the builders (SFT_MEMPROFILE=1).
+
+`install_memprofile(builders, outputs)` starts tracemalloc (SFT_MEMPROFILE_FRAMES
+frames per allocation) and hooks the builders' `note_attempt`:
+
+- pack boundaries: the first attempt of each pack takes a snapshot, and the
+  growth since the previous snapshot (top SFT_MEMPROFILE_TOP allocation sites)
+  is recorded for the segment that just ended;
+- periodic: another snapshot every SFT_MEMPROFILE_INTERVAL seconds;
+- RSS: a background thread reads the resident set size every
+  SFT_MEMPROFILE_RSS_MS and keeps the peak per pack (the pack being built
+  when sampled), alongside the traced Python heap peak.
+
+`print_memory_stats()` prints per-pack peaks, the top allocation sites of the
+final heap, and the bytes retained per sample in `outputs` (deep size of up to
+256 samples per file) with the projected size at the configured BUDGET, then
+writes everything to `_debug/memory_profile.json`. Nothing is installed when
+disabled.
+
+  python -m sft_builder.memprofile [--scale 10]
+
+projects the peak RSS of a run with the budget scaled from that profile.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import DEBUG_DIR, MEMPROFILE, MEMPROFILE_FRAMES, MEMPROFILE_INTERVAL, MEMPROFILE_RSS_MS, MEMPROFILE_TOP
+from .metrics import set_gauge
+
+MEMORY_PATH = os.path.join(DEBUG_DIR, "memory_profile.json")
+SIZE_SAMPLES = 256
+
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes() -> int:
+    """Current resident set size; falls back to the process peak where /proc is missing."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def deep_sizeof(obj: Any) -> int:
+    """Approximate retained size of a JSON-like object (dict/list/str/number)."""
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple)):
+            stack.extend(o)
+    return total
+
+
+def _mb(n: float) -> str:
+    return f"{n / (1024 * 1024):.1f}MB"
+
+
+def _sites(snap: tracemalloc.Snapshot) -> Dict[str, Tuple[int, int]]:
+    """Allocation site -> (size, count), without the profiler's own allocations."""
+    out = {}
+    for st in snap.statistics("lineno"):
+        frame = st.traceback[0]
+        if frame.filename not in (tracemalloc.__file__, __file__):
+            out[f"{frame.filename}:{frame.lineno}"] = (st.size, st.count)
+    return out
+
+
+def _top(sites: Dict[str, Tuple[int, int]], n: int, prev: Optional[Dict[str, Tuple[int, int]]] = None) -> List[Dict[str, Any]]:
+    """Largest sites, or largest growth since `prev`."""
+    rows = []
+    for site, (size, count) in sites.items():
+        base = prev.get(site, (0, 0)) if prev is not None else (0, 0)
+        rows.append({"site": site, "size": size, "size_diff": size - base[0], "count": count})
+    rows.sort(key=lambda r: -r["size_diff"])
+    return rows[:n]
+
+
+class MemoryProfiler:
+    def __init__(self, outputs: Dict[str, List[Dict[str, Any]]], interval: float = MEMPROFILE_INTERVAL, top: int = MEMPROFILE_TOP):
+        self.outputs = outputs
+        self.interval = float(interval)
+        self.top = top
+        self.packs: Dict[str, Dict[str, int]] = {}
+        self.segments: List[Dict[str, Any]] = []
+        self._pack: Optional[str] = None
+        self._seg_label = "start"
+        self._prev: Optional[Dict[str, Tuple[int, int]]] = None
+        self._next_snap = 0.0
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self.rss_start = rss_bytes()
+        self.rss_peak = self.rss_start
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(max(1, MEMPROFILE_FRAMES))
+        self._prev = _sites(tracemalloc.take_snapshot())
+        self._next_snap = time.monotonic() + self.interval if self.interval > 0 else float("inf")
+        self._sampler = threading.Thread(target=self._sample_loop, name="rss-sampler", daemon=True)
+        self._sampler.start()
+
+    def _sample_loop(self) -> None:
+        wait = max(0.01, MEMPROFILE_RSS_MS / 1000.0)
+        while not self._stop.wait(wait):
+            self._sample_rss()
+
+    def _sample_rss(self) -> None:
+        rss = rss_bytes()
+        self.rss_peak = max(self.rss_peak, rss)
+        pack = self._pack
+        if pack is not None:
+            d = self.packs[pack]
+            d["peak_rss"] = max(d["peak_rss"], rss)
+
+    def _snapshot(self, label: str) -> None:
+        sites = _sites(tracemalloc.take_snapshot())
+        current = tracemalloc.get_traced_memory()[0]
+        self.segments.append(
+            {
+                "segment": self._seg_label,
+                "ended_by": label,
+                "traced_current": current,
+                "rss": rss_bytes(),
+                "retained_samples": sum(len(v) for v in self.outputs.values()),
+                "top_growth": _top(sites, self.top, self._prev),
+            }
+        )
+        self._prev = sites
+        self._seg_label = label
+
+    def attempt(self, fname: str) -> None:
+        if fname != self._pack:
+            if self._pack is not None:
+                self._close_pack(self._pack)
+            first = fname not in self.packs
+            self.packs.setdefault(fname, {"peak_rss": 0, "peak_traced": 0, "rss_enter": rss_bytes()})
+            self._pack = fname
+            tracemalloc.reset_peak()
+            if first:
+                self._snapshot(f"enter:{fname}")
+        if time.monotonic() >= self._next_snap:
+            self._next_snap = time.monotonic() + self.interval
+            self._snapshot(f"periodic:{fname}")
+
+    def _close_pack(self, fname: str) -> None:
+        d = self.packs[fname]
+        d["peak_traced"] = max(d["peak_traced"], tracemalloc.get_traced_memory()[1])
+        d["peak_rss"] = max(d["peak_rss"], rss_bytes())
+
+    def close(self) -> None:
+        if self._pack is not None:
+            self._close_pack(self._pack)
+            self._pack = None
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+        self._sample_rss()
+        self._snapshot("end")
+
+    # -- reporting ---------------------------------------------------------------
+
+    def retained(self, budget: Optional[Dict[str, int]] = None) -> Dict[str, Dict[str, Any]]:
+        """Bytes per retained sample per output file, and the projection at `budget`."""
+        rng = random.Random(0)  # never touch the builders' global random state
+        out = {}
+        for fname, data in self.outputs.items():
+            if not data:
+                continue
+            picks = data if len(data) <= SIZE_SAMPLES else rng.sample(data, SIZE_SAMPLES)
+            per = sum(deep_sizeof(s) for s in picks) / len(picks)
+            out[fname] = {
+                "samples": len(data),
+                "bytes_per_sample": int(per),
+                "retained_bytes": int(per * len(data)),
+            }
+            if budget and fname in budget:
+                out[fname]["budget"] = int(budget[fname])
+                out[fname]["budget_bytes"] = int(per * budget[fname])
+        return out
+
+    def report(self, budget: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        import resource
+
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {
+            "rss_start": self.rss_start,
+            "rss_peak": self.rss_peak,
+            "ru_maxrss": maxrss if sys.platform == "darwin" else maxrss * 1024,
+            "traced_peak": tracemalloc.get_traced_memory()[1],
+            "packs": self.packs,
+            "top_sites": _top(self._prev or {}, self.top),
+            "retained": self.retained(budget),
+            "segments": self.segments,
+        }
+
+
+_MEM: Optional[MemoryProfiler] = None
+
+
+def install_memprofile(builders: Any, outputs: Dict[str, List[Dict[str, Any]]]) -> None:
+    """Start tracemalloc and hook the builders' attempts; no-op unless SFT_MEMPROFILE is set."""
+    global _MEM
+    if not MEMPROFILE:
+        return
+    mem = _MEM = MemoryProfiler(outputs)
+    note_attempt = builders.note_attempt
+
+    def attempt(fname: str) -> None:
+        mem.attempt(fname)
+        note_attempt(fname)
+
+    builders.note_attempt = attempt
+    mem.start()
+
+
+def print_memory_stats(budget: Optional[Dict[str, int]] = None, path: str = MEMORY_PATH) -> None:
+    """Print peak RSS per pack, top allocation sites and bytes per retained sample."""
+    global _MEM
+    if _MEM is None:
+        return
+    mem = _MEM
+    mem.close()
+    rep = mem.report(budget)
+    tracemalloc.stop()
+    _MEM = None
+    print("\n=========================")
+    print("Memory profile")
+    print("=========================")
+    print(f"[memory] rss start={_mb(rep['rss_start'])} peak={_mb(rep['rss_peak'])} traced peak={_mb(rep['traced_peak'])}")
+    for fname, d in rep["packs"].items():
+        print(f"- {fname}: peak_rss={_mb(d['peak_rss'])} (+{_mb(max(0, d['peak_rss'] - d['rss_enter']))} from entry) peak_traced={_mb(d['peak_traced'])}")
+    print("Top allocation sites (live at end):")
+    for t in rep["top_sites"]:
+        print(f"  {_mb(t['size'])}  n={t['count']}  {t['site']}")
+    print("Retained samples (deep size):")
+    total = total_budget = 0
+    for fname, d in rep["retained"].items():
+        proj = f" -> {_mb(d['budget_bytes'])} at budget" if "budget_bytes" in d else ""
+        print(f"- {fname}: {d['samples']} x {d['bytes_per_sample']}B = {_mb(d['retained_bytes'])}{proj}")
+        total += d["retained_bytes"]
+        total_budget += d.get("budget_bytes", 0)
+    print(f"  total retained={_mb(total)}" + (f" (at budget {_mb(total_budget)})" if total_budget else ""))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(rep, f, ensure_ascii=False, indent=2)
+    print("[memory] profile:", path)
+    set_gauge("rss_peak_bytes", rep["rss_peak"])
+    for fname, d in rep["packs"].items():
+        set_gauge("pack_peak_rss_bytes", d["peak_rss"], pack=fname)
+    for fname, d in rep["retained"].items():
+        set_gauge("bytes_per_retained_sample", d["bytes_per_sample"], file=fname)
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Project retained-sample memory from a saved memory profile.")
+    ap.add_argument("--path", default=MEMORY_PATH, help="memory_profile.json written by a SFT_MEMPROFILE=1 run")
+    ap.add_argument("--scale", type=float, default=1.0, help="budget multiplier to project (e.g. 10 = 10x BUDGET)")
+    args = ap.parse_args(argv)
+    with open(args.path, encoding="utf-8") as f:
+        rep = json.load(f)
+    total = 0
+    for fname, d in rep["retained"].items():
+        n = int(d.get("budget", d["samples"]) * args.scale)
+        est = n * d["bytes_per_sample"]
+        total += est
+        print(f"- {fname}: {n} x {d['bytes_per_sample']}B = {_mb(est)}")
+    # everything at the measured peak that was not retained samples is taken as fixed
+    measured = sum(d["retained_bytes"] for d in rep["retained"].values())
+    overhead = max(0, rep["rss_peak"] - measured)
+    print(f"samples={_mb(total)} + measured overhead={_mb(overhead)} -> est. peak RSS {_mb(total + overhead)} (scale x{args.scale:g})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""Machine-readable run metrics: JSON run summary and Prometheus text format.
+
+Usage (comparison):
+  python -m sft_builder.metrics --compare BASE.json NEW.json [--tolerance 0.2]
+
+Counters, gauges and histograms are kept in a process-wide sink (`inc`,
+`set_gauge`, `observe`). At the end of a run `write_metrics(kind)` also pulls
+in what the other reporters already hold (progress: attempts/accepts/rejects
+per reason, throughput and reject cost; stage timers; format counters; inline
+gate) and
+writes `_debug/metrics/<kind>-<run_id>.json`. With SFT_METRICS_PROM=1 it also
+writes `_debug/metrics/<kind>.prom` for a node-exporter textfile collector.
+Every series carries the run id (SFT_RUN_ID, or a timestamp) and a hash of
+the config values, so runs can be compared.
+
+`--compare` prints per-pack throughput (accepted samples/s) of two summaries
+and exits with status 1 when any pack slowed down by more than the tolerance.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import orjson
+
+from . import config as _config
+from .config import DEBUG_DIR, METRICS, METRICS_PROM, RUN_ID
+
+METRICS_DIR = os.path.join(DEBUG_DIR, "metrics")
+
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot: +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, x: float) -> None:
+        i = 0
+        while i < len(self.buckets) and x > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += x
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        out, acc = [], 0
+        for le, c in zip([*map(_num, self.buckets), "+Inf"], self.counts):
+            acc += c
+            out.append((le, acc))
+        return out
+
+
+def _num(x: float) -> str:
+    return repr(float(x)) if not float(x).is_integer() else str(int(x))
+
+
+class MetricsSink:
+    def __init__(self) -> None:
+        self.t0 = time.time()
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.gauges: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = (name, _labels(labels))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        self.gauges[(name, _labels(labels))] = value
+
+    def observe(self, name: str, value: float, buckets: Sequence[float] = SECONDS_BUCKETS, **labels: Any) -> None:
+        key = (name, _labels(labels))
+        h = self.histograms.get(key)
+        if h is None:
+            h = self.histograms[key] = Histogram(buckets)
+        h.observe(value)
+
+
+SINK = MetricsSink()
+
+
+def inc(name: str, value: float = 1, **labels: Any) -> None:
+    SINK.inc(name, value, **labels)
+
+
+def set_gauge(name: str, value: float, **labels: Any) -> None:
+    SINK.set_gauge(name, value, **labels)
+
+
+def observe(name: str, value: float, buckets: Sequence[float] = SECONDS_BUCKETS, **labels: Any) -> None:
+    SINK.observe(name, value, buckets, **labels)
+
+
+# ---------------------------------------------------------------------------
+# Run identity
+# ---------------------------------------------------------------------------
+
+_RUN_ID: Optional[str] = None
+
+
+def run_id() -> str:
+    global _RUN_ID
+    if _RUN_ID is None:
+        _RUN_ID = RUN_ID or time.strftime("%Y%m%dT%H%M%S", time.localtime(SINK.t0)) + f"-{os.getpid()}"
+    return _RUN_ID
+
+
+def config_values(*modules: Any) -> Dict[str, Any]:
+    """Upper-case settings of config.py and the given config modules (later ones
+    win), without run-specific paths."""
+    out: Dict[str, Any] = {}
+    for mod in (_config, *modules):
+        for k, v in vars(mod).items():
+            if k.isupper() and not k.endswith(("_DIR", "_PATH", "_LOG")) and k != "RUN_ID":
+                out[k] = v
+    return out
+
+
+def config_hash(*modules: Any) -> str:
+    blob = orjson.dumps(config_values(*modules), option=orjson.OPT_SORT_KEYS, default=str)
+    return hashlib.sha1(blob).hexdigest()[:12]
+
+
+# ---------------------------------------------------------------------------
+# Collection from the other reporters
+# ---------------------------------------------------------------------------
+
+def _collect_run() -> Dict[str, Any]:
+    from . import inline_gate, profiling, progress
+    from .format_counters import COUNTERS
+
+    packs: Dict[str, Any] = {}
+    if progress._TRACKER is not None:
+        for fname, r in progress._TRACKER.summary()["packs"].items():
+            SINK.counters[("attempts_total", _labels({"pack": fname}))] = r["attempts"]
+            SINK.counters[("accepted_total", _labels({"pack": fname}))] = r["accepted"]
+            for reason, n in r["rejects"].items():
+                SINK.counters[("rejects_total", _labels({"pack": fname, "reason": reason}))] = n
+            set_gauge("accepted_per_second", r["per_sec"], pack=fname)
+            packs[fname] = r
+        for fname, d in progress._TRACKER.cost.items():
+            for outcome, (n, secs) in d.items():
+                SINK.counters[("attempt_outcomes_total", _labels({"pack": fname, "outcome": outcome}))] = n
+                SINK.counters[("attempt_outcome_seconds_total", _labels({"pack": fname, "outcome": outcome}))] = secs
+    if profiling._PROF is not None:
+        for fname, d in profiling._PROF.per_pack().items():
+            for stage, secs in d.items():
+                if stage != "n":
+                    SINK.counters[("stage_seconds_total", _labels({"pack": fname, "stage": stage}))] = secs
+    for fname, d in COUNTERS.formats.items():
+        for fmt, n in d.items():
+            set_gauge("output_format_samples", n, file=fname, format=fmt)
+    gate = inline_gate._GATE
+    if gate is not None:
+        st = gate.stats()
+        for k in ("checked", "memo_hits", "passed", "rejected"):
+            SINK.counters[(f"inline_gate_{k}_total", ())] = st[k]
+    return packs
+
+
+def record_syntax(syn: Any) -> None:
+    """Gauges from a validation_engine.SyntaxReport."""
+    for fn, total in syn.totals.items():
+        set_gauge("validated_records", total, file=fn)
+        set_gauge("valid_records", syn.valids.get(fn, 0), file=fn)
+    for err in syn.errors:
+        inc("syntax_errors_total", file=err.get("file", ""), reason=str(err.get("reason", "")))
+    set_gauge("validation_cache_hits", syn.cache_hits, check="syntax")
+    set_gauge("validation_cache_lookups", syn.cache_lookups, check="syntax")
+
+
+def record_quality(qual: Any) -> None:
+    """Gauges from a validation_engine.QualityReport."""
+    set_gauge("quality_duplicate_ids", qual.duplicates())
+    set_gauge("quality_issues", qual.schema_errors.count, kind="schema")
+    set_gauge("quality_issues", qual.attr_issues.count, kind="attribute")
+    set_gauge("quality_issues", qual.roundtrip_issues.count, kind="roundtrip")
+    for fn, n in qual.pack_records.items():
+        set_gauge("quality_records", n, file=fn)
+    set_gauge("validation_cache_hits", qual.cache_hits, check="quality")
+    set_gauge("validation_cache_lookups", qual.cache_lookups, check="quality")
+
+
+# ---------------------------------------------------------------------------
+# Writers
+# ---------------------------------------------------------------------------
+
+def _series(d: Dict[Tuple[str, Labels], Any]) -> List[Dict[str, Any]]:
+    return [{"name": n, "labels": dict(l), "value": v} for (n, l), v in sorted(d.items())]
+
+
+def summary(kind: str, config_modules: Sequence[Any] = ()) -> Dict[str, Any]:
+    packs = _collect_run() if kind == "build" else {}
+    now = time.time()
+    return {
+        "kind": kind,
+        "run_id": run_id(),
+        "config_hash": config_hash(*config_modules),
+        "started_at": SINK.t0,
+        "finished_at": now,
+        "elapsed_s": round(now - SINK.t0, 3),
+        "packs": packs,
+        "counters": _series(SINK.counters),
+        "gauges": _series(SINK.gauges),
+        "histograms": [
+            {"name": n, "labels": dict(l), "buckets": h.cumulative(), "sum": h.sum, "count": h.count}
+            for (n, l), h in sorted(SINK.histograms.items())
+        ],
+        "config": config_values(*config_modules),
+    }
+
+
+def _prom_labels(labels: Dict[str, str], base: Dict[str, str]) -> str:
+    items = {**base, **labels}
+    esc = lambda v: str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')  # noqa: E731
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items.items()) + "}"
+
+
+def prometheus_text(summ: Dict[str, Any]) -> str:
+    base = {"run_id": summ["run_id"], "config_hash": summ["config_hash"], "kind": summ["kind"]}
+    lines: List[str] = []
+    typed = set()
+
+    def header(name: str, typ: str) -> None:
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} {typ}")
+
+    for s in summ["counters"]:
+        name = "sft_" + s["name"]
+        header(name, "counter")
+        lines.append(f"{name}{_prom_labels(s['labels'], base)} {_num(s['value'])}")
+    for s in summ["gauges"]:
+        name = "sft_" + s["name"]
+        header(name, "gauge")
+        lines.append(f"{name}{_prom_labels(s['labels'], base)} {_num(s['value'])}")
+    for h in summ["histograms"]:
+        name = "sft_" + h["name"]
+        header(name, "histogram")
+        for le, c in h["buckets"]:
+            lines.append(f"{name}_bucket{_prom_labels({**h['labels'], 'le': le}, base)} {c}")
+        lines.append(f"{name}_sum{_prom_labels(h['labels'], base)} {_num(h['sum'])}")
+        lines.append(f"{name}_count{_prom_labels(h['labels'], base)} {h['count']}")
+    header("sft_run_elapsed_seconds", "gauge")
+    lines.append(f"sft_run_elapsed_seconds{_prom_labels({}, base)} {summ['elapsed_s']}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(kind: str, config_modules: Sequence[Any] = (), out_dir: str = METRICS_DIR) -> List[str]:
+    """Write the run summary (and Prometheus file); returns the written paths."""
+    if not METRICS:
+        return []
+    summ = summary(kind, config_modules)
+    os.makedirs(out_dir, exist_ok=True)
+    paths = [os.path.join(out_dir, f"{kind}-{summ['run_id']}.json")]
+    with open(paths[0], "w", encoding="utf-8") as f:
+        json.dump(summ, f, ensure_ascii=False, indent=2, default=str)
+    if METRICS_PROM:
+        prom = os.path.join(out_dir, f"{kind}.prom")
+        tmp = prom + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(prometheus_text(summ))
+        os.replace(tmp, prom)  # textfile collectors must never see a partial file
+        paths.append(prom)
+    for p in paths:
+        print("[metrics]", p)
+    return paths
+
+
+# ---------------------------------------------------------------------------
+# Comparison
+# ---------------------------------------------------------------------------
+
+def compare(base: Dict[str, Any], new: Dict[str, Any], tolerance: float) -> List[str]:
+    """Packs whose accepted samples/s dropped by more than `tolerance` (fraction)."""
+    regressions = []
+    if base.get("config_hash") != new.get("config_hash"):
+        print(f"[note] config differs: {base.get('config_hash')} -> {new.get('config_hash')}")
+    for fname in sorted(set(base.get("packs", {})) | set(new.get("packs", {}))):
+        b = base.get("packs", {}).get(fname, {}).get("per_sec")
+        n = new.get("packs", {}).get(fname, {}).get("per_sec")
+        if not b or n is None:
+            print(f"- {fname}: base={b} new={n}")
+            continue
+        change = (n - b) / b
+        flag = ""
+        if change < -tolerance:
+            flag = "  REGRESSION"
+            regressions.append(fname)
+        print(f"- {fname}: {b}/s -> {n}/s ({100 * change:+.1f}%){flag}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Compare two run metric summaries.")
+    ap.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), required=True)
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed throughput drop (fraction)")
+    args = ap.parse_args(argv)
+    with open(args.compare[0], encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.compare[1], encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"{base.get('run_id')} -> {new.get('run_id')}")
+    bad = compare(base, new, args.tolerance)
+    if bad:
+        print(f"{len(bad)} pack(s) slower than tolerance {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from typing import Any, Dict, List, Tuple
 
-from .config import MAX_SEQ_LEN, MODEL_NAME, REJECT_LOG
+from .config import CHAT_TEMPLATE_FILE, MAX_SEQ_LEN, MODEL_NAME, REJECT_LOG, TOKENIZER_FILE
+from .metrics import TOKEN_BUCKETS, observe
 from .utils import append_jsonl, now_ms
 
 
@@ -8,19 +9,29 @@ class P0Guard:
     """Boundary-based 0-valid reject filter.
 
     If tokenizer is unavailable (e.g., offline local run), you can disable
-    the guard by passing disabled=True.
+    the guard by passing disabled=True, point SFT_TOKENIZER_FILE at local
+    tokenizer files (see local_tokenizer), or pass a loaded `tokenizer`.
     """
 
-    def __init__(self, disabled: bool = False):
+    def __init__(self, disabled: bool = False, tokenizer: Any = None):
         self.disabled = disabled
-        self.tokenizer = None
+        self.tokenizer = tokenizer
 
     def load_tokenizer(self):
         if self.disabled or self.tokenizer is not None:
             return
-        from transformers import AutoTokenizer
+        if TOKENIZER_FILE:
+            from .local_tokenizer import load_local_tokenizer
 
-        tok = AutoTokenizer.from_pretrained(MODEL_NAME, use_fast=True)
+            tok = load_local_tokenizer(TOKENIZER_FILE, CHAT_TEMPLATE_FILE)
+        else:
+            from transformers import AutoTokenizer
+
+            tok = AutoTokenizer.from_pretrained(MODEL_NAME, use_fast=True)
+            if CHAT_TEMPLATE_FILE:
+                from .local_tokenizer import read_chat_template
+
+                tok.chat_template = read_chat_template(CHAT_TEMPLATE_FILE)
         if tok.pad_token_id is None and tok.eos_token_id is not None:
             tok.pad_token = tok.eos_token
         self.tokenizer = tok
@@ -86,6 +97,10 @@ class P0Guard:
             self.load_tokenizer()
         boundary, full_len, supervised, dbg = self.estimate_boundary(messages, max_length=MAX_SEQ_LEN)
         keep = (dbg.get("reason") == "ok")
+        if full_len > 0:
+            pack = sample_meta.get("pack", "")
+            observe("p0_full_tokens", full_len, TOKEN_BUCKETS, pack=pack)
+            observe("p0_supervised_tokens", supervised, TOKEN_BUCKETS, pack=pack)
         if not keep:
             append_jsonl(
                 REJECT_LOG,
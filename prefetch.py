@@ -0,0 +1,177 @@
+"""Background prefetching of row blocks from streaming sources.
+
+Each source runs its `rows_from_stream` generator in a daemon thread that
+fills a bounded queue; builders dequeue ready blocks with `get()` so network
+stalls overlap with serialization/tokenization instead of blocking them.
+A source may be split into several shard workers that feed the same queue.
+"""
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from .config import PREFETCH_DEPTH, PREFETCH_TIMEOUT_S
+
+Block = Tuple[List[Dict[str, str]], List[str]]
+
+_END = object()
+
+
+class BlockPrefetcher:
+    """Bounded per-source block queue filled by background threads.
+
+    `make_iter` must return a fresh block iterator; it is called again when
+    the previous one is exhausted (same restart behaviour as the runners).
+    Passing a list of factories starts one worker thread per factory (e.g.
+    one per dataset shard), all merged into the same queue.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        make_iter: Union[Callable[[], Iterable[Block]], List[Callable[[], Iterable[Block]]]],
+        depth: int = PREFETCH_DEPTH,
+        timeout: float = PREFETCH_TIMEOUT_S,
+    ):
+        self.name = name
+        self.make_iters = list(make_iter) if isinstance(make_iter, (list, tuple)) else [make_iter]
+        self.depth = max(1, int(depth))
+        self.timeout = float(timeout)
+        self._q: "queue.Queue[Any]" = queue.Queue(maxsize=self.depth)
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._alive = 0
+        self._error: Optional[BaseException] = None
+
+        # Metrics
+        self.produced = 0
+        self.worker_produced = [0] * len(self.make_iters)
+        self.consumed = 0
+        self.restarts = 0
+        self.fetch_s = 0.0       # producer time spent pulling from the stream (summed over workers)
+        self.full_wait_s = 0.0   # producer blocked on a full queue (consumer-bound)
+        self.stall_s = 0.0       # consumer blocked on an empty queue (I/O-bound)
+        self.empty_hits = 0
+        self.gets = 0
+        self._occ_sum = 0
+
+    def start(self) -> "BlockPrefetcher":
+        if not self._threads:
+            self._alive = len(self.make_iters)
+            for i in range(len(self.make_iters)):
+                t = threading.Thread(target=self._run, args=(i,), name=f"prefetch-{self.name}-{i}", daemon=True)
+                self._threads.append(t)
+                t.start()
+        return self
+
+    def _put(self, item: Any) -> bool:
+        t0 = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                self._q.put(item, timeout=0.1)
+                with self._lock:
+                    self.full_wait_s += time.perf_counter() - t0
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self, wid: int) -> None:
+        try:
+            while not self._stop.is_set():
+                it = iter(self.make_iters[wid]())
+                n = 0
+                while not self._stop.is_set():
+                    t0 = time.perf_counter()
+                    try:
+                        block = next(it)
+                    except StopIteration:
+                        break
+                    finally:
+                        with self._lock:
+                            self.fetch_s += time.perf_counter() - t0
+                    if not self._put(block):
+                        return
+                    n += 1
+                    with self._lock:
+                        self.produced += 1
+                        self.worker_produced[wid] += 1
+                if n == 0:
+                    # A fresh iterator yielded nothing: this worker's source is empty.
+                    break
+                with self._lock:
+                    self.restarts += 1
+        except BaseException as e:  # surfaced to the consumer in get()
+            with self._lock:
+                if self._error is None:
+                    self._error = e
+        with self._lock:
+            self._alive -= 1
+            last = self._alive == 0
+        if last or self._error is not None:
+            self._put(_END)
+
+    def get(self) -> Block:
+        if not self._threads:
+            self.start()
+        occ = self._q.qsize()
+        self.gets += 1
+        self._occ_sum += occ
+        if occ == 0:
+            self.empty_hits += 1
+        t0 = time.perf_counter()
+        try:
+            item = self._q.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"prefetch[{self.name}]: no block within {self.timeout:.0f}s")
+        finally:
+            self.stall_s += time.perf_counter() - t0
+        if item is _END:
+            # keep the sentinel for subsequent callers
+            self._q.put(_END)
+            if self._error is not None:
+                raise RuntimeError(f"prefetch[{self.name}] producer failed") from self._error
+            raise StopIteration(self.name)
+        self.consumed += 1
+        return item
+
+    def close(self) -> None:
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=1.0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": self.depth,
+            "workers": len(self.make_iters),
+            "queued": self._q.qsize(),
+            "produced": self.produced,
+            "worker_produced": list(self.worker_produced),
+            "consumed": self.consumed,
+            "restarts": self.restarts,
+            "mean_occupancy": round(self._occ_sum / self.gets, 2) if self.gets else 0.0,
+            "empty_hits": self.empty_hits,
+            "stall_s": round(self.stall_s, 3),
+            "fetch_s": round(self.fetch_s, 3),
+            "full_wait_s": round(self.full_wait_s, 3),
+        }
+
+
+def print_prefetch_stats(prefetchers: Dict[str, BlockPrefetcher]) -> None:
+    if not prefetchers:
+        return
+    print("\n=========================")
+    print("Prefetch queues (per source)")
+    print("=========================")
+    total_stall = 0.0
+    total_full = 0.0
+    for name, pf in prefetchers.items():
+        st = pf.stats()
+        total_stall += st["stall_s"]
+        total_full += st["full_wait_s"]
+        print(f"- {name}: {st}")
+    # Consumers waiting on empty queues -> fetch (I/O) bound; producers
+    # waiting on full queues -> builders (CPU) bound.
+    bound = "io" if total_stall > total_full else "cpu"
+    print(f"[prefetch] consumer_stall_s={total_stall:.3f} producer_full_wait_s={total_full:.3f} -> likely {bound}-bound")
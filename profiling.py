@@ -0,0 +1,272 @@
+"""Per-stage timers and opt-in profiling for the builders.
+
+With SFT_STAGE_TIMERS=1 (or SFT_PROFILE=1) the runners call
+`install_profiling(builders, p0, take_rows)`, which swaps the helpers the
+builders call through their module globals for timed wrappers:
+
+  rows       take_rows (row fetch / prefetch wait)
+  diversify  _random_trim_rows, _diversify_values, _pick_attrs, _filter_rows_min_filled
+  serialize  the serialization helpers (safe_json_sized, dict_to_xml_sized, ...)
+  validate   validate_* (syntax and schema self-checks)
+  prompt     prompt_*
+  assemble   sample() (sample dict, id hash, source payload)
+  p0         P0Guard.reject_if_0valid (tokenization)
+  append     append_with_p0 minus P0 (dedup, counters)
+  gate       gated_append minus the append it triggers
+  log        failure dumps
+
+Times are exclusive (a nested stage is not counted in its caller), and the
+rest of an attempt is reported as `other`. They are aggregated per pack and
+per subcategory; an attempt is attributed to the subcategory of the sample it
+built (`-` when it built none). Nothing is installed when disabled, so the
+builders run unchanged.
+
+SFT_PROFILE=1 additionally runs one cProfile profiler per pack (switched when
+the builder changes) and a stack sampler on the main thread; results go to
+`_debug/profile/<pack>.pstats` and `_debug/profile/stacks.collapsed`
+(flamegraph.pl / speedscope "collapsed" format, rooted at the pack name).
+"""
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config import DEBUG_DIR, PROFILE, PROFILE_SAMPLE_MS, STAGE_TIMERS
+from .metrics import observe
+
+PROFILE_DIR = os.path.join(DEBUG_DIR, "profile")
+TIMINGS_PATH = os.path.join(DEBUG_DIR, "stage_timings.json")
+
+STAGES = ("rows", "diversify", "serialize", "validate", "prompt", "assemble", "p0", "append", "gate", "log", "other")
+
+_FIXED = {
+    "_random_trim_rows": "diversify",
+    "_diversify_values": "diversify",
+    "_pick_attrs": "diversify",
+    "_filter_rows_min_filled": "diversify",
+    "sample": "assemble",
+    "append_with_p0": "append",
+    "gated_append": "gate",
+    "_dump_xml_failure": "log",
+    "_dump_toml_failure": "log",
+}
+
+
+def _stage_of(name: str, obj: Any) -> Optional[str]:
+    if not callable(obj) or isinstance(obj, type):
+        return None
+    if name in _FIXED:
+        return _FIXED[name]
+    if name.startswith("prompt_"):
+        return "prompt"
+    if name.startswith("validate_"):
+        return "validate"
+    if getattr(obj, "__module__", "").endswith(".serialization"):
+        return "serialize"
+    return None
+
+
+class StageProfiler:
+    def __init__(self, profile: bool = False, sample_ms: float = PROFILE_SAMPLE_MS):
+        self.stats: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self._stack: List[float] = []
+        self._buf: Dict[str, float] = {}
+        self._pack: Optional[str] = None
+        self._sub: Optional[str] = None
+        self._t_start = 0.0
+        self._t_last = 0.0
+        self.profile = profile
+        self._profilers: Dict[str, cProfile.Profile] = {}
+        self._active: Optional[cProfile.Profile] = None
+        self._stacks: Dict[str, int] = {}
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._main = threading.main_thread().ident
+        self.sample_s = max(0.001, sample_ms / 1000.0)
+
+    # -- timing ---------------------------------------------------------------
+
+    def wrap(self, fn: Callable, stage: str) -> Callable:
+        prof = self
+
+        def timed(*args, **kwargs):
+            prof._stack.append(0.0)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                t1 = time.perf_counter()
+                dt = t1 - t0
+                child = prof._stack.pop()
+                if prof._stack:
+                    prof._stack[-1] += dt
+                prof._buf[stage] = prof._buf.get(stage, 0.0) + (dt - child)
+                prof._t_last = t1
+
+        timed.__wrapped__ = fn
+        return timed
+
+    def wrap_sample(self, fn: Callable) -> Callable:
+        timed = self.wrap(fn, "assemble")
+
+        def sample(*args, **kwargs):
+            self._sub = kwargs.get("sub", args[1] if len(args) > 1 else None)
+            return timed(*args, **kwargs)
+
+        sample.__wrapped__ = fn
+        return sample
+
+    def _flush(self) -> None:
+        if self._pack is None:
+            return
+        total = max(0.0, self._t_last - self._t_start)
+        staged = sum(self._buf.values())
+        key = (self._pack, self._sub if isinstance(self._sub, str) else "-")
+        d = self.stats.setdefault(key, {"n": 0.0})
+        d["n"] += 1
+        for stage, secs in self._buf.items():
+            d[stage] = d.get(stage, 0.0) + secs
+        d["other"] = d.get("other", 0.0) + max(0.0, total - staged)
+        observe("attempt_seconds", total, pack=self._pack)
+        self._buf = {}
+        self._sub = None
+
+    def attempt(self, fname: str) -> None:
+        # rows are fetched right after this call, so the attempt starts here
+        self._flush()
+        if self.profile and fname != self._pack:
+            self._switch_profiler(fname)
+        self._pack = fname
+        self._t_start = self._t_last = time.perf_counter()
+
+    # -- cProfile / stack sampling ---------------------------------------------
+
+    def _switch_profiler(self, fname: str) -> None:
+        if self._active is not None:
+            self._active.disable()
+        self._active = self._profilers.setdefault(fname, cProfile.Profile())
+        self._active.enable()
+        if self._sampler is None:
+            self._sampler = threading.Thread(target=self._sample_loop, name="stack-sampler", daemon=True)
+            self._sampler.start()
+
+    def _sample_loop(self) -> None:
+        while not self._stop.wait(self.sample_s):
+            frame = sys._current_frames().get(self._main)
+            pack = self._pack
+            if frame is None or pack is None:
+                continue
+            names = []
+            while frame is not None:
+                co = frame.f_code
+                if co.co_filename != __file__:  # hide the timing wrappers
+                    names.append(f"{os.path.basename(co.co_filename)}:{co.co_name}")
+                frame = frame.f_back
+            key = ";".join([pack] + names[::-1])
+            self._stacks[key] = self._stacks.get(key, 0) + 1
+
+    def close(self) -> None:
+        self._flush()
+        self._pack = None
+        if self._active is not None:
+            self._active.disable()
+            self._active = None
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+
+    # -- reporting ---------------------------------------------------------------
+
+    def per_pack(self) -> Dict[str, Dict[str, float]]:
+        out: Dict[str, Dict[str, float]] = {}
+        for (pack, _), d in self.stats.items():
+            agg = out.setdefault(pack, {})
+            for k, v in d.items():
+                agg[k] = agg.get(k, 0.0) + v
+        return out
+
+    def save(self) -> List[str]:
+        paths = []
+        os.makedirs(os.path.dirname(TIMINGS_PATH) or ".", exist_ok=True)
+        with open(TIMINGS_PATH, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "packs": self.per_pack(),
+                    "subcategories": {f"{p}:{s}": d for (p, s), d in self.stats.items()},
+                },
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+        paths.append(TIMINGS_PATH)
+        if self._profilers or self._stacks:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+        for fname, prof in self._profilers.items():
+            path = os.path.join(PROFILE_DIR, os.path.splitext(fname)[0] + ".pstats")
+            prof.dump_stats(path)
+            paths.append(path)
+        if self._stacks:
+            path = os.path.join(PROFILE_DIR, "stacks.collapsed")
+            with open(path, "w", encoding="utf-8") as f:
+                for key, n in sorted(self._stacks.items()):
+                    f.write(f"{key} {n}\n")
+            paths.append(path)
+        return paths
+
+
+def _row(label: str, d: Dict[str, float]) -> str:
+    total = sum(v for k, v in d.items() if k != "n")
+    parts = " ".join(f"{s}={100.0 * d.get(s, 0.0) / total:.0f}%" for s in STAGES if d.get(s, 0.0) > 0) if total else ""
+    return f"{label}: attempts={int(d.get('n', 0))} total={1000.0 * total:.1f}ms {parts}"
+
+
+_PROF: Optional[StageProfiler] = None
+
+
+def install_profiling(builders: Any, p0: Any, take_rows: Callable) -> Callable:
+    """Wrap the builders' helpers with stage timers; returns the take_rows to use.
+
+    No-op (returns `take_rows` unchanged) unless SFT_STAGE_TIMERS or SFT_PROFILE is set.
+    """
+    global _PROF
+    if not (STAGE_TIMERS or PROFILE):
+        return take_rows
+    prof = _PROF = StageProfiler(profile=PROFILE)
+    for name, obj in list(vars(builders).items()):
+        stage = _stage_of(name, obj)
+        if stage is None:
+            continue
+        setattr(builders, name, prof.wrap_sample(obj) if name == "sample" else prof.wrap(obj, stage))
+    note_attempt = builders.note_attempt
+
+    def attempt(fname: str) -> None:
+        prof.attempt(fname)
+        note_attempt(fname)
+
+    builders.note_attempt = attempt
+    if p0 is not None:
+        p0.reject_if_0valid = prof.wrap(p0.reject_if_0valid, "p0")
+    return prof.wrap(take_rows, "rows")
+
+
+def print_stage_stats(breakdown: bool = True) -> None:
+    """Print the stage table and write timings (and profiles) under _debug."""
+    if _PROF is None:
+        return
+    _PROF.close()
+    print("\n=========================")
+    print("Stage breakdown (exclusive time)")
+    print("=========================")
+    subs: Dict[str, List[Tuple[str, Dict[str, float]]]] = {}
+    for (pack, sub), d in _PROF.stats.items():
+        subs.setdefault(pack, []).append((sub, d))
+    for pack, d in _PROF.per_pack().items():
+        print(_row(f"- {pack}", d))
+        if breakdown and len(subs[pack]) > 1:
+            for sub, sd in sorted(subs[pack]):
+                print(_row(f"    {sub}", sd))
+    for path in _PROF.save():
+        print("[profile]", path)
@@ -0,0 +1,284 @@
+"""Per-pack progress and throughput telemetry for the builders.
+
+The runners call `start_progress(BUDGET)` before building and
+`finish_progress()` at the end; in between the builders report every attempt
+(`note_attempt`), accepted sample (`note_accept`) and reject with its reason
+(`note_reject`: size, validation, schema, roundtrip, p0, dedup, empty).
+Attempts that end without a recorded reason show up as `other`.
+
+A status table (accepted/target, samples/s, attempts per accepted sample,
+rejects by reason, ETA) is refreshed at most every PROGRESS_INTERVAL seconds:
+updated in place in a notebook, printed as a block in a terminal. A pack with
+attempts but no accepted sample for PROGRESS_STALL_SEC is flagged STALLED.
+The final table is written to `_debug/progress_summary.json`.
+
+Reject cost: every attempt's wall time (from its `note_attempt` to the next)
+is charged to its outcome, `accepted` or the reject reason refined by the
+detail the builder passes (`size/xml_oversize`, `validation/toml_invalid`,
+`empty/min_filled`, `p0/boundary_ge_full_len`, `dedup`, ...). Samples held by
+the inline gate keep their attempt's time until the gate resolves them. The
+final summary ranks seconds wasted per reason per pack.
+"""
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from .config import DEBUG_DIR, PROGRESS, PROGRESS_INTERVAL, PROGRESS_STALL_SEC
+
+SUMMARY_PATH = os.path.join(DEBUG_DIR, "progress_summary.json")
+
+
+class PackProgress:
+    __slots__ = ("target", "accepted", "attempts", "rejects", "t_first", "t_last_accept")
+
+    def __init__(self, target: int):
+        self.target = target
+        self.accepted = 0
+        self.attempts = 0
+        self.rejects: Dict[str, int] = {}
+        self.t_first: Optional[float] = None
+        self.t_last_accept: Optional[float] = None
+
+    def row(self, now: float, stall_sec: float) -> Dict[str, Any]:
+        left = max(0, self.target - self.accepted)
+        # a finished pack's clock stops at its last accepted sample
+        end = self.t_last_accept if (not left and self.t_last_accept is not None) else now
+        elapsed = (end - self.t_first) if self.t_first is not None else 0.0
+        rate = self.accepted / elapsed if elapsed > 0 else 0.0
+        rejects = dict(self.rejects)
+        other = self.attempts - self.accepted - sum(rejects.values())
+        if other > 0:
+            rejects["other"] = other
+        last = self.t_last_accept if self.t_last_accept is not None else self.t_first
+        stalled = left > 0 and last is not None and self.attempts > 0 and now - last >= stall_sec
+        return {
+            "accepted": self.accepted,
+            "target": self.target,
+            "attempts": self.attempts,
+            "per_sec": round(rate, 2),
+            "attempts_per_accept": round(self.attempts / self.accepted, 2) if self.accepted else None,
+            "rejects": rejects,
+            "elapsed_s": round(elapsed, 1),
+            "eta_s": (round(left / rate, 1) if rate > 0 else None) if left else 0.0,
+            "stalled": stalled,
+        }
+
+
+def _in_notebook() -> bool:
+    try:
+        from IPython import get_ipython
+    except Exception:
+        return False
+    ip = get_ipython()
+    return ip is not None and type(ip).__name__ == "ZMQInteractiveShell"
+
+
+class _Deferred:
+    """Attempt handed to the inline gate; its outcome is recorded later."""
+
+    __slots__ = ("t0", "dt")
+
+    def __init__(self, t0: float):
+        self.t0 = t0
+        self.dt: Optional[float] = None
+
+    def seconds(self) -> float:
+        return self.dt if self.dt is not None else time.monotonic() - self.t0
+
+
+def _dur(secs: float) -> str:
+    return f"{secs:.2f}s" if secs >= 1.0 else f"{1000.0 * secs:.1f}ms"
+
+
+class ProgressTracker:
+    def __init__(self, targets: Dict[str, int], interval: float = PROGRESS_INTERVAL, stall_sec: float = PROGRESS_STALL_SEC):
+        self.packs: Dict[str, PackProgress] = {k: PackProgress(int(v)) for k, v in targets.items()}
+        self.interval = max(0.0, float(interval))
+        self.stall_sec = float(stall_sec)
+        self.t0 = time.monotonic()
+        self._next = self.t0 + self.interval
+        self._handle = None
+        self._notebook = _in_notebook()
+        # reject cost: pack -> outcome key -> [attempts, seconds]
+        self.cost: Dict[str, Dict[str, List[float]]] = {}
+        self._cur: Optional[str] = None
+        self._t_att = 0.0
+        self._key: Optional[str] = None
+        self._deferred: Optional[_Deferred] = None
+        self._resolving: Optional[_Deferred] = None
+
+    def _pack(self, fname: str) -> PackProgress:
+        p = self.packs.get(fname)
+        if p is None:
+            p = self.packs[fname] = PackProgress(0)
+        return p
+
+    def attempt(self, fname: str) -> None:
+        now = time.monotonic()
+        self._close(now)
+        self._cur, self._t_att = fname, now
+        p = self._pack(fname)
+        p.attempts += 1
+        if p.t_first is None:
+            p.t_first = now
+        self.tick()
+
+    def accept(self, fname: str) -> None:
+        p = self._pack(fname)
+        p.accepted += 1
+        p.t_last_accept = time.monotonic()
+        self._outcome(fname, "accepted")
+        self.tick()
+
+    def reject(self, fname: str, reason: str, detail: str = "") -> None:
+        p = self._pack(fname)
+        p.rejects[reason] = p.rejects.get(reason, 0) + 1
+        self._outcome(fname, f"{reason}/{detail}" if detail else reason)
+
+    # -- reject cost -------------------------------------------------------------
+
+    def _charge(self, fname: str, key: str, secs: float) -> None:
+        c = self.cost.setdefault(fname, {}).setdefault(key, [0, 0.0])
+        c[0] += 1
+        c[1] += secs
+
+    def _outcome(self, fname: str, key: str) -> None:
+        if self._resolving is not None:
+            self._charge(fname, key, self._resolving.seconds())
+            self._resolving = None
+        elif fname == self._cur and self._key is None and self._deferred is None:
+            self._key = key  # charged when the attempt ends
+
+    def _close(self, now: float) -> None:
+        if self._cur is None:
+            return
+        dt = now - self._t_att
+        if self._deferred is not None:
+            self._deferred.dt = dt
+        else:
+            self._charge(self._cur, self._key or "other", dt)
+        self._cur, self._key, self._deferred = None, None, None
+
+    def defer(self, fname: str) -> _Deferred:
+        d = _Deferred(self._t_att if fname == self._cur else time.monotonic())
+        if fname == self._cur and self._key is None:
+            self._deferred = d
+        return d
+
+    def resolve(self, d: Optional[_Deferred]) -> None:
+        """Charge the next outcome recorded to the deferred attempt `d`."""
+        self._resolving = d
+
+    def close(self) -> None:
+        self._close(time.monotonic())
+
+    def cost_summary(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        return {
+            fname: {k: {"attempts": int(n), "seconds": round(secs, 6)} for k, (n, secs) in sorted(d.items(), key=lambda kv: -kv[1][1])}
+            for fname, d in self.cost.items()
+        }
+
+    def cost_lines(self, top: int = 10) -> List[str]:
+        out = []
+        ranked = []
+        for fname, d in self.cost.items():
+            total = sum(secs for _, secs in d.values())
+            wasted = sum(secs for k, (_, secs) in d.items() if k != "accepted")
+            if total > 0:
+                out.append(f"- {fname}: wasted={_dur(wasted)} of {_dur(total)} ({100.0 * wasted / total:.0f}%)")
+            ranked += [(secs, fname, k, n) for k, (n, secs) in d.items() if k != "accepted"]
+        ranked.sort(reverse=True)
+        if ranked:
+            out.append("Top reasons by seconds wasted:")
+        for secs, fname, k, n in ranked[:top]:
+            out.append(f"  {_dur(secs)}  {fname} {k}  n={int(n)} avg={1000.0 * secs / n:.2f}ms")
+        return out
+
+    def tick(self) -> None:
+        if self.interval > 0 and time.monotonic() >= self._next:
+            self.render()
+
+    def summary(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "elapsed_s": round(now - self.t0, 1),
+            "packs": {k: p.row(now, self.stall_sec) for k, p in self.packs.items() if p.attempts or p.accepted},
+        }
+
+    def lines(self) -> List[str]:
+        st = self.summary()
+        out = [f"[progress] elapsed={st['elapsed_s']}s"]
+        for fname, r in st["packs"].items():
+            eta = "-" if r["eta_s"] is None else f"{r['eta_s']}s"
+            rej = " ".join(f"{k}={v}" for k, v in sorted(r["rejects"].items())) or "-"
+            flag = "  STALLED" if r["stalled"] else ""
+            out.append(
+                f"- {fname}: {r['accepted']}/{r['target']} {r['per_sec']}/s "
+                f"attempts/acc={r['attempts_per_accept']} rejects[{rej}] eta={eta}{flag}"
+            )
+        return out
+
+    def render(self) -> None:
+        self._next = time.monotonic() + self.interval
+        text = "\n".join(self.lines())
+        if self._notebook:
+            from IPython.display import Pretty, display
+
+            if self._handle is None:
+                self._handle = display(Pretty(text), display_id=True)
+            else:
+                self._handle.update(Pretty(text))
+            return
+        print(text, flush=True)
+
+
+_TRACKER: Optional[ProgressTracker] = None
+
+
+def start_progress(targets: Dict[str, int]) -> Optional[ProgressTracker]:
+    global _TRACKER
+    _TRACKER = ProgressTracker(targets) if PROGRESS else None
+    return _TRACKER
+
+
+def note_attempt(fname: str) -> None:
+    if _TRACKER is not None:
+        _TRACKER.attempt(fname)
+
+
+def note_accept(fname: str) -> None:
+    if _TRACKER is not None:
+        _TRACKER.accept(fname)
+
+
+def note_reject(fname: str, reason: str, detail: str = "") -> None:
+    if _TRACKER is not None:
+        _TRACKER.reject(fname, reason, detail)
+
+
+def defer_attempt(fname: str) -> Optional[_Deferred]:
+    """Mark the current attempt as held by the inline gate; see `resolve_deferred`."""
+    return _TRACKER.defer(fname) if _TRACKER is not None else None
+
+
+def resolve_deferred(d: Optional[_Deferred]) -> None:
+    if _TRACKER is not None:
+        _TRACKER.resolve(d)
+
+
+def finish_progress(path: str = SUMMARY_PATH) -> None:
+    """Render the final table and save it as JSON."""
+    if _TRACKER is None:
+        return
+    _TRACKER.close()
+    print("\n=========================")
+    print("Progress summary")
+    print("=========================")
+    print("\n".join(_TRACKER.lines()))
+    print("\nReject cost (attempt time by outcome)")
+    print("\n".join(_TRACKER.cost_lines()))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({**_TRACKER.summary(), "reject_cost": _TRACKER.cost_summary()}, f, ensure_ascii=False, indent=2)
+    print("[progress] summary:", path)
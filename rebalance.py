@@ -0,0 +1,214 @@
+"""Rebalance generated packs to the target output-format mix without regenerating.
+
+Usage:
+  python -m sft_builder.rebalance [--out DIR] [--seed S] [--total N] [--mode downsample|reweight]
+
+Reads the line index of each pack under OUT_DIR (jsonl_index), detects every
+record's output format (from the subcategory, or from the answer for
+subcategories such as `text_to_json_schema` that do not name it) and picks the
+largest subset whose format shares match DESIRED_OUTPUT_COUNTS x
+FOCUS_MULTIPLIER (report._normalize_desired_counts). Each format's quota is
+split over its (file, subcategory) strata in proportion to their size, and
+rows are drawn per stratum with a seeded RNG, so the same seed always selects
+the same records. Selected lines are copied byte-for-byte in file order; full
+records are only parsed for the answer-based format fallback.
+
+`--mode reweight` keeps every record and writes per-stratum sample weights to
+the manifest instead. Records whose format has no desired share are kept as-is.
+The result goes to `<OUT_DIR>_rebalanced/` with `rebalance_manifest.json`.
+"""
+import argparse
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .config import DESIRED_OUTPUT_COUNTS, FOCUS_MULTIPLIER, OUT_DIR
+from .jsonl_index import JsonlIndex
+from .report import _normalize_desired_counts, detect_output_format, detect_output_format_from_subcategory
+from .validation_engine import FILES
+
+MANIFEST = "rebalance_manifest.json"
+
+# (file, subcategory, format)
+Stratum = Tuple[str, str, str]
+
+
+def _row_formats(idx: JsonlIndex) -> List[str]:
+    """Output format per row; records are parsed only when the subcategory does not name it."""
+    by_code = [detect_output_format_from_subcategory(sub) for sub in idx.vocab]
+    fmts: List[str] = []
+    for row in range(len(idx)):
+        fmt = by_code[int(idx.sub_code[row])] if by_code else None
+        if fmt is None:
+            try:
+                fmt = detect_output_format(idx.get(row))
+            except Exception:
+                fmt = "unknown"
+        fmts.append(fmt)
+    return fmts
+
+
+def _largest_remainder(
+    weights: Dict[str, float], total: int, caps: Dict[str, int], at_least_one: bool = False
+) -> Dict[str, int]:
+    """Integer split of `total` proportional to `weights`, never above `caps`.
+
+    With `at_least_one`, every key gets one item when `total` allows it.
+    """
+    s = sum(weights.values())
+    if s <= 0 or total <= 0:
+        return {k: 0 for k in weights}
+    alloc = {k: total * w / s for k, w in weights.items()}
+    floor = 1 if at_least_one and total >= len(weights) else 0
+    take = {k: min(caps[k], max(floor, int(np.floor(v)))) for k, v in alloc.items()}
+    # the >=1 floor can overshoot; trim from the largest allocations until it fits
+    while sum(take.values()) > total:
+        k = min((k for k in take if take[k] > 1), key=lambda k: (-take[k], k))
+        take[k] -= 1
+    left = total - sum(take.values())
+    for k in sorted(alloc, key=lambda k: (-(alloc[k] - np.floor(alloc[k])), k)):
+        if left <= 0:
+            break
+        if take[k] < caps[k]:
+            take[k] += 1
+            left -= 1
+    return take
+
+
+def plan(
+    strata: Dict[Stratum, int],
+    desired_share: Dict[str, float],
+    total: Optional[int] = None,
+) -> Tuple[Dict[str, int], Dict[str, int], Dict[Stratum, int]]:
+    """Return (available, target) per format and the quota per stratum."""
+    available: Dict[str, int] = {}
+    for (_, _, fmt), n in strata.items():
+        available[fmt] = available.get(fmt, 0) + n
+
+    share = {f: s for f, s in desired_share.items() if s > 0 and available.get(f, 0) > 0}
+    ssum = sum(share.values())
+    share = {f: s / ssum for f, s in share.items()} if ssum > 0 else {}
+    # Largest total whose every format fits in what was generated
+    t_max = min((available[f] / s for f, s in share.items()), default=0.0)
+    if total is not None:
+        t_max = min(t_max, float(total))
+    target = _largest_remainder(share, int(np.floor(t_max + 1e-9)), {f: available[f] for f in share})
+    for fmt, n in available.items():
+        if fmt not in target:
+            target[fmt] = n  # no desired share: keep as-is
+
+    quota: Dict[Stratum, int] = {}
+    for fmt, want in target.items():
+        members = {s: n for s, n in strata.items() if s[2] == fmt}
+        split = _largest_remainder(
+            {_key(s): float(n) for s, n in members.items()}, want, {_key(s): n for s, n in members.items()}, at_least_one=True
+        )
+        for s in members:
+            quota[s] = split[_key(s)]
+    return available, target, quota
+
+
+def _key(s: Stratum) -> str:
+    return "\t".join(s)
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Rebalance output packs to the desired output-format shares.")
+    ap.add_argument("--out", default=OUT_DIR.rstrip("/\\") + "_rebalanced", help="output directory")
+    ap.add_argument("--seed", type=int, default=0, help="random seed for row selection")
+    ap.add_argument("--total", type=int, default=None, help="cap on the number of records in desired formats")
+    ap.add_argument("--mode", choices=("downsample", "reweight"), default="downsample")
+    args = ap.parse_args(argv)
+
+    if os.path.abspath(args.out) == os.path.abspath(OUT_DIR):
+        raise SystemExit("--out must differ from OUT_DIR")
+
+    desired_share = _normalize_desired_counts(DESIRED_OUTPUT_COUNTS, FOCUS_MULTIPLIER)
+    indexes: Dict[str, JsonlIndex] = {}
+    row_strata: Dict[str, np.ndarray] = {}
+    strata_ids: Dict[Stratum, int] = {}
+    strata: Dict[Stratum, int] = {}
+    for fn in FILES:
+        path = os.path.join(OUT_DIR, fn)
+        if not os.path.exists(path):
+            print("[skip] not found:", path)
+            continue
+        idx = indexes[fn] = JsonlIndex(path)
+        fmts = _row_formats(idx)
+        ids = np.zeros(len(idx), dtype=np.int64)
+        for row, fmt in enumerate(fmts):
+            s = (fn, idx.subcategory(row), fmt)
+            sid = strata_ids.setdefault(s, len(strata_ids))
+            strata[s] = strata.get(s, 0) + 1
+            ids[row] = sid
+        row_strata[fn] = ids
+
+    available, target, quota = plan(strata, desired_share, args.total)
+
+    rng = np.random.default_rng(args.seed)
+    os.makedirs(args.out, exist_ok=True)
+    files_out: Dict[str, Dict[str, int]] = {}
+    selected: Dict[str, int] = {f: 0 for f in available}
+    for fn, idx in indexes.items():
+        ids = row_strata[fn]
+        keep = np.ones(len(idx), dtype=bool)
+        if args.mode == "downsample":
+            keep[:] = False
+            # strata in first-seen order, so the RNG stream is fixed for a given input
+            for s, sid in strata_ids.items():
+                if s[0] != fn:
+                    continue
+                rows = np.flatnonzero(ids == sid)
+                k = quota[s]
+                keep[rows if k >= rows.size else rng.choice(rows, size=k, replace=False)] = True
+        for s, sid in strata_ids.items():
+            if s[0] == fn:
+                selected[s[2]] += int(keep[ids == sid].sum())
+        with open(os.path.join(args.out, fn), "wb") as f:
+            for row in np.flatnonzero(keep):
+                f.write(idx.line(int(row)) + b"\n")
+        files_out[fn] = {"total": len(idx), "kept": int(keep.sum())}
+        idx.close()
+
+    # Reweighting keeps every record: a format's weight scales its count to its desired share
+    n_desired = sum(n for f, n in available.items() if desired_share.get(f, 0) > 0)
+    fmt_weight = {f: (target[f] / n if desired_share.get(f, 0) > 0 else 1.0) for f, n in available.items()}
+    wsum = sum(target[f] for f in available if desired_share.get(f, 0) > 0)
+    if wsum:
+        fmt_weight = {f: (w * n_desired / wsum if desired_share.get(f, 0) > 0 else w) for f, w in fmt_weight.items()}
+    weights = {_key(s): fmt_weight[s[2]] for s in strata} if args.mode == "reweight" else {}
+    manifest = {
+        "source_dir": os.path.abspath(OUT_DIR),
+        "mode": args.mode,
+        "seed": args.seed,
+        "total_cap": args.total,
+        "desired_share": desired_share,
+        "available": available,
+        "target": target,
+        "selected": selected,
+        "files": files_out,
+        "strata": [
+            {"file": s[0], "subcategory": s[1], "format": s[2], "available": n, "quota": quota[s]}
+            for s, n in strata.items()
+        ],
+    }
+    if weights:
+        manifest["weights"] = weights
+    with open(os.path.join(args.out, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    print("\n=========================")
+    print("Rebalance (" + args.mode + ")")
+    print("=========================")
+    print("Desired share:", desired_share)
+    print("Available:", available)
+    print("Target:", target)
+    for fn, d in files_out.items():
+        print(f"- {fn}: kept={d['kept']}/{d['total']}")
+    print("manifest:", os.path.join(args.out, MANIFEST))
+
+
+if __name__ == "__main__":
+    main()
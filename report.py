@@ -110,8 +110,34 @@ def suggest_budget_from_output_mix(
     return alloc
 
 
-def print_report(outputs):
-    per_file_counts = count_output_formats(outputs)
+def counted_output_formats(outputs: Optional[Dict[str, List[Dict[str, Any]]]] = None, counters=None) -> Dict[str, Dict[str, int]]:
+    """Per-file format counts from the append-time counters.
+
+    Files whose counter total disagrees with the samples in `outputs` (samples
+    appended outside `append_with_p0`) are recounted from the samples.
+    """
+    from .format_counters import COUNTERS
+
+    counters = COUNTERS if counters is None else counters
+    if outputs is None:
+        order = [f for f in BUDGET if f in counters.formats] + [f for f in counters.formats if f not in BUDGET]
+        return {fname: dict(counters.formats[fname]) for fname in order}
+    per_file: Dict[str, Dict[str, int]] = {}
+    for fname, rows in outputs.items():
+        if counters.total(fname) == len(rows):
+            per_file[fname] = dict(counters.formats.get(fname, {}))
+        else:
+            per_file.update(count_output_formats({fname: rows}))
+    return per_file
+
+
+def print_report(outputs=None, counters=None):
+    """Print format counts and the AUTO-BUDGET suggestion.
+
+    Counts come from format_counters; `outputs` may be None when the samples
+    are no longer in memory (e.g. counters loaded from _debug).
+    """
+    per_file_counts = counted_output_formats(outputs, counters)
     totals = summarize_fmt_counts(per_file_counts)
     print("\n=========================")
     print("Output-format counts (per file)")
@@ -135,3 +161,13 @@ def print_report(outputs):
     print("Current BUDGET:", BUDGET)
     print("Suggested BUDGET:", suggested)
 
+
+def main():
+    """Print the report from the counters saved by write_outputs (no samples needed)."""
+    from .format_counters import COUNTERS_PATH, FormatCounters
+
+    print_report(None, FormatCounters.load(COUNTERS_PATH))
+
+
+if __name__ == "__main__":
+    main()
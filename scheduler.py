@@ -0,0 +1,245 @@
+"""Closed-loop scheduler that interleaves the pack builders.
+
+With SCHEDULER enabled the runners call `run_scheduled` instead of running
+each builder to its BUDGET in turn. The scheduler steps one builder at a time
+(by raising that pack's BUDGET entry to len+1, so the builder returns after
+one accepted sample) and tracks live output-format counts from the known
+subcategories. Before each step it:
+
+- picks the pack whose expected formats best cover the remaining deficit
+  against DESIRED_OUTPUT_COUNTS x FOCUS_MULTIPLIER, discounted by the pack's
+  observed acceptance rate (rows drawn per accepted sample);
+- reweights that pack's mode probabilities (TABULAR_JSON_TO_CSV_PROB,
+  XML_OUT_PROBS, TOML_OUT_PROBS, YAML_OUT_PROBS) toward formats still in
+  deficit, and toward modes that fell behind their configured share.
+
+The total number of samples is the sum of the scheduled BUDGET entries, and
+each pack ends within [SCHED_MIN_SCALE, SCHED_MAX_SCALE] x its BUDGET.
+BUDGET and the probability knobs are restored afterwards.
+"""
+import math
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .config import SCHED_MAX_SCALE, SCHED_MIN_SCALE
+from .report import _normalize_desired_counts, detect_output_format
+
+
+class PackSpec(NamedTuple):
+    fname: str
+    builder: str
+    knob: Optional[str]  # probability knob in the builders module, if any
+    modes: Dict[str, Tuple[str, str]]  # knob key -> (subcategory, output format)
+
+
+# Runner order; also the tie-break order
+_PACKS: List[PackSpec] = [
+    PackSpec("sft_core_c_tabular.jsonl", "build_core_tabular", "TABULAR_JSON_TO_CSV_PROB",
+             {"csv": ("json_to_csv", "csv"), "json": ("csv_to_json", "json")}),
+    PackSpec("sft_core_c_xml_in.jsonl", "build_core_xml_in", None, {"": ("xml_to_json", "json")}),
+    PackSpec("sft_core_g_gtfs.jsonl", "build_core_gtfs", None, {"": ("text_to_json", "json")}),
+    PackSpec("sft_core_c_text_to_json_schema.jsonl", "build_core_text_to_json_schema", None,
+             {"": ("text_to_json_schema", "json")}),
+    PackSpec("sft_core_c_text_to_json_schema_nested.jsonl", "build_core_text_to_json_schema_nested", None,
+             {"": ("text_to_json_schema_nested", "json")}),
+    PackSpec("sft_core_c_text_to_yaml_schema.jsonl", "build_core_text_to_yaml_schema", None,
+             {"": ("text_to_yaml_schema", "yaml")}),
+    PackSpec("sft_core_c_text_to_toml_schema.jsonl", "build_core_text_to_toml_schema", None,
+             {"": ("text_to_toml_schema", "toml")}),
+    PackSpec("sft_pack_hard_mixed.jsonl", "build_pack_hard_mixed", None, {"": ("constraint_to_json", "json")}),
+    PackSpec("sft_core_c_xml_out.jsonl", "build_core_xml_out", "XML_OUT_PROBS",
+             {"json": ("json_to_xml", "xml"), "yaml": ("yaml_to_xml", "xml"),
+              "csv": ("csv_to_xml", "xml"), "text": ("text_to_xml", "xml")}),
+    PackSpec("sft_core_c_toml_out.jsonl", "build_core_toml_out", "TOML_OUT_PROBS",
+             {"json": ("json_to_toml", "toml"), "yaml": ("yaml_to_toml", "toml"),
+              "text": ("text_to_toml", "toml"), "toml2json": ("toml_to_json", "json")}),
+    PackSpec("sft_core_c_yaml_out_min.jsonl", "build_core_yaml_out_min", "YAML_OUT_PROBS",
+             {"xml": ("xml_to_yaml", "yaml"), "csv": ("csv_to_yaml", "yaml"),
+              "text": ("text_to_yaml", "yaml"), "json": ("json_to_yaml", "yaml")}),
+]
+
+
+class _PackState:
+    def __init__(self, spec: PackSpec, base: Dict[str, float], budget: int, min_scale: float, max_scale: float):
+        self.spec = spec
+        self.base = base
+        self.budget = budget
+        self.floor = int(math.floor(budget * min_scale))
+        self.cap = max(self.floor, int(math.ceil(budget * max_scale)))
+        self.n = 0
+        self.attempts = 0
+        self.by_sub: Dict[str, int] = {}
+
+
+class AdaptiveScheduler:
+    def __init__(
+        self,
+        builders: Any,
+        desired_counts: Dict[str, int],
+        focus: Dict[str, float],
+        min_scale: float = SCHED_MIN_SCALE,
+        max_scale: float = SCHED_MAX_SCALE,
+    ):
+        self.mod = builders
+        self.budget: Dict[str, int] = builders.BUDGET
+        self.packs: List[_PackState] = []
+        for spec in _PACKS:
+            if spec.fname not in self.budget or not hasattr(builders, spec.builder) or self.budget[spec.fname] <= 0:
+                continue
+            self.packs.append(_PackState(spec, self._read_knob(spec), self.budget[spec.fname], min_scale, max_scale))
+        self.total = sum(p.budget for p in self.packs)
+        share = _normalize_desired_counts(desired_counts, focus)
+        self.target = {f: s * self.total for f, s in share.items()}
+        self.counts: Dict[str, int] = {f: 0 for f in self.target}
+        self.steps = 0
+
+    # -- knobs --------------------------------------------------------------
+
+    def _read_knob(self, spec: PackSpec) -> Dict[str, float]:
+        if spec.knob is None:
+            return {"": 1.0}
+        val = getattr(self.mod, spec.knob)
+        if isinstance(val, dict):
+            return {k: float(val.get(k, 0.0)) for k in spec.modes}
+        return {"csv": float(val), "json": 1.0 - float(val)}
+
+    def _write_knob(self, spec: PackSpec, probs: Dict[str, float]) -> None:
+        if spec.knob is None:
+            return
+        val = getattr(self.mod, spec.knob)
+        if isinstance(val, dict):
+            val.update(probs)  # shared with config; mutated in place
+        else:
+            setattr(self.mod, spec.knob, probs["csv"])
+
+    # -- policy -------------------------------------------------------------
+
+    def _deficit(self, fmt: str) -> float:
+        """Remaining share of a format's target in [-inf, 1]; -1 for formats with no target."""
+        t = self.target.get(fmt, 0.0)
+        if t <= 0:
+            return -1.0
+        return (t - self.counts.get(fmt, 0)) / t
+
+    def mode_probs(self, p: _PackState) -> Dict[str, float]:
+        w: Dict[str, float] = {}
+        for key, (sub, fmt) in p.spec.modes.items():
+            b = p.base.get(key, 0.0)
+            if b <= 0:
+                w[key] = 0.0
+                continue
+            fmt_gain = min(2.0, max(0.1, 1.0 + self._deficit(fmt)))
+            # modes that fell behind their configured share catch up (failures per mode differ)
+            catch_up = min(2.0, max(0.5, b * (p.n + 1) / (p.by_sub.get(sub, 0) + 1)))
+            w[key] = b * fmt_gain * catch_up
+        s = sum(w.values())
+        return {k: (v / s if s > 0 else p.base.get(k, 0.0)) for k, v in w.items()}
+
+    def _value(self, p: _PackState, probs: Dict[str, float]) -> float:
+        v = sum(probs[key] * self._deficit(fmt) for key, (_, fmt) in p.spec.modes.items())
+        accept = (p.n + 1) / (p.attempts + 1)
+        # a cheap pack is preferred only for formats still in deficit
+        return v * accept if v > 0 else v
+
+    def pick(self) -> Optional[Tuple[_PackState, Dict[str, float]]]:
+        left = self.total - sum(p.n for p in self.packs)
+        if left <= 0:
+            return None
+        open_packs = [p for p in self.packs if p.n < p.cap]
+        if not open_packs:
+            return None
+        # Reserve what is left for packs still below their floor
+        short = [p for p in open_packs if p.n < p.floor]
+        if short and left <= sum(p.floor - p.n for p in short):
+            best = max(short, key=lambda p: p.floor - p.n)
+            return best, self.mode_probs(best)
+        best, best_probs, best_v = None, None, -math.inf
+        for p in open_packs:
+            probs = self.mode_probs(p)
+            v = self._value(p, probs)
+            if v > best_v:
+                best, best_probs, best_v = p, probs, v
+        return best, best_probs
+
+    # -- driver -------------------------------------------------------------
+
+    def run(self, outputs: Dict[str, List[Dict[str, Any]]], take_rows: Callable, p0: Any) -> None:
+        saved_budget = dict(self.budget)
+        saved_knobs = {p.spec.knob: getattr(self.mod, p.spec.knob) for p in self.packs if p.spec.knob}
+        saved_knobs = {k: (dict(v) if isinstance(v, dict) else v) for k, v in saved_knobs.items()}
+        current: List[Optional[_PackState]] = [None]
+
+        def counted_take_rows(src: str):
+            if current[0] is not None:
+                current[0].attempts += 1
+            return take_rows(src)
+
+        try:
+            while True:
+                choice = self.pick()
+                if choice is None:
+                    break
+                p, probs = choice
+                fname = p.spec.fname
+                self._write_knob(p.spec, probs)
+                before = len(outputs[fname])
+                self.budget[fname] = before + 1
+                current[0] = p
+                getattr(self.mod, p.spec.builder)(outputs, counted_take_rows, p0)
+                current[0] = None
+                self.steps += 1
+                for s in outputs[fname][before:]:
+                    p.n += 1
+                    sub = s.get("subcategory", "")
+                    p.by_sub[sub] = p.by_sub.get(sub, 0) + 1
+                    fmt = detect_output_format(s)
+                    self.counts[fmt] = self.counts.get(fmt, 0) + 1
+        finally:
+            self.budget.update(saved_budget)
+            for k, v in saved_knobs.items():
+                if isinstance(v, dict):
+                    getattr(self.mod, k).update(v)
+                else:
+                    setattr(self.mod, k, v)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "steps": self.steps,
+            "total": self.total,
+            "target": {f: round(t, 1) for f, t in self.target.items()},
+            "counts": dict(self.counts),
+            "packs": {
+                p.spec.fname: {"n": p.n, "budget": p.budget, "attempts": p.attempts, "subcategories": dict(p.by_sub)}
+                for p in self.packs
+            },
+        }
+
+
+_LAST: Optional[AdaptiveScheduler] = None
+
+
+def run_scheduled(
+    builders: Any,
+    outputs: Dict[str, List[Dict[str, Any]]],
+    take_rows: Callable,
+    p0: Any,
+    desired_counts: Dict[str, int],
+    focus: Dict[str, float],
+) -> AdaptiveScheduler:
+    global _LAST
+    _LAST = AdaptiveScheduler(builders, desired_counts, focus)
+    _LAST.run(outputs, take_rows, p0)
+    return _LAST
+
+
+def print_scheduler_stats() -> None:
+    if _LAST is None:
+        return
+    st = _LAST.stats()
+    print("\n=========================")
+    print("Adaptive scheduler")
+    print("=========================")
+    print(f"[scheduler] steps={st['steps']} total={st['total']}")
+    print("Target:", st["target"])
+    print("Counts:", st["counts"])
+    for fname, d in st["packs"].items():
+        print(f"- {fname}: n={d['n']} (budget {d['budget']}) attempts={d['attempts']} subcategories={d['subcategories']}")
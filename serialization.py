@@ -1,5 +1,5 @@
 from io import StringIO
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import pandas as pd
 import yaml
@@ -62,8 +62,22 @@ def _sizing_plans():
     ]
 
 
+def clip_items(obj: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize/clip cells as the output serializers' first sizing plan does.
+
+    Builders run their {"items": [...]} object through this before rendering
+    both the input and the answer, so the two agree cell for cell.
+    """
+    return _shrink_obj_for_output(obj, *_sizing_plans()[0])
+
+
 def safe_json_sized(obj: Dict[str, Any], max_chars: int) -> str:
     """Serialize to JSON and keep within max_chars by shrinking items if needed."""
+    return safe_json_sized_with_obj(obj, max_chars)[0]
+
+
+def safe_json_sized_with_obj(obj: Dict[str, Any], max_chars: int) -> Tuple[str, Any]:
+    """safe_json_sized, plus the (possibly shrunk) object the JSON encodes."""
     import orjson
 
     def dumps(x: Any) -> str:
@@ -72,9 +86,9 @@ def safe_json_sized(obj: Dict[str, Any], max_chars: int) -> str:
     try:
         s = dumps(obj)
         if len(s) <= max_chars:
-            return s
+            return s, obj
     except Exception:
-        return dumps({})
+        return dumps({}), {}
 
     if isinstance(obj, dict) and isinstance(obj.get("items"), list):
         for (mr, ma, mc) in _sizing_plans():
@@ -82,10 +96,10 @@ def safe_json_sized(obj: Dict[str, Any], max_chars: int) -> str:
             try:
                 s2 = dumps(shrunk)
                 if len(s2) <= max_chars:
-                    return s2
+                    return s2, shrunk
             except Exception:
                 continue
-    return dumps({})
+    return dumps({}), {}
 
 
 def rows_to_csv(rows: List[Dict[str, Any]]) -> str:
@@ -120,7 +134,9 @@ def rows_to_xml_input(rows: List[Dict[str, Any]]) -> str:
         xs.append("</item>")
     xs.append("</items>")
     s = "\n".join(xs)
-    if len(s) > MAX_OUTPUT_CHARS:
+    # Two rows is the floor: re-cutting to rows[:2] would recurse forever, so an
+    # oversized result is returned and get_safe_xml_input tries the next plan
+    if len(s) > MAX_OUTPUT_CHARS and len(rows) > 2:
         return rows_to_xml_input(rows[:2])
     if not validate_xml(s):
         return "<items></items>"
@@ -128,13 +144,19 @@ def rows_to_xml_input(rows: List[Dict[str, Any]]) -> str:
 
 
 def get_safe_csv(rows: List[Dict[str, Any]], max_chars: int) -> str:
+    return get_safe_csv_with_rows(rows, max_chars)[0]
+
+
+def get_safe_csv_with_rows(rows: List[Dict[str, Any]], max_chars: int) -> Tuple[str, List[Dict[str, Any]]]:
+    """get_safe_csv, plus the shrunk rows the CSV was written from."""
     obj = {"items": rows}
     for mr, ma, mc in _sizing_plans():
         shrunk = _shrink_obj_for_output(obj, mr, ma, mc)
-        s = rows_to_csv(_rows_from_items_obj(shrunk))
+        shown = _rows_from_items_obj(shrunk)
+        s = rows_to_csv(shown)
         if len(s) <= max_chars and validate_csv(s):
-            return s
-    return ""
+            return s, shown
+    return "", []
 
 
 def get_safe_xml_input(rows: List[Dict[str, Any]], max_chars: int) -> str:
@@ -152,19 +174,28 @@ def dict_to_yaml(obj: Any) -> str:
 
 
 def get_safe_structured_data(obj: Dict[str, Any], fmt: str, max_chars: int) -> str:
+    return get_safe_structured_data_with_obj(obj, fmt, max_chars)[0]
+
+
+def get_safe_structured_data_with_obj(obj: Dict[str, Any], fmt: str, max_chars: int) -> Tuple[str, Dict[str, Any]]:
+    """get_safe_structured_data, plus the shrunk object that was serialized.
+
+    Cells are always normalized and clipped, so the returned object (not the
+    input) is what a reader of the TOML/YAML text sees.
+    """
     for mr, ma, mc in _sizing_plans():
         shrunk = _shrink_obj_for_output(obj, mr, ma, mc)
         if fmt == "toml":
             s = dict_to_toml(shrunk)
             if len(s) <= max_chars and validate_toml(s):
-                return s
+                return s, shrunk
         elif fmt == "yaml":
             s = dict_to_yaml(shrunk)
             if len(s) <= max_chars and validate_yaml(s):
-                return s
+                return s, shrunk
         else:
             raise ValueError(f"Unsupported fmt: {fmt}")
-    return ""
+    return "", {"items": []}
 
 
 def dict_to_xml_sized(obj: Dict[str, Any], root_name: str = "root", max_chars: int = MAX_OUTPUT_CHARS) -> str:
@@ -187,7 +218,7 @@ def dict_to_xml_sized(obj: Dict[str, Any], root_name: str = "root", max_chars: i
                 child = etree.SubElement(parent, "item")
                 build(child, it)
         else:
-            parent.text = xml_escape_text(clip(norm(x), MAX_CELL_CHARS))
+            parent.text = clip(norm(x), MAX_CELL_CHARS)  # lxml escapes text itself
 
     last_xml = ""
     for (mr, ma, mc) in _sizing_plans():
@@ -0,0 +1,163 @@
+"""Bounded-memory streaming statistics for validation reports.
+
+`Welford` tracks count/min/max/mean/variance online; `KLLSketch` is a
+deterministic KLL quantile sketch (items at level h weigh 2**h) whose size
+stays O(k) however many values are added. `DistStat` combines both, or keeps
+every value when exact mode is requested. All three support `merge` so
+per-chunk results from worker processes can be combined.
+
+While fewer than k values have been added the sketch holds them all, so small
+runs report the same quantiles as the exact mode.
+"""
+import math
+from typing import Iterable, List, Optional, Tuple
+
+Summary = Tuple[int, float, float, float, float, float, float, float]
+
+
+class Welford:
+    __slots__ = ("n", "mean", "m2", "min", "max")
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, x: float) -> None:
+        self.n += 1
+        d = x - self.mean
+        self.mean += d / self.n
+        self.m2 += d * (x - self.mean)
+        if self.min is None or x < self.min:
+            self.min = x
+        if self.max is None or x > self.max:
+            self.max = x
+
+    def merge(self, other: "Welford") -> None:
+        if other.n == 0:
+            return
+        if self.n == 0:
+            self.n, self.mean, self.m2, self.min, self.max = other.n, other.mean, other.m2, other.min, other.max
+            return
+        n = self.n + other.n
+        d = other.mean - self.mean
+        self.mean += d * other.n / n
+        self.m2 += other.m2 + d * d * self.n * other.n / n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def std(self) -> float:
+        # population std, like the exact report
+        return math.sqrt(self.m2 / self.n) if self.n else 0.0
+
+
+class KLLSketch:
+    def __init__(self, k: int = 200):
+        self.k = max(8, int(k))
+        self.n = 0
+        self.levels: List[list] = [[]]
+        self._flip = 0
+
+    def _capacity(self, h: int) -> int:
+        depth = len(self.levels) - 1 - h
+        return max(2, int(math.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _size(self) -> int:
+        return sum(len(lv) for lv in self.levels)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def _compress(self) -> None:
+        while self._size() >= self._max_size():
+            for h in range(len(self.levels)):
+                if len(self.levels[h]) >= self._capacity(h):
+                    break
+            if h + 1 == len(self.levels):
+                self.levels.append([])
+            buf = sorted(self.levels[h])
+            keep = [buf.pop()] if len(buf) % 2 else []
+            # Alternate the surviving parity so compaction error does not drift one way
+            self.levels[h + 1].extend(buf[self._flip::2])
+            self._flip ^= 1
+            self.levels[h] = keep
+
+    def add(self, x: float) -> None:
+        self.levels[0].append(x)
+        self.n += 1
+        if len(self.levels[0]) >= self._capacity(0):
+            self._compress()
+
+    def merge(self, other: "KLLSketch") -> None:
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for h, lv in enumerate(other.levels):
+            self.levels[h].extend(lv)
+        self.n += other.n
+        self._compress()
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.n == 0:
+            return None
+        items = sorted((x, 1 << h) for h, lv in enumerate(self.levels) for x in lv)
+        rank = int(q * (self.n - 1))
+        acc = 0
+        for x, w in items:
+            acc += w
+            if acc > rank:
+                return x
+        return items[-1][0]
+
+
+class DistStat:
+    """Distribution of one metric: Welford + KLL, or every value when exact."""
+
+    def __init__(self, exact: bool = False, k: int = 200):
+        self.exact = exact
+        self.values: List[float] = []
+        self.w = Welford()
+        self.sketch = KLLSketch(k)
+
+    def __len__(self) -> int:
+        return len(self.values) if self.exact else self.w.n
+
+    def add(self, x: float) -> None:
+        if self.exact:
+            self.values.append(x)
+        else:
+            self.w.add(x)
+            self.sketch.add(x)
+
+    def extend(self, xs: Iterable[float]) -> None:
+        for x in xs:
+            self.add(x)
+
+    def merge(self, other: "DistStat") -> None:
+        if self.exact:
+            self.values.extend(other.values)
+            return
+        if other.exact:
+            self.extend(other.values)
+            return
+        self.w.merge(other.w)
+        self.sketch.merge(other.sketch)
+
+    def summary(self) -> Optional[Summary]:
+        """(n, min, p10, p50, p90, max, mean, std) or None when empty."""
+        if self.exact:
+            if not self.values:
+                return None
+            arr = sorted(self.values)
+            n = len(arr)
+            mean = sum(arr) / n
+            var = sum((x - mean) ** 2 for x in arr) / n
+            return (n, arr[0], arr[int(0.10 * (n - 1))], arr[int(0.50 * (n - 1))],
+                    arr[int(0.90 * (n - 1))], arr[-1], mean, var ** 0.5)
+        if self.w.n == 0:
+            return None
+        q = self.sketch.quantile
+        return (self.w.n, self.w.min, q(0.10), q(0.50), q(0.90), self.w.max, self.w.mean, self.w.std)
@@ -0,0 +1,114 @@
+"""The columnar path of rows_from_stream must match the per-row norm/clip path."""
+import random
+
+import pyarrow as pa
+import pytest
+from datasets import Dataset
+
+from ..config import MAX_CELL_CHARS
+from ..datasets_io import _cell_to_str, _extract_rows, _extract_rows_batched, _norm_clip_column
+
+# Python's \s set beyond ASCII (RE2's \s is ASCII-only), plus look-alikes that are not whitespace
+_WS = [
+    " ", "\t", "\n", "\r", "\x0b", "\x0c", "\x1c", "\x1f", "\x85", "\xa0",
+    "\u1680", "\u2000", "\u2009", "\u200a", "\u2028", "\u2029", "\u202f", "\u205f", "\u3000",
+]
+_NOT_WS = ["\u200b", "\ufeff", "\u00e9", "\u5927", "a", "Z", "0", "-"]
+
+
+def _rand_cell(rng: random.Random):
+    r = rng.random()
+    if r < 0.1:
+        return None
+    n = rng.choice([0, 1, 5, 40, MAX_CELL_CHARS - 1, MAX_CELL_CHARS, MAX_CELL_CHARS + 1, 2 * MAX_CELL_CHARS, 700])
+    return "".join(rng.choice(_WS) if rng.random() < 0.3 else rng.choice(_NOT_WS) for _ in range(n))
+
+
+def _edge_cells():
+    return [
+        None,
+        "",
+        "   ",
+        "\u3000x\u3000",
+        "a" + " " * 500 + "b" * 300,  # prefix normalizes to <= limit: full redo
+        "\xa0" * (3 * MAX_CELL_CHARS) + "tail",
+        "x" * MAX_CELL_CHARS + "  " + "y" * 10,
+        "y" * (MAX_CELL_CHARS - 1) + "\u2028\u2029z",
+        ("w \t" * 400).strip(),
+    ]
+
+
+def test_norm_clip_column_matches_cell_to_str():
+    rng = random.Random(0)
+    vals = _edge_cells() + [_rand_cell(rng) for _ in range(3000)]
+    expected = [_cell_to_str(v) for v in vals]
+    assert _norm_clip_column(vals) == expected
+    assert _norm_clip_column(pa.array(vals, type=pa.string())) == expected
+    assert _norm_clip_column(pa.chunked_array([pa.array(vals[:50]), pa.array(vals[50:])])) == expected
+
+
+@pytest.mark.parametrize(
+    "vals",
+    [
+        [1, None, 3, -7],
+        [1.5, None, float("nan")],
+        [True, False, None],
+        [["a", "b  c"], [], None],
+        [{"k": "v  w", "a": 1, "b": 2, "c": 3}, None],
+        ["mixed", 3, None, ["x"]],
+    ],
+)
+def test_norm_clip_column_non_string(vals):
+    assert _norm_clip_column(vals) == [_cell_to_str(v) for v in vals]
+    try:
+        arr = pa.array(vals)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return
+    # Typed Arrow columns (ints, lists, structs) go through the per-cell fallback too
+    assert _norm_clip_column(arr) == [_cell_to_str(v) for v in arr.to_pylist()]
+
+
+class _DictBatches:
+    """Minimal streaming source yielding python dict batches (no Arrow format)."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def iter(self, batch_size):
+        for i in range(0, len(self.rows), batch_size):
+            part = self.rows[i:i + batch_size]
+            yield {k: [r.get(k) for r in part] for k in self.rows[0]}
+
+
+def _rows(n: int):
+    rng = random.Random(1)
+    out = []
+    for i in range(n):
+        out.append(
+            {
+                "title": _rand_cell(rng),
+                "vendor": rng.choice([None, "", "Acme\u3000Co", "  x  "]),
+                "grams": rng.choice([None, 0, 12, 3500]),
+                "tags": rng.choice([None, [], ["a  b", "c"]]),
+            }
+        )
+    # Leading rows without any preferred value exercise the column pick
+    out[0] = {"title": None, "vendor": "", "grams": None, "tags": None}
+    return out
+
+
+@pytest.mark.parametrize("adaptive", [False, True])
+@pytest.mark.parametrize("batch_size", [1, 7, 64])
+def test_batched_extraction_matches_per_row(adaptive, batch_size):
+    rows = _rows(300)
+    pref = ["title", "vendor", "grams", "tags", "missing"]
+    sources = [_DictBatches(rows), Dataset.from_list(rows).to_iterable_dataset(num_shards=3)]
+    for ds in sources:
+        want = list(_extract_rows(ds, pref, adaptive=adaptive))
+        got = list(_extract_rows_batched(ds, pref, batch_size, adaptive=adaptive))
+        assert [(r, c) for r, c, _ in got] == [(r, c) for r, c, _ in want]
+        if adaptive:
+            assert [list(m) for _, _, m in got] == [list(m) for _, _, m in want]
@@ -0,0 +1,50 @@
+"""JsonlIndex lookups and sampling."""
+import orjson
+import pytest
+
+from .. import jsonl_index
+from ..jsonl_index import JsonlIndex
+
+
+def _write(path, recs):
+    with open(path, "wb") as f:
+        for r in recs:
+            f.write(orjson.dumps(r) + b"\n")
+
+
+def test_row_of_confirms_the_id(tmp_path, monkeypatch):
+    path = str(tmp_path / "p.jsonl")
+    _write(path, [{"id": "a1", "subcategory": "s"}])
+    # Every id collides: a single hash candidate must still be checked
+    monkeypatch.setattr(jsonl_index, "_id_hash", lambda rid: 7)
+    idx = JsonlIndex(path, index_dir=str(tmp_path / "idx"))
+    try:
+        assert idx.row_of("a1") == 0
+        assert idx.row_of("zz") is None
+        assert idx.get_by_id(None) is None
+    finally:
+        idx.close()
+
+
+def test_sample_rows_never_exceeds_n(tmp_path):
+    path = str(tmp_path / "p.jsonl")
+    # One big stratum and many singletons: the >=1 floor alone would overshoot
+    recs = [{"id": f"b{i}", "subcategory": "big"} for i in range(100)]
+    recs += [{"id": f"s{i}", "subcategory": f"small{i}"} for i in range(9)]
+    _write(path, recs)
+    idx = JsonlIndex(path, index_dir=str(tmp_path / "idx"))
+    try:
+        for n in (10, 12, 20, 50):
+            rows = idx.sample_rows(n, seed=1)
+            assert len(rows) == n
+            assert len(set(rows.tolist())) == n
+            assert {idx.subcategory(int(r)) for r in rows} >= {f"small{i}" for i in range(9)}
+    finally:
+        idx.close()
+
+
+@pytest.mark.parametrize("argv", [["--file", "p.jsonl"], ["--row", "1"], ["--file", "p.jsonl", "--row", "1", "--id", "x"]])
+def test_cli_usage_errors(argv):
+    with pytest.raises(SystemExit) as e:
+        jsonl_index.main(argv)
+    assert e.value.code == 2
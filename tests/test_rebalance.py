@@ -0,0 +1,23 @@
+"""Quota planning for rebalance."""
+from ..rebalance import _largest_remainder, plan
+
+
+def test_largest_remainder_stays_within_total_with_many_singletons():
+    w = {"A": 100.0, "B": 1.0, "C": 1.0, "D": 1.0}
+    caps = {"A": 100, "B": 1, "C": 1, "D": 1}
+    take = _largest_remainder(w, 4, caps, at_least_one=True)
+    assert take == {"A": 1, "B": 1, "C": 1, "D": 1}
+    w.update({f"s{i}": 1.0 for i in range(20)})
+    caps.update({f"s{i}": 1 for i in range(20)})
+    for total in range(len(w), 60):
+        take = _largest_remainder(w, total, caps, at_least_one=True)
+        assert sum(take.values()) == total
+        assert all(v >= 1 for v in take.values())
+
+
+def test_plan_quota_matches_target():
+    strata = {("a.jsonl", "big", "json"): 100}
+    strata.update({("a.jsonl", f"sub{i}", "json"): 1 for i in range(3)})
+    _, target, quota = plan(strata, {"json": 1.0}, total=5)
+    assert target["json"] == 5
+    assert sum(quota.values()) == 5
@@ -0,0 +1,22 @@
+"""Sizing edge cases in serialization."""
+from ..config import MAX_OUTPUT_CHARS
+from ..serialization import get_safe_xml_input, rows_to_xml_input
+
+
+def _wide_rows(n):
+    # Each cell is clipped to 100 chars; 20 of them per row exceed
+    # MAX_OUTPUT_CHARS with only two rows
+    return [{f"attr{j}": "x" * 300 for j in range(20)} for _ in range(n)]
+
+
+def test_rows_to_xml_input_two_oversized_rows_terminates():
+    # Used to recurse on rows[:2] forever once two rows were still too long
+    for n in (1, 2, 3):
+        s = rows_to_xml_input(_wide_rows(n))
+        assert s.startswith("<items>")
+        assert len(s) > MAX_OUTPUT_CHARS
+
+
+def test_get_safe_xml_input_shrinks_oversized_rows():
+    s = get_safe_xml_input(_wide_rows(2), MAX_OUTPUT_CHARS)
+    assert 0 < len(s) <= MAX_OUTPUT_CHARS
@@ -0,0 +1,83 @@
+"""`source.data` must be the sized object the prompt shows, not the raw rows."""
+import orjson
+import pytest
+try:
+    import tomllib  # Python 3.11+
+except Exception:
+    import tomli as tomllib  # Python 3.10 fallback
+
+from ..prompts import prompt_csv_to_xml, prompt_toml_to_json, prompt_yaml_to_xml
+from ..serialization import (
+    dict_to_xml_sized,
+    get_safe_csv_with_rows,
+    get_safe_structured_data_with_obj,
+)
+from ..utils import encode_source
+from ..validation_engine import QualityReport, Record, check_quality
+
+
+def _raw_obj():
+    # More rows than MAX_ROWS_PER_SAMPLE, cells over MAX_CELL_CHARS, runs of
+    # whitespace and the diversify " - v2" suffix: every sizing step applies.
+    return {
+        "items": [
+            {"name": f"product {i}  " + "x" * 400, "brand": f"Acme {i}  - v2"}
+            for i in range(8)
+        ]
+    }
+
+
+def _record(sub, prompt, answer, data):
+    obj = {
+        "id": "t",
+        "subcategory": sub,
+        "messages": [
+            {"role": "user", "content": prompt},
+            {"role": "assistant", "content": answer},
+        ],
+        "source": encode_source({"fmt": sub.split("_to_")[0], "attrs": ["name", "brand"], "data": data}),
+    }
+    return Record("sft_core_c_xml_out.jsonl", orjson.loads(orjson.dumps(obj)))
+
+
+def _issues(rec):
+    q = QualityReport(exact=True)
+    check_quality(rec, q)
+    return [e["why"] for e in q.roundtrip_issues.samples]
+
+
+def test_toml_to_json_shrunk_sample_is_clean():
+    raw = _raw_obj()
+    toml_s, shown = get_safe_structured_data_with_obj(raw, "toml", 1800)
+    assert len(shown["items"]) < len(raw["items"])
+    answer = orjson.dumps(tomllib.loads(toml_s)).decode()
+    assert _issues(_record("toml_to_json", prompt_toml_to_json(toml_s), answer, shown)) == []
+    # The unsized rows would flag the same correct answer
+    assert _issues(_record("toml_to_json", prompt_toml_to_json(toml_s), answer, raw)) == [
+        "toml_to_json_roundtrip_mismatch"
+    ]
+
+
+@pytest.mark.parametrize("sub", ["yaml_to_xml", "csv_to_xml"])
+def test_to_xml_shrunk_sample_is_clean(sub):
+    raw = _raw_obj()
+    if sub == "yaml_to_xml":
+        text, shown = get_safe_structured_data_with_obj(raw, "yaml", 1800)
+        prompt = prompt_yaml_to_xml(text)
+    else:
+        text, rows = get_safe_csv_with_rows(raw["items"], 1800)
+        shown = {"items": rows}
+        prompt = prompt_csv_to_xml(text)
+    assert text and len(shown["items"]) < len(raw["items"])
+    answer = dict_to_xml_sized(shown, root_name="root")
+    assert _issues(_record(sub, prompt, answer, shown)) == []
+    assert _issues(_record(sub, prompt, answer, raw)) == [f"{sub}_xml_roundtrip_mismatch"]
+
+
+@pytest.mark.parametrize("sub", ["json_to_xml", "yaml_to_xml", "csv_to_xml"])
+def test_to_xml_markup_cells_round_trip(sub):
+    # lxml escapes element text; escaping it beforehand gave "&amp;amp;"
+    shown = {"items": [{"name": "Salt & Pepper <2x>", "brand": "A&B"}]}
+    answer = dict_to_xml_sized(shown, root_name="root")
+    assert "&amp;amp;" not in answer and "Salt &amp; Pepper &lt;2x&gt;" in answer
+    assert _issues(_record(sub, "", answer, shown)) == []
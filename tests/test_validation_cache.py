@@ -0,0 +1,67 @@
+"""Eviction in the SQLite validation cache."""
+import sqlite3
+import time
+
+from ..validation_cache import ValidationCache
+
+
+def _age(path, table, keys, days):
+    db = sqlite3.connect(path)
+    db.executemany(f"UPDATE {table} SET ts = ? WHERE key = ?", [(time.time() - days * 86400, k) for k in keys])
+    db.commit()
+    db.close()
+
+
+def _keys(path, table):
+    db = sqlite3.connect(path)
+    try:
+        return sorted(k for (k,) in db.execute(f"SELECT key FROM {table}"))
+    finally:
+        db.close()
+
+
+def test_prune_drops_rows_not_seen_within_max_age(tmp_path):
+    path = str(tmp_path / "c.sqlite")
+    c = ValidationCache(path, 1, max_age_s=10 * 86400)
+    c.put_many("syntax", [("live", b"1"), ("gone", b"2"), ("old_hit", b"3")])
+    c.close()
+    _age(path, "syntax", ["gone"], 11)
+    _age(path, "syntax", ["old_hit"], 6)
+
+    # A hit older than half the max age is handed back for re-writing
+    r = ValidationCache(path, 1, readonly=True, max_age_s=10 * 86400)
+    refresh = []
+    assert r.get_many("syntax", ["live", "old_hit"], refresh=refresh) == {"live": b"1", "old_hit": b"3"}
+    r.close()
+    assert refresh == [("old_hit", b"3")]
+
+    c = ValidationCache(path, 1, max_age_s=10 * 86400)
+    c.put_many("syntax", refresh)
+    assert c.prune() == 1
+    c.close()
+    assert _keys(path, "syntax") == ["live", "old_hit"]
+
+
+def test_prune_caps_rows_oldest_first(tmp_path):
+    path = str(tmp_path / "c.sqlite")
+    c = ValidationCache(path, 1, max_rows=3)
+    c.put_many("quality", [(f"k{i}", b"x") for i in range(5)])
+    for i in range(5):
+        _age(path, "quality", [f"k{i}"], 5 - i)
+    assert c.prune() == 2
+    c.close()
+    assert _keys(path, "quality") == ["k2", "k3", "k4"]
+
+
+def test_cache_from_before_eviction_is_rebuilt(tmp_path):
+    path = str(tmp_path / "c.sqlite")
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE syntax (key TEXT PRIMARY KEY, version INTEGER NOT NULL, payload BLOB NOT NULL)")
+    db.execute("INSERT INTO syntax VALUES ('k', 1, x'00')")
+    db.commit()
+    db.close()
+    c = ValidationCache(path, 1)
+    assert c.get_many("syntax", ["k"]) == {}
+    c.put_many("syntax", [("k", b"1")])
+    assert c.get_many("syntax", ["k"]) == {"k": b"1"}
+    c.close()
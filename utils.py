@@ -2,14 +2,16 @@ import hashlib
 import os
 import re
 import time
-from typing import Any
+from typing import Any, Dict, Optional
 
 import orjson
 
 from .config import (
+    LOG_SINK,
     MAX_INPUT_CHARS,
     MAX_OUTPUT_CHARS,
 )
+from .log_sink import get_sink
 
 
 def ensure_dirs(*paths: str) -> None:
@@ -67,7 +69,30 @@ def safe_json(obj: Any, max_chars: int = MAX_OUTPUT_CHARS) -> str:
         return "{}"
 
 
+def encode_source(source: Dict[str, Any]) -> str:
+    """Compact JSON string for a sample's `source` field.
+
+    Kept as a string (not a nested object) so the dataset schema stays flat
+    whatever the row keys are.
+    """
+    return orjson.dumps(source, default=str).decode()
+
+
+def decode_source(s: Any) -> Optional[Dict[str, Any]]:
+    if not isinstance(s, (str, bytes)) or not s:
+        return None
+    try:
+        obj = orjson.loads(s)
+    except Exception:
+        return None
+    return obj if isinstance(obj, dict) else None
+
+
 def append_jsonl(path: str, obj: dict) -> None:
+    """Append one JSON line; buffered through log_sink unless SFT_LOG_SINK=0."""
+    if LOG_SINK:
+        get_sink().write(path, obj)
+        return
     os.makedirs(os.path.dirname(path), exist_ok=True)
     with open(path, "ab") as f:
         f.write(orjson.dumps(obj) + b"\n")
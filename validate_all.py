@@ -0,0 +1,48 @@
+"""Syntax and quality validation in a single pass over the generated packs.
+
+Usage:
+  python -m sft_builder.validate_all [--workers N] [--chunk-mb MB] [--full] [--sample N [--seed S]] [--exact]
+
+Prints the validate_outputs report followed by the validate_quality report;
+each record's prompt blocks and answer are parsed once for both.
+"""
+import argparse
+from typing import List, Optional
+
+from .config import OUT_DIR, QUALITY_EXACT, VALIDATE_CACHE, VALIDATE_CACHE_PATH, VALIDATE_CHUNK_MB, VALIDATE_WORKERS
+from .metrics import record_quality, record_syntax, write_metrics
+from .validation_engine import FILES, plan_tasks, run_tasks
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Validate generated JSONL packs (syntax + quality, one pass).")
+    ap.add_argument("--workers", type=int, default=VALIDATE_WORKERS, help="process-pool size (1 = serial)")
+    ap.add_argument("--chunk-mb", type=float, default=VALIDATE_CHUNK_MB, help="target chunk size per task")
+    ap.add_argument("--full", action="store_true", help="ignore cached results and re-validate every record")
+    ap.add_argument("--sample", type=int, default=0, help="validate a stratified sample of N records per file (0 = all)")
+    ap.add_argument("--seed", type=int, default=0, help="random seed for --sample")
+    ap.add_argument("--exact", action="store_true", default=QUALITY_EXACT, help="keep every value for distributions (small runs)")
+    ap.add_argument("--no-breakdown", action="store_true", help="omit per-pack / per-subcategory distributions")
+    args = ap.parse_args(argv)
+    cache_path = VALIDATE_CACHE_PATH if VALIDATE_CACHE else ""
+
+    files = list(FILES)
+    tasks, missing = plan_tasks(files, OUT_DIR, args.workers, args.chunk_mb, cache_path=cache_path, full=args.full, exact=args.exact, sample=args.sample, seed=args.seed)
+    if args.sample > 0:
+        print(f"[sample] {args.sample} records per file (stratified by subcategory, seed={args.seed})")
+    for path in missing:
+        print("[skip] not found:", path)
+    syn, qual = run_tasks(tasks, args.workers)
+    syn.print(files, OUT_DIR)
+    print()
+    qual.print(breakdown=not args.no_breakdown)
+    for line in (syn.cache_summary(), qual.cache_summary()):
+        if line:
+            print(line)
+    record_syntax(syn)
+    record_quality(qual)
+    write_metrics("validate_all")
+
+
+if __name__ == "__main__":
+    main()
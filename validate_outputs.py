@@ -1,132 +1,64 @@
 """Validate generated JSONL packs for structural and syntax correctness.
 
 Usage:
-  python -m sft_builder.validate_outputs
+  python -m sft_builder.validate_outputs [--workers N] [--chunk-mb MB] [--full] [--sample N [--seed S]]
 
 It reads files under OUT_DIR (config.py) and validates each assistant output
-against the intended subcategory/format.
+against the intended subcategory/format. With --workers > 1 each file is split
+into line-aligned byte ranges validated in a process pool; results are merged
+in file/offset order, so the report is identical to a serial run. Outcomes are
+cached per record under _debug (SFT_VALIDATE_CACHE=0 disables it); --full
+re-validates everything and refreshes the cache.
+Parsing is shared with validate_quality (see validation_engine); use
+`python -m sft_builder.validate_all` to get both reports from one pass.
 """
-import os
-from typing import Dict, List, Tuple
-
-import orjson
-
-from .config import OUT_DIR
-from .report import detect_output_format
-from .validators import validate_csv, validate_toml, validate_xml, validate_yaml
-
-
-def _load_jsonl(path: str):
-    with open(path, "rb") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                yield orjson.loads(line)
-            except Exception as e:
-                yield {"__load_error__": str(e), "__raw__": line.decode(errors="ignore")}
-
-
-def _expect_for_file(fname: str, subcat: str) -> str:
-    # Return one of: json, csv, xml, toml, yaml
-    base = os.path.basename(fname)
-    if base == "sft_core_c_tabular.jsonl":
-        if subcat.endswith("json_to_csv"):
-            return "csv"
-        return "json"
-    if base == "sft_core_c_xml_in.jsonl":
-        return "json"
-    if base == "sft_core_c_xml_out.jsonl":
-        return "xml"
-    if base == "sft_core_c_toml_out.jsonl":
-        if subcat.endswith("toml_to_json"):
-            return "json"
-        return "toml"
-    if base == "sft_core_c_yaml_out_min.jsonl":
-        return "yaml"
-    if base == "sft_core_g_gtfs.jsonl":
-        return "json"
-    if base == "sft_pack_hard_mixed.jsonl":
-        return "json"
-    return "unknown"
-
-
-def _validate_answer(fmt: str, answer: str) -> Tuple[bool, str]:
-    if not isinstance(answer, str) or not answer.strip():
-        return False, "empty"
-    try:
-        if fmt == "json":
-            orjson.loads(answer)
-            return True, "ok"
-        if fmt == "csv":
-            return (validate_csv(answer), "ok" if validate_csv(answer) else "csv_parse_fail")
-        if fmt == "xml":
-            return (validate_xml(answer), "ok" if validate_xml(answer) else "xml_invalid")
-        if fmt == "toml":
-            return (validate_toml(answer), "ok" if validate_toml(answer) else "toml_invalid")
-        if fmt == "yaml":
-            return (validate_yaml(answer), "ok" if validate_yaml(answer) else "yaml_invalid")
-        return False, f"unsupported_fmt:{fmt}"
-    except Exception as e:
-        return False, f"exception:{type(e).__name__}"
-
-
-def main():
-    files = [
-        "sft_core_c_tabular.jsonl",
-        "sft_core_c_xml_in.jsonl",
-        "sft_core_c_xml_out.jsonl",
-        "sft_core_c_toml_out.jsonl",
-        "sft_core_c_yaml_out_min.jsonl",
-        "sft_core_g_gtfs.jsonl",
-        "sft_pack_hard_mixed.jsonl",
-    ]
-
-    errors: List[Dict] = []
-    totals: Dict[str, int] = {f: 0 for f in files}
-    valids: Dict[str, int] = {f: 0 for f in files}
-
-    for fn in files:
-        path = os.path.join(OUT_DIR, fn)
-        if not os.path.exists(path):
-            print("[skip] not found:", path)
-            continue
-        for obj in _load_jsonl(path):
-            totals[fn] += 1
-            if "__load_error__" in obj:
-                errors.append({"file": fn, "id": None, "reason": "jsonl_load_error", "detail": obj["__load_error__"]})
-                continue
-
-            msgs = obj.get("messages", [])
-            if not isinstance(msgs, list) or len(msgs) < 2:
-                errors.append({"file": fn, "id": obj.get("id"), "reason": "bad_messages"})
-                continue
-            if msgs[-1].get("role") != "assistant":
-                errors.append({"file": fn, "id": obj.get("id"), "reason": "last_not_assistant"})
-                continue
-
-            ans = msgs[-1].get("content", "")
-            sub = obj.get("subcategory", "")
-            expect = _expect_for_file(fn, sub)
-
-            ok, why = _validate_answer(expect, ans)
-            if not ok:
-                errors.append({"file": fn, "id": obj.get("id"), "subcategory": sub, "expect": expect, "reason": why})
-            else:
-                valids[fn] += 1
-
-    print("\nValidation summary:")
-    for fn in files:
-        print(f"- {fn}: {valids[fn]}/{totals[fn]} valid")
-    if errors:
-        print("\nErrors (up to 50):")
-        for e in errors[:50]:
-            print(" ", e)
-    else:
-        print("No structural/syntax errors detected.")
+import argparse
+from typing import List, Optional
+
+from .config import OUT_DIR, VALIDATE_CACHE, VALIDATE_CACHE_PATH, VALIDATE_CHUNK_MB, VALIDATE_WORKERS
+from .metrics import record_syntax, write_metrics
+from .validation_engine import (  # noqa: F401  (re-exported helpers)
+    FILES,
+    _chunk_ranges,
+    _expect_for_file,
+    _load_jsonl,
+    _parse_lines,
+    _validate_answer,
+    check_syntax as _validate_record_engine,
+    plan_tasks,
+    run_tasks,
+    Record,
+)
+
+
+def _validate_record(fn: str, obj):
+    """Return an error dict, or None if the record is valid."""
+    return _validate_record_engine(Record(fn, obj))
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Validate generated JSONL packs (syntax/structure).")
+    ap.add_argument("--workers", type=int, default=VALIDATE_WORKERS, help="process-pool size (1 = serial)")
+    ap.add_argument("--chunk-mb", type=float, default=VALIDATE_CHUNK_MB, help="target chunk size per task")
+    ap.add_argument("--full", action="store_true", help="ignore cached results and re-validate every record")
+    ap.add_argument("--sample", type=int, default=0, help="validate a stratified sample of N records per file (0 = all)")
+    ap.add_argument("--seed", type=int, default=0, help="random seed for --sample")
+    args = ap.parse_args(argv)
+    cache_path = VALIDATE_CACHE_PATH if VALIDATE_CACHE else ""
+
+    files = list(FILES)
+    tasks, missing = plan_tasks(files, OUT_DIR, args.workers, args.chunk_mb, syntax=True, quality=False, cache_path=cache_path, full=args.full, sample=args.sample, seed=args.seed)
+    if args.sample > 0:
+        print(f"[sample] {args.sample} records per file (stratified by subcategory, seed={args.seed})")
+    for path in missing:
+        print("[skip] not found:", path)
+    syn, _ = run_tasks(tasks, args.workers)
+    syn.print(files, OUT_DIR)
+    if syn.cache_summary():
+        print(syn.cache_summary())
+    record_syntax(syn)
+    write_metrics("validate_outputs")
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,112 @@
+"""Persistent per-record validation cache (SQLite).
+
+Rows are keyed by sha1(validator version, file name, raw JSONL line) and hold
+the serialized outcome of one check ("syntax" or "quality") for that record,
+so unchanged records are replayed instead of re-validated. Workers only read;
+the parent process writes the new rows (batch by batch in a serial run).
+
+Each row carries the time it was last seen. A hit older than half of
+`max_age_s` is handed back to be re-written, which refreshes it, so rows of
+records still on disk stay while keys of deleted or regenerated records age
+out: `prune()` (run after every validation) drops rows not seen for
+`max_age_s` and then caps each table at `max_rows`, oldest first. SQLite
+reuses the freed pages, so the file stops growing at about the cap.
+"""
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .config import VALIDATE_CACHE_MAX_AGE_DAYS, VALIDATE_CACHE_MAX_ROWS
+
+_TABLES = ("syntax", "quality")
+_BATCH = 500
+
+
+def record_key(version: int, fn: str, line: bytes) -> str:
+    h = hashlib.sha1(f"{version}\0{fn}\0".encode("utf-8"))
+    h.update(line)
+    return h.hexdigest()
+
+
+class ValidationCache:
+    def __init__(
+        self,
+        path: str,
+        version: int,
+        readonly: bool = False,
+        max_age_s: float = VALIDATE_CACHE_MAX_AGE_DAYS * 86400.0,
+        max_rows: int = VALIDATE_CACHE_MAX_ROWS,
+    ):
+        self.path = path
+        self.version = int(version)
+        self.max_age_s = float(max_age_s)
+        self.max_rows = int(max_rows)
+        self._refresh_before = time.time() - self.max_age_s / 2
+        if readonly:
+            self._db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path)
+            for t in _TABLES:
+                cols = [r[1] for r in self._db.execute(f"PRAGMA table_info({t})")]
+                if cols and "ts" not in cols:
+                    # Cache file from before eviction: cheaper to rebuild than to migrate
+                    self._db.execute(f"DROP TABLE {t}")
+                self._db.execute(
+                    f"CREATE TABLE IF NOT EXISTS {t} (key TEXT PRIMARY KEY, version INTEGER NOT NULL, payload BLOB NOT NULL, ts REAL NOT NULL)"
+                )
+                self._db.execute(f"CREATE INDEX IF NOT EXISTS {t}_ts ON {t} (ts)")
+            # Rows written by another validator version can never hit again
+            for t in _TABLES:
+                self._db.execute(f"DELETE FROM {t} WHERE version != ?", (self.version,))
+            self._db.commit()
+
+    @classmethod
+    def open_reader(cls, path: str, version: int) -> "ValidationCache":
+        return cls(path, version, readonly=True)
+
+    def get_many(
+        self, table: str, keys: Iterable[str], refresh: Optional[List[Tuple[str, bytes]]] = None
+    ) -> Dict[str, bytes]:
+        """Cached payloads by key; hits due for a refresh are appended to `refresh`."""
+        keys = list(dict.fromkeys(keys))
+        out: Dict[str, bytes] = {}
+        for i in range(0, len(keys), _BATCH):
+            part = keys[i:i + _BATCH]
+            q = f"SELECT key, payload, ts FROM {table} WHERE version = ? AND key IN ({','.join('?' * len(part))})"
+            for k, v, ts in self._db.execute(q, (self.version, *part)):
+                out[k] = v
+                if refresh is not None and ts < self._refresh_before:
+                    refresh.append((k, v))
+        return out
+
+    def put_many(self, table: str, rows: List[Tuple[str, bytes]]) -> None:
+        if not rows:
+            return
+        now = time.time()
+        self._db.executemany(
+            f"INSERT OR REPLACE INTO {table} (key, version, payload, ts) VALUES (?, ?, ?, ?)",
+            [(k, self.version, v, now) for k, v in rows],
+        )
+        self._db.commit()
+
+    def prune(self) -> int:
+        """Drop rows not seen for max_age_s, then the oldest rows over max_rows; returns rows removed."""
+        removed = 0
+        for t in _TABLES:
+            if self.max_age_s > 0:
+                removed += self._db.execute(f"DELETE FROM {t} WHERE ts < ?", (time.time() - self.max_age_s,)).rowcount
+            if self.max_rows > 0:
+                (n,) = self._db.execute(f"SELECT COUNT(*) FROM {t}").fetchone()
+                if n > self.max_rows:
+                    removed += self._db.execute(
+                        f"DELETE FROM {t} WHERE rowid IN (SELECT rowid FROM {t} ORDER BY ts LIMIT ?)",
+                        (n - self.max_rows,),
+                    ).rowcount
+        self._db.commit()
+        return removed
+
+    def close(self) -> None:
+        self._db.close()
@@ -0,0 +1,979 @@
+"""Single-pass validation engine shared by validate_outputs / validate_quality.
+
+Each JSONL record is wrapped in a `Record` that parses its prompt blocks and
+assistant answer at most once per (format, text); the syntax check, attribute
+checks, round-trip checks and distribution sampling all read from that cache.
+One pass over the files can therefore fill both a `SyntaxReport` and a
+`QualityReport`. Files are split into line-aligned byte ranges so a process
+pool can validate them; partial reports are merged in file/offset order.
+
+With a cache path, each record's outcome is stored in `validation_cache`
+keyed by its raw line and VALIDATOR_VERSION; unchanged records replay the
+stored outcome, so reports are identical to a full run.
+"""
+from __future__ import annotations
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from io import StringIO
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+import pandas as pd
+try:
+    import tomllib  # Python 3.11+
+except Exception:
+    import tomli as tomllib  # Python 3.10 fallback
+import yaml
+from lxml import etree
+
+from .config import QUALITY_EXACT, QUALITY_SKETCH_K
+from .jsonl_index import JsonlIndex
+from .stream_stats import DistStat
+from .utils import decode_source
+from .validation_cache import ValidationCache, record_key
+
+# Bump whenever a check below changes its outcome for the same record, so
+# cached results from older code are discarded.
+VALIDATOR_VERSION = 2
+
+FILES = [
+    "sft_core_c_tabular.jsonl",
+    "sft_core_c_xml_in.jsonl",
+    "sft_core_c_xml_out.jsonl",
+    "sft_core_c_toml_out.jsonl",
+    "sft_core_c_yaml_out_min.jsonl",
+    "sft_core_g_gtfs.jsonl",
+    "sft_pack_hard_mixed.jsonl",
+    # Schema-driven packs (20260104/config.BUDGET)
+    "sft_core_c_text_to_json_schema.jsonl",
+    "sft_core_c_text_to_json_schema_nested.jsonl",
+    "sft_core_c_text_to_yaml_schema.jsonl",
+    "sft_core_c_text_to_toml_schema.jsonl",
+]
+
+_MISSING = object()
+
+# Lines per batch in validate_range: bounds the keys, cache lookups and
+# pending cache rows held at once
+RANGE_BATCH_LINES = 2048
+
+# (file, path, start, end, syntax, quality, cache_path, full, exact, rows)
+# `rows` is a tuple of sampled row numbers read through the JSONL index
+# instead of the byte range, or None for the whole range.
+Task = Tuple[str, str, int, int, bool, bool, str, bool, bool, Optional[Tuple[int, ...]]]
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+def _load_line(line: bytes) -> Dict[str, Any]:
+    try:
+        return orjson.loads(line)
+    except Exception as e:
+        return {"__load_error__": str(e), "__raw__": line.decode(errors="ignore")}
+
+
+def _parse_lines(lines: Iterable[bytes]):
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        yield _load_line(line)
+
+
+def _load_jsonl(path: str):
+    with open(path, "rb") as f:
+        yield from _parse_lines(f)
+
+
+def _chunk_ranges(path: str, chunk_bytes: int) -> List[Tuple[int, int]]:
+    """Split a file into [start, end) byte ranges that begin on line starts."""
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    chunk_bytes = max(1, int(chunk_bytes))
+    bounds = [0]
+    with open(path, "rb") as f:
+        pos = chunk_bytes
+        while pos < size:
+            f.seek(pos)
+            f.readline()
+            nxt = f.tell()
+            if nxt >= size:
+                break
+            if nxt > bounds[-1]:
+                bounds.append(nxt)
+            pos = max(nxt, pos) + chunk_bytes
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+# ---------------------------------------------------------------------------
+# Parsing helpers
+# ---------------------------------------------------------------------------
+
+def _expect_for_file(fname: str, subcat: str) -> str:
+    # Return one of: json, csv, xml, toml, yaml
+    base = os.path.basename(fname)
+    if base == "sft_core_c_tabular.jsonl":
+        if subcat.endswith("json_to_csv"):
+            return "csv"
+        return "json"
+    if base == "sft_core_c_xml_in.jsonl":
+        return "json"
+    if base == "sft_core_c_xml_out.jsonl":
+        return "xml"
+    if base == "sft_core_c_toml_out.jsonl":
+        if subcat.endswith("toml_to_json"):
+            return "json"
+        return "toml"
+    if base == "sft_core_c_yaml_out_min.jsonl":
+        return "yaml"
+    if base == "sft_core_g_gtfs.jsonl":
+        return "json"
+    if base == "sft_pack_hard_mixed.jsonl":
+        return "json"
+    if base in ("sft_core_c_text_to_json_schema.jsonl", "sft_core_c_text_to_json_schema_nested.jsonl"):
+        return "json"
+    if base == "sft_core_c_text_to_yaml_schema.jsonl":
+        return "yaml"
+    if base == "sft_core_c_text_to_toml_schema.jsonl":
+        return "toml"
+    return "unknown"
+
+
+def _extract_block(prompt: str, label: str) -> Optional[str]:
+    # Finds `label:\n` and returns the rest of the block until end.
+    m = re.search(rf"(?ms)\b{re.escape(label)}\s*\n(.*)$", prompt)
+    if m:
+        return m.group(1).strip()
+    return None
+
+
+def _extract_attributes(prompt: str) -> List[str]:
+    """Extract attribute list after 'ATTRIBUTES:' even if newlines were collapsed.
+
+    Accepts both patterns:
+      ATTRIBUTES:\ncol1, col2, ...
+      ATTRIBUTES: col1, col2, ...
+    and stops at next section label like CSV:/JSON:/XML:/YAML:/TEXT:/TOML: or EoS.
+    """
+    if "ATTRIBUTES:" not in prompt:
+        return []
+    m = re.search(
+        r"(?is)ATTRIBUTES:\s*(.*?)(?:\n\s*\n|\n(?:CSV|JSON|XML|YAML|TEXT|TOML)\s*:|(?:CSV|JSON|XML|YAML|TEXT|TOML)\s*:|$)",
+        prompt,
+    )
+    if not m:
+        return []
+    raw = m.group(1).strip()
+    # attributes are comma-separated; only the first line (if any)
+    line = raw.splitlines()[0] if raw else ""
+    attrs = [a.strip() for a in line.split(",") if a.strip()]
+    return attrs
+
+
+def _parse_json(s: str) -> Any:
+    return orjson.loads(s)
+
+
+def _parse_csv_to_df(s: str) -> pd.DataFrame:
+    return pd.read_csv(StringIO(s))
+
+
+def _parse_xml(s: str) -> etree._Element:
+    return etree.fromstring(s.encode("utf-8"))
+
+
+def _parse_yaml(s: str) -> Any:
+    return yaml.safe_load(s)
+
+
+def _parse_toml(s: str) -> Any:
+    return tomllib.loads(s)
+
+
+_PARSERS = {
+    "json": _parse_json,
+    "csv": _parse_csv_to_df,
+    "xml": _parse_xml,
+    "yaml": _parse_yaml,
+    "toml": _parse_toml,
+}
+
+
+def _norm_dict(x: Any) -> Any:
+    # Recursively sort keys for comparable equality
+    if isinstance(x, dict):
+        return {k: _norm_dict(x[k]) for k in sorted(x.keys())}
+    if isinstance(x, list):
+        return [_norm_dict(v) for v in x]
+    return x
+
+
+def _xml_to_obj(elem: etree._Element) -> Any:
+    """Parse XML back to Python structures compatible with dict_to_xml_sized.
+
+    - Elements with only text -> return text
+    - Elements with children of mixed names -> dict of tag->value
+    - Repeated tag names -> list
+    - <item> children -> produce list
+    """
+    children = list(elem)
+    if not children:
+        text = (elem.text or "").strip()
+        return text
+
+    # Group by tag
+    groups: Dict[str, List[etree._Element]] = {}
+    for ch in children:
+        groups.setdefault(ch.tag, []).append(ch)
+
+    # Special case: list semantics via <item>
+    if set(groups.keys()) == {"item"}:
+        return [_xml_to_obj(c) for c in groups["item"]]
+
+    out: Dict[str, Any] = {}
+    for tag, elems in groups.items():
+        if len(elems) == 1:
+            out[tag] = _xml_to_obj(elems[0])
+        else:
+            out[tag] = [_xml_to_obj(e) for e in elems]
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Record
+# ---------------------------------------------------------------------------
+
+class Record:
+    """One JSONL record with memoized prompt/answer parses.
+
+    `parse(fmt, text)` runs each parser at most once per text; a failed parse
+    caches its exception and re-raises it on every later call so callers see
+    the same exception type as a direct parse would give.
+    """
+
+    __slots__ = ("fn", "obj", "_cache", "_attrs", "_source")
+
+    def __init__(self, fn: str, obj: Dict[str, Any], source: Optional[Dict[str, Any]] = None):
+        self.fn = fn
+        self.obj = obj
+        self._cache: Dict[Tuple[str, str], Tuple[bool, Any]] = {}
+        self._attrs: Optional[List[str]] = None
+        # An in-memory source (inline gate) wins over the encoded `source` field
+        self._source: Any = source if source is not None else _MISSING
+
+    @property
+    def load_error(self) -> Optional[str]:
+        return self.obj.get("__load_error__")
+
+    @property
+    def id(self) -> Any:
+        return self.obj.get("id")
+
+    @property
+    def subcategory(self) -> str:
+        return self.obj.get("subcategory", "")
+
+    @property
+    def messages(self) -> Any:
+        return self.obj.get("messages")
+
+    @property
+    def prompt(self) -> str:
+        return self.obj["messages"][0].get("content", "")
+
+    @property
+    def answer(self) -> Any:
+        return self.obj["messages"][-1].get("content", "")
+
+    def parse(self, fmt: str, text: str) -> Any:
+        key = (fmt, text)
+        hit = self._cache.get(key)
+        if hit is None:
+            try:
+                hit = (True, _PARSERS[fmt](text))
+            except Exception as e:
+                hit = (False, e)
+            self._cache[key] = hit
+        ok, val = hit
+        if not ok:
+            raise val
+        return val
+
+    def ok(self, fmt: str, text: str) -> bool:
+        try:
+            self.parse(fmt, text)
+            return True
+        except Exception:
+            return False
+
+    def block(self, label: str) -> Optional[str]:
+        return _extract_block(self.prompt, label)
+
+    def source(self) -> Optional[Dict[str, Any]]:
+        """Decoded `source` payload written by sample(), or None."""
+        if self._source is _MISSING:
+            self._source = decode_source(self.obj.get("source"))
+        return self._source
+
+    def attributes(self) -> List[str]:
+        if self._attrs is None:
+            src = self.source()
+            if src is not None and isinstance(src.get("attrs"), list):
+                # Same "attributes shown in the prompt" semantics as the regex path
+                self._attrs = [str(a) for a in src["attrs"]] if "ATTRIBUTES:" in self.prompt else []
+            else:
+                self._attrs = _extract_attributes(self.prompt)
+        return self._attrs
+
+    def input(self, fmt: str, label: str) -> Any:
+        """Structured input: `source.data` if stored, else the parsed prompt block.
+
+        Returns _MISSING when the prompt has no (non-empty) block.
+        """
+        src = self.source()
+        if src is not None and "data" in src:
+            return src["data"]
+        s = self.block(label) or ""
+        if not s.strip():
+            return _MISSING
+        return self.parse(fmt, s)
+
+
+# ---------------------------------------------------------------------------
+# Syntax checks (validate_outputs)
+# ---------------------------------------------------------------------------
+
+_FMT_FAIL = {
+    "csv": "csv_parse_fail",
+    "xml": "xml_invalid",
+    "toml": "toml_invalid",
+    "yaml": "yaml_invalid",
+}
+
+
+def _validate_answer(fmt: str, answer: str, rec: Optional[Record] = None) -> Tuple[bool, str]:
+    if not isinstance(answer, str) or not answer.strip():
+        return False, "empty"
+    rec = rec or Record("", {})
+    if fmt == "json":
+        try:
+            rec.parse("json", answer)
+            return True, "ok"
+        except Exception as e:
+            return False, f"exception:{type(e).__name__}"
+    if fmt in _FMT_FAIL:
+        if rec.ok(fmt, answer):
+            return True, "ok"
+        return False, _FMT_FAIL[fmt]
+    return False, f"unsupported_fmt:{fmt}"
+
+
+def check_syntax(rec: Record) -> Optional[Dict[str, Any]]:
+    """Return an error dict, or None if the record is valid."""
+    fn, obj = rec.fn, rec.obj
+    if rec.load_error is not None:
+        return {"file": fn, "id": None, "reason": "jsonl_load_error", "detail": rec.load_error}
+
+    msgs = obj.get("messages", [])
+    if not isinstance(msgs, list) or len(msgs) < 2:
+        return {"file": fn, "id": obj.get("id"), "reason": "bad_messages"}
+    if msgs[-1].get("role") != "assistant":
+        return {"file": fn, "id": obj.get("id"), "reason": "last_not_assistant"}
+
+    ans = msgs[-1].get("content", "")
+    sub = obj.get("subcategory", "")
+    expect = _expect_for_file(fn, sub)
+
+    ok, why = _validate_answer(expect, ans, rec)
+    if not ok:
+        return {"file": fn, "id": obj.get("id"), "subcategory": sub, "expect": expect, "reason": why}
+    return None
+
+
+def _cache_summary(name: str, hits: int, lookups: int) -> Optional[str]:
+    if not lookups:
+        return None
+    return f"[cache] {name}: hits={hits}/{lookups} ({100.0 * hits / lookups:.1f}%)"
+
+
+class SyntaxReport:
+    def __init__(self) -> None:
+        self.totals: Dict[str, int] = {}
+        self.valids: Dict[str, int] = {}
+        self.errors: List[Dict[str, Any]] = []
+        self.cache_hits = 0
+        self.cache_lookups = 0
+
+    def add(self, fn: str, err: Optional[Dict[str, Any]]) -> None:
+        self.totals[fn] = self.totals.get(fn, 0) + 1
+        if err is None:
+            self.valids[fn] = self.valids.get(fn, 0) + 1
+        else:
+            self.errors.append(err)
+
+    def merge(self, other: "SyntaxReport") -> None:
+        for fn, n in other.totals.items():
+            self.totals[fn] = self.totals.get(fn, 0) + n
+        for fn, n in other.valids.items():
+            self.valids[fn] = self.valids.get(fn, 0) + n
+        self.errors.extend(other.errors)
+        self.cache_hits += other.cache_hits
+        self.cache_lookups += other.cache_lookups
+
+    def cache_summary(self) -> Optional[str]:
+        return _cache_summary("syntax", self.cache_hits, self.cache_lookups)
+
+    def print(self, files: List[str], out_dir: str) -> None:
+        print("\nValidation summary:")
+        for fn in files:
+            total = self.totals.get(fn, 0)
+            if total == 0 and not os.path.exists(os.path.join(out_dir, fn)):
+                continue
+            print(f"- {fn}: {self.valids.get(fn, 0)}/{total} valid")
+        if self.errors:
+            print("\nErrors (up to 50):")
+            for e in self.errors[:50]:
+                print(" ", e)
+        else:
+            print("No structural/syntax errors detected.")
+
+
+# ---------------------------------------------------------------------------
+# Quality checks (validate_quality)
+# ---------------------------------------------------------------------------
+
+_METRICS = (
+    "attributes_per_prompt",
+    "rows_in_prompt",
+    "rows_in_answer",
+    "cell_length_samples",
+    "answer_char_length",
+)
+_ISSUES = ("schema_errors", "attr_issues", "roundtrip_issues")
+ISSUE_SAMPLES = 10
+
+
+class _Issues:
+    """Issue count plus the first few samples (only those are printed)."""
+
+    __slots__ = ("count", "samples")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.samples: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return self.count
+
+    def append(self, e: Dict[str, Any]) -> None:
+        self.count += 1
+        if len(self.samples) < ISSUE_SAMPLES:
+            self.samples.append(e)
+
+    def merge(self, other: "_Issues") -> None:
+        self.count += other.count
+        room = ISSUE_SAMPLES - len(self.samples)
+        if room > 0:
+            self.samples.extend(other.samples[:room])
+
+
+class QualityReport:
+    """Quality aggregates in memory bounded by the number of packs/subcategories.
+
+    Distributions are `DistStat`s (KLL + Welford, or full value lists when
+    `exact`), kept overall and per pack / per subcategory. Only unique ids
+    grow with the data, for duplicate detection.
+    """
+
+    def __init__(self, exact: bool = QUALITY_EXACT, k: int = QUALITY_SKETCH_K) -> None:
+        self.exact = exact
+        self.k = k
+        self.n_ids = 0
+        self.id_set: set = set()
+        self.schema_errors = _Issues()
+        self.attr_issues = _Issues()
+        self.roundtrip_issues = _Issues()
+        self.dist: Dict[str, DistStat] = {m: DistStat(exact, k) for m in _METRICS}
+        self.by_pack: Dict[str, Dict[str, DistStat]] = {}
+        self.by_subcat: Dict[str, Dict[str, DistStat]] = {}
+        self.pack_records: Dict[str, int] = {}
+        self.subcat_records: Dict[str, int] = {}
+        self._group: Optional[Tuple[str, str]] = None
+        self.cache_hits = 0
+        self.cache_lookups = 0
+
+    def add_id(self, sid: Any) -> None:
+        self.n_ids += 1
+        self.id_set.add(sid)
+
+    def duplicates(self) -> int:
+        return self.n_ids - len(self.id_set)
+
+    def count_record(self, fn: str, subcat: str) -> None:
+        self.pack_records[fn] = self.pack_records.get(fn, 0) + 1
+        self.subcat_records[subcat] = self.subcat_records.get(subcat, 0) + 1
+        self._group = (fn, subcat)
+
+    def _group_stat(self, groups: Dict[str, Dict[str, DistStat]], key: str, metric: str) -> DistStat:
+        g = groups.get(key)
+        if g is None:
+            g = groups[key] = {}
+        st = g.get(metric)
+        if st is None:
+            st = g[metric] = DistStat(self.exact, self.k)
+        return st
+
+    def observe(self, metric: str, value: float, fn: str, subcat: str) -> None:
+        self.dist[metric].add(value)
+        self._group_stat(self.by_pack, fn, metric).add(value)
+        self._group_stat(self.by_subcat, subcat, metric).add(value)
+
+    def merge(self, other: "QualityReport") -> None:
+        self.n_ids += other.n_ids
+        self.id_set |= other.id_set
+        for k in _ISSUES:
+            getattr(self, k).merge(getattr(other, k))
+        for m in _METRICS:
+            self.dist[m].merge(other.dist[m])
+        for mine, theirs in ((self.by_pack, other.by_pack), (self.by_subcat, other.by_subcat)):
+            for key, stats in theirs.items():
+                for m, st in stats.items():
+                    self._group_stat(mine, key, m).merge(st)
+        for mine, theirs in ((self.pack_records, other.pack_records), (self.subcat_records, other.subcat_records)):
+            for key, n in theirs.items():
+                mine[key] = mine.get(key, 0) + n
+        self.cache_hits += other.cache_hits
+        self.cache_lookups += other.cache_lookups
+
+    def payload(self) -> Dict[str, Any]:
+        """Cache payload of a single-record exact report."""
+        out: Dict[str, Any] = {}
+        if self._group is not None:
+            out["group"] = list(self._group)
+        if self.id_set:
+            out["ids"] = list(self.id_set)
+        for k in _ISSUES:
+            if getattr(self, k).samples:
+                out[k] = getattr(self, k).samples
+        obs = {m: self.dist[m].values for m in _METRICS if self.dist[m].values}
+        if obs:
+            out["obs"] = obs
+        return out
+
+    def replay(self, payload: Dict[str, Any]) -> None:
+        fn, subcat = payload.get("group") or ("", "")
+        if "group" in payload:
+            self.count_record(fn, subcat)
+        for sid in payload.get("ids", ()):
+            self.add_id(sid)
+        for k in _ISSUES:
+            for e in payload.get(k, ()):
+                getattr(self, k).append(e)
+        for m, vals in payload.get("obs", {}).items():
+            for v in vals:
+                self.observe(m, v, fn, subcat)
+
+    def cache_summary(self) -> Optional[str]:
+        return _cache_summary("quality", self.cache_hits, self.cache_lookups)
+
+    def print(self, breakdown: bool = True) -> None:
+        print("Quality report:\n")
+        print("- Duplicate ids:", self.duplicates())
+        print("- Schema errors:", len(self.schema_errors))
+        print("- Attribute issues:", len(self.attr_issues))
+        print("- Round-trip issues:", len(self.roundtrip_issues))
+
+        if self.attr_issues:
+            print(f"\nSample attribute issues (up to {ISSUE_SAMPLES}):")
+            for e in self.attr_issues.samples:
+                print(" ", e)
+        if self.roundtrip_issues:
+            print(f"\nSample round-trip issues (up to {ISSUE_SAMPLES}):")
+            for e in self.roundtrip_issues.samples:
+                print(" ", e)
+
+        print("\nDistributions:")
+        for m in _METRICS:
+            _summ(m, self.dist[m])
+        if not breakdown:
+            return
+        for title, groups, records in (
+            ("pack", self.by_pack, self.pack_records),
+            ("subcategory", self.by_subcat, self.subcat_records),
+        ):
+            print(f"\nDistributions by {title}:")
+            for key in sorted(records):
+                print(f"- {key or '(none)'}: records={records[key]}")
+                stats = groups.get(key, {})
+                for m in _METRICS:
+                    if m in stats and len(stats[m]):
+                        _summ(m, stats[m], indent="    ")
+
+
+def _summ(name: str, stat: DistStat, indent: str = "") -> None:
+    sm = stat.summary()
+    if sm is None:
+        print(f"{indent}- {name}: n=0")
+        return
+    n, lo, p10, p50, p90, hi, mean, std = sm
+    print(f"{indent}- {name}: n={n} min={lo} p10={p10} p50={p50} p90={p90} max={hi} mean={mean:.1f} std={std:.1f}")
+
+
+def _xml_ref_obj(rec: Record, subcat: str) -> Optional[Dict[str, Any]]:
+    # build reference object from the stored source, else from the prompt
+    src = rec.source()
+    if src is not None and "data" in src:
+        ref = src["data"]
+        return ref if isinstance(ref, dict) else {"value": ref}
+    if subcat == "json_to_xml":
+        js = rec.block("JSON:") or ""
+        if js.strip():
+            ref = rec.parse("json", js)
+            return ref if isinstance(ref, dict) else {"value": ref}
+    elif subcat == "yaml_to_xml":
+        yml = rec.block("YAML:") or ""
+        if yml.strip():
+            ref = rec.parse("yaml", yml)
+            return ref if isinstance(ref, dict) else {"value": ref}
+    elif subcat == "csv_to_xml":
+        csv_s = rec.block("CSV:") or ""
+        if csv_s.strip():
+            try:
+                df = rec.parse("csv", csv_s)
+                return {"items": df.fillna("").astype(str).to_dict(orient="records")}
+            except Exception:
+                return None
+    return None
+
+
+def _check_roundtrip(rec: Record, q: QualityReport, answer: str) -> None:
+    fn, sid, subcat = rec.fn, rec.id, rec.subcategory
+    sc = subcat if isinstance(subcat, str) else str(subcat)
+    attrs = rec.attributes()
+    if subcat in ("csv_to_json", "xml_to_json", "text_to_json", "text_to_yaml", "text_to_toml"):
+        if subcat.endswith("_to_json"):
+            ans = rec.parse("json", answer)
+            if isinstance(ans, list) and all(isinstance(x, dict) for x in ans) and attrs:
+                # Check all keys exist; compute non-empty ratio
+                empty_cnt = 0
+                for row in ans:
+                    for k in attrs:
+                        if k not in row or (str(row.get(k) or "").strip() == ""):
+                            empty_cnt += 1
+                if empty_cnt > 0:
+                    q.attr_issues.append({"file": fn, "id": sid, "why": "missing_or_empty_attrs", "count": empty_cnt})
+            q.observe("rows_in_answer", len(ans) if isinstance(ans, list) else 0, fn, sc)
+        elif subcat.endswith("_to_yaml"):
+            # not enforcing attr equality strictly for YAML; parse failures still count
+            rec.parse("yaml", answer)
+    elif subcat == "json_to_csv":
+        # prompt JSON vs answer CSV
+        prompt_json = rec.input("json", "JSON:")
+        if prompt_json is _MISSING:
+            prompt_json = {}
+        df_csv = rec.parse("csv", answer)
+        if isinstance(prompt_json, list) and prompt_json:
+            keys = sorted({k for r in prompt_json if isinstance(r, dict) for k in r.keys()})
+            cols = list(df_csv.columns)
+            if not set(keys).issubset(set(cols)):
+                q.roundtrip_issues.append({"file": fn, "id": sid, "why": "csv_missing_cols", "expected": keys, "got": cols})
+            # row count check (allow equal only)
+            if len(df_csv) != len(prompt_json):
+                q.roundtrip_issues.append({"file": fn, "id": sid, "why": "csv_row_mismatch", "exp": len(prompt_json), "got": len(df_csv)})
+            q.observe("rows_in_prompt", len(prompt_json), fn, sc)
+            q.observe("rows_in_answer", len(df_csv), fn, sc)
+    elif subcat == "toml_to_json":
+        # prompt TOML -> answer JSON strict equality
+        j_ans = rec.parse("json", answer)
+        parsed = rec.input("toml", "TOML:")
+        if parsed is not _MISSING:
+            if _norm_dict(parsed) != _norm_dict(j_ans):
+                q.roundtrip_issues.append({"file": fn, "id": sid, "why": "toml_to_json_roundtrip_mismatch"})
+    elif subcat == "json_to_toml":
+        j = rec.input("json", "JSON:")
+        if j is not _MISSING:
+            if rec.ok("toml", answer):
+                if _norm_dict(rec.parse("toml", answer)) != _norm_dict(j):
+                    q.roundtrip_issues.append({"file": fn, "id": sid, "why": "json_to_toml_roundtrip_mismatch"})
+    elif subcat == "yaml_to_toml":
+        y = rec.input("yaml", "YAML:")
+        if y is not _MISSING:
+            if rec.ok("toml", answer):
+                if _norm_dict(rec.parse("toml", answer)) != _norm_dict(y):
+                    q.roundtrip_issues.append({"file": fn, "id": sid, "why": "yaml_to_toml_roundtrip_mismatch"})
+    elif subcat == "json_to_yaml":
+        j = rec.input("json", "JSON:")
+        if j is not _MISSING:
+            y = rec.parse("yaml", answer)
+            if _norm_dict(j) != _norm_dict(y):
+                q.roundtrip_issues.append({"file": fn, "id": sid, "why": "json_to_yaml_roundtrip_mismatch"})
+    # XML round-trip checks (json/yaml/csv -> xml). 'text_to_xml' is skipped.
+    if subcat in ("json_to_xml", "yaml_to_xml", "csv_to_xml"):
+        ref_obj = _xml_ref_obj(rec, subcat)
+        if ref_obj is not None:
+            # parse assistant XML -> obj and compare normalized forms
+            try:
+                got_obj = _xml_to_obj(rec.parse("xml", answer))
+                # normalize both sides under a common root
+                if _norm_dict({"root": ref_obj}) != _norm_dict({"root": got_obj}):
+                    q.roundtrip_issues.append({"file": fn, "id": sid, "why": f"{subcat}_xml_roundtrip_mismatch"})
+            except Exception:
+                q.roundtrip_issues.append({"file": fn, "id": sid, "why": f"{subcat}_xml_parse_or_compare_error"})
+
+
+def check_quality(rec: Record, q: QualityReport) -> None:
+    fn = rec.fn
+    if rec.load_error is not None:
+        q.schema_errors.append({"file": fn, "id": None, "why": "jsonl_load_error"})
+        return
+    sid = rec.id
+    q.add_id(sid)
+    subcat = rec.subcategory
+    subcat = subcat if isinstance(subcat, str) else str(subcat)
+    q.count_record(fn, subcat)
+    msgs = rec.messages
+    if not isinstance(msgs, list) or len(msgs) < 2:
+        q.schema_errors.append({"file": fn, "id": sid, "why": "bad_messages"})
+        return
+    if msgs[-1].get("role") != "assistant" or not isinstance(msgs[-1].get("content", ""), str):
+        q.schema_errors.append({"file": fn, "id": sid, "why": "assistant_bad"})
+        return
+
+    answer = rec.answer
+    attrs = rec.attributes()
+    if attrs:
+        q.observe("attributes_per_prompt", len(attrs), fn, subcat)
+
+    try:
+        _check_roundtrip(rec, q, answer)
+    except Exception as e:
+        q.roundtrip_issues.append({"file": fn, "id": sid, "why": f"exception:{type(e).__name__}"})
+
+    # crude cell length & answer length sampling
+    q.observe("answer_char_length", len(answer), fn, subcat)
+    if subcat == "json_to_csv":
+        try:
+            df = rec.parse("csv", answer)
+            for val in df.astype(str).values.ravel().tolist()[:50]:
+                q.observe("cell_length_samples", len(val), fn, subcat)
+        except Exception:
+            pass
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def _range_lines(path: str, start: int, end: int) -> Iterable[bytes]:
+    """Non-empty stripped lines of [start, end), read one line at a time."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        pos = start
+        while pos < end:
+            raw = f.readline()
+            if not raw:
+                break
+            pos += len(raw)
+            line = raw.strip()
+            if line:
+                yield line
+
+
+def _batched(it: Iterable[bytes], n: int) -> Iterable[List[bytes]]:
+    buf: List[bytes] = []
+    for x in it:
+        buf.append(x)
+        if len(buf) >= n:
+            yield buf
+            buf = []
+    if buf:
+        yield buf
+
+
+def validate_range(task: Task, flush: Optional[Callable[[List[Tuple[str, bytes]], List[Tuple[str, bytes]]], None]] = None):
+    """Validate one byte range of a file, filling the requested reports.
+
+    Lines are streamed from the file and handled RANGE_BATCH_LINES at a time
+    (cache keys, cache lookups and new cache rows included), so memory does
+    not grow with the range size. Returns (syntax_report, quality_report,
+    new_syntax_rows, new_quality_rows); the row lists are cache entries
+    (new outcomes, plus hits due for a last-seen refresh) for the parent
+    process to persist, or are handed to `flush` batch by batch
+    (and returned empty) when it is given.
+    """
+    fn, path, start, end, want_syntax, want_quality, cache_path, full, exact, rows = task
+    syn = SyntaxReport() if want_syntax else None
+    qual = QualityReport(exact) if want_quality else None
+    if syn is not None:
+        syn.totals[fn] = 0
+        syn.valids[fn] = 0
+
+    idx: Optional[JsonlIndex] = None
+    if rows is not None:
+        idx = JsonlIndex(path)
+        lines: Iterable[bytes] = (ln for ln in (idx.line(r).strip() for r in rows) if ln)
+    else:
+        lines = _range_lines(path, start, end)
+    cache: Optional[ValidationCache] = None
+    if cache_path and not full and os.path.exists(cache_path):
+        cache = ValidationCache.open_reader(cache_path, VALIDATOR_VERSION)
+
+    new_s: List[Tuple[str, bytes]] = []
+    new_q: List[Tuple[str, bytes]] = []
+    try:
+        for batch in _batched(lines, RANGE_BATCH_LINES):
+            keys: List[Optional[str]] = [None] * len(batch)
+            cached_s: Dict[str, bytes] = {}
+            cached_q: Dict[str, bytes] = {}
+            if cache_path:
+                keys = [record_key(VALIDATOR_VERSION, fn, ln) for ln in batch]
+                if cache is not None:
+                    if syn is not None:
+                        cached_s = cache.get_many("syntax", keys, refresh=new_s)
+                    if qual is not None:
+                        cached_q = cache.get_many("quality", keys, refresh=new_q)
+            _validate_batch(fn, batch, keys, cached_s, cached_q, syn, qual, new_s, new_q)
+            if flush is not None and (new_s or new_q):
+                flush(new_s, new_q)
+                new_s, new_q = [], []
+    finally:
+        if cache is not None:
+            cache.close()
+        if idx is not None:
+            idx.close()
+    return syn, qual, new_s, new_q
+
+
+def _validate_batch(
+    fn: str,
+    lines: List[bytes],
+    keys: List[Optional[str]],
+    cached_s: Dict[str, bytes],
+    cached_q: Dict[str, bytes],
+    syn: Optional[SyntaxReport],
+    qual: Optional[QualityReport],
+    new_s: List[Tuple[str, bytes]],
+    new_q: List[Tuple[str, bytes]],
+) -> None:
+    for line, key in zip(lines, keys):
+        rec: Optional[Record] = None
+        if syn is not None:
+            hit = cached_s.get(key) if key else None
+            if hit is not None:
+                err = orjson.loads(hit)
+                syn.cache_hits += 1
+            else:
+                rec = Record(fn, _load_line(line))
+                err = check_syntax(rec)
+                if key:
+                    new_s.append((key, orjson.dumps(err)))
+            if key:
+                syn.cache_lookups += 1
+            syn.add(fn, err)
+        if qual is not None:
+            hit = cached_q.get(key) if key else None
+            if hit is not None:
+                qual.replay(orjson.loads(hit))
+                qual.cache_hits += 1
+            elif key:
+                rec = rec or Record(fn, _load_line(line))
+                one = QualityReport(exact=True)
+                check_quality(rec, one)
+                qual.merge(one)
+                try:
+                    new_q.append((key, orjson.dumps(one.payload())))
+                except TypeError:
+                    pass  # non-JSON values in an issue: just don't cache this record
+            else:
+                check_quality(rec or Record(fn, _load_line(line)), qual)
+            if key:
+                qual.cache_lookups += 1
+
+
+def plan_tasks(
+    files: List[str],
+    out_dir: str,
+    workers: int,
+    chunk_mb: float,
+    syntax: bool = True,
+    quality: bool = True,
+    cache_path: str = "",
+    full: bool = False,
+    exact: bool = QUALITY_EXACT,
+    sample: int = 0,
+    seed: int = 0,
+) -> Tuple[List[Task], List[str]]:
+    """Return (tasks, missing paths); files are chunked only when workers > 1.
+
+    An empty `cache_path` disables the cache; `full` ignores cached outcomes
+    but still refreshes them. `exact` keeps every distribution value instead
+    of streaming sketches. `sample` > 0 validates a subcategory-stratified
+    draw of that many rows per file, fetched through `jsonl_index`.
+    """
+    tasks: List[Task] = []
+    missing: List[str] = []
+    for fn in files:
+        path = os.path.join(out_dir, fn)
+        if not os.path.exists(path):
+            missing.append(path)
+            continue
+        size = os.path.getsize(path)
+        if sample > 0:
+            idx = JsonlIndex(path)
+            try:
+                picked = [int(r) for r in idx.sample_rows(sample, seed)]
+            finally:
+                idx.close()
+            n_parts = max(1, min(workers, len(picked)))
+            step = -(-len(picked) // n_parts) if picked else 1
+            for i in range(0, max(1, len(picked)), step):
+                tasks.append((fn, path, 0, size, syntax, quality, cache_path, full, exact, tuple(picked[i:i + step])))
+        elif workers > 1:
+            for start, end in _chunk_ranges(path, chunk_mb * 1024 * 1024):
+                tasks.append((fn, path, start, end, syntax, quality, cache_path, full, exact, None))
+        else:
+            tasks.append((fn, path, 0, size, syntax, quality, cache_path, full, exact, None))
+    return tasks, missing
+
+
+def _run_results(tasks: List[Task], workers: int, cache: Optional[ValidationCache]):
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            # map() yields in task order as ranges finish; consumed lazily
+            yield from ex.map(validate_range, tasks)
+        return
+    # Serial: new cache rows are written batch by batch instead of held
+    def put(rows_s: List[Tuple[str, bytes]], rows_q: List[Tuple[str, bytes]]) -> None:
+        cache.put_many("syntax", rows_s)
+        cache.put_many("quality", rows_q)
+
+    for t in tasks:
+        yield validate_range(t, put if cache is not None else None)
+
+
+def run_tasks(tasks: List[Task], workers: int = 1) -> Tuple[SyntaxReport, QualityReport]:
+    cache_path = tasks[0][6] if tasks else ""
+    cache = ValidationCache(cache_path, VALIDATOR_VERSION) if cache_path else None
+    # Merge in task order (file, then offset) for a deterministic report
+    syn, qual = SyntaxReport(), QualityReport(tasks[0][8] if tasks else QUALITY_EXACT)
+    try:
+        for s, q, rows_s, rows_q in _run_results(tasks, workers, cache):
+            if s is not None:
+                syn.merge(s)
+            if q is not None:
+                qual.merge(q)
+            if cache is not None:
+                cache.put_many("syntax", rows_s)
+                cache.put_many("quality", rows_q)
+        if cache is not None:
+            cache.prune()
+    finally:
+        if cache is not None:
+            cache.close()
+    return syn, qual
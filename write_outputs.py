@@ -4,6 +4,9 @@ from typing import Dict, List, Tuple
 import orjson
 
 from .config import DEBUG_DIR, OUT_DIR, XML_FAIL_LOG, TOML_FAIL_LOG, REJECT_LOG
+from .format_counters import COUNTERS, COUNTERS_PATH
+from .log_sink import flush_logs, log_stats
+from .metrics import inc
 from .utils import ensure_dirs
 
 
@@ -45,13 +48,25 @@ def write_outputs(outputs: Dict[str, List[dict]]):
     outputs, removed = _deduplicate_outputs(outputs)
     if any(v > 0 for v in removed.values()):
         print("[dedup] removed duplicates per file:", removed)
+    for name, n in removed.items():
+        if n:
+            inc("dedup_removed_total", n, file=name)
     for name, data in outputs.items():
         path = os.path.join(OUT_DIR, name)
         with open(path, "w", encoding="utf-8") as f:
             for r in data:
                 f.write(orjson.dumps(r).decode() + "\n")
+        inc("samples_written_total", len(data), file=name)
+        inc("bytes_written_total", os.path.getsize(path), file=name)
         print("Wrote", name, ":", len(data), "samples ->", path)
 
+    if COUNTERS.formats:
+        COUNTERS.save(COUNTERS_PATH)
+        print("[format counters]", COUNTERS_PATH)
+    flush_logs()
+    sink_stats = log_stats()
+    if sink_stats:
+        print("[log sink]", sink_stats)
     print("[XML failure log]", XML_FAIL_LOG, "exists:", os.path.exists(XML_FAIL_LOG), "size:", os.path.getsize(XML_FAIL_LOG) if os.path.exists(XML_FAIL_LOG) else 0)
     print("[TOML failure log]", TOML_FAIL_LOG, "exists:", os.path.exists(TOML_FAIL_LOG), "size:", os.path.getsize(TOML_FAIL_LOG) if os.path.exists(TOML_FAIL_LOG) else 0)
     print("[P0 reject log]", REJECT_LOG, "exists:", os.path.exists(REJECT_LOG), "size:", os.path.getsize(REJECT_LOG) if os.path.exists(REJECT_LOG) else 0)